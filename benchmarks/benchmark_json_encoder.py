@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+import utils.json_encoder as json_encoder
+from utils.json_encoder import dump_rows_to_json
+from utils.json_dumps import dump_to_json
+
+"""
+Benchmark of the typed json encoder against dump_to_json, on rows shaped like the sales_order table.
+Run with: python benchmarks/benchmark_json_encoder.py [number of rows]
+"""
+
+
+COLUMNS = [
+    {"name": "sales_order_id", "type_oid": 23},
+    {"name": "created_at", "type_oid": 1114},
+    {"name": "last_updated", "type_oid": 1114},
+    {"name": "design_id", "type_oid": 23},
+    {"name": "staff_id", "type_oid": 23},
+    {"name": "counterparty_id", "type_oid": 23},
+    {"name": "units_sold", "type_oid": 23},
+    {"name": "unit_price", "type_oid": 1700},
+    {"name": "currency_id", "type_oid": 23},
+    {"name": "agreed_delivery_date", "type_oid": 1043},
+    {"name": "agreed_payment_date", "type_oid": 1043},
+    {"name": "agreed_delivery_location_id", "type_oid": 23},
+]
+
+
+def make_rows(row_count):
+    start = datetime(2022, 11, 3, 14, 20, 51, 563000)
+    return [
+        [
+            i,
+            start + timedelta(minutes=i),
+            start + timedelta(minutes=i, seconds=30),
+            i % 50,
+            i % 20,
+            i % 30,
+            1000 + i,
+            Decimal(f"{i % 10}.{i % 100:02d}"),
+            i % 3,
+            "2022-11-07",
+            "2022-11-10",
+            i % 30,
+        ]
+        for i in range(row_count)
+    ]
+
+
+def rows_per_second(function, row_count, repeat=5):
+    best = min(timed(function) for _ in range(repeat))
+    return row_count / best
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main(row_count):
+    rows = make_rows(row_count)
+    names = [column["name"] for column in COLUMNS]
+
+    def current():
+        """the whole standard-mode path: rows to dicts, then dump_to_json"""
+        return dump_to_json({"sales_order": [dict(zip(names, row)) for row in rows]})
+
+    def typed():
+        return dump_rows_to_json("sales_order", COLUMNS, rows)
+
+    results = {"dump_to_json": rows_per_second(current, row_count)}
+    if json_encoder.orjson is not None:
+        results["typed (orjson)"] = rows_per_second(typed, row_count)
+    orjson = json_encoder.orjson
+    json_encoder.orjson = None
+    results["typed (json)"] = rows_per_second(typed, row_count)
+    json_encoder.orjson = orjson
+
+    baseline = results["dump_to_json"]
+    print(f"{row_count} sales_order rows")
+    for name, speed in results.items():
+        print(f"{name:>16}: {speed:>12,.0f} rows/s  ({speed / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
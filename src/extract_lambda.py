@@ -1,34 +1,143 @@
 from dotenv import load_dotenv
-import boto3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from utils.extract_db import extract_db
-from utils.json_dumps import dump_to_json
-from utils.insert_into_s3 import upload_json_to_s3
-
+from db.connection import db_connection
+from utils.aws_clients import get_client
+from utils.settings import get_setting
+from utils.extract_db import fetch_table, extract_db_in_batches, DEFAULT_BATCH_SIZE
+from utils.json_encoder import dump_rows_to_json
+from utils.insert_into_s3 import (
+    upload_json_to_s3,
+    upload_json_batches_to_s3,
+    upload_ndjson_to_s3,
+)
+from utils.arrow_extract import extract_table_to_parquet
+from utils.copy_extract import (
+    copy_table_to_s3,
+    copy_file_extension,
+    check_raw_copy_format,
+)
+from utils.watermarks import read_watermarks, write_watermarks, max_last_updated
+from utils.fingerprints import fingerprint, read_fingerprints, write_fingerprints
+from utils.cdc_extract import (
+    ensure_replication_slot,
+    extract_changes_to_s3,
+    advance_slot,
+    DEFAULT_MAX_CHANGES,
+)
+from utils.preflight import preflight_tables, read_only_snapshot, export_snapshot
+from utils.raw_keys import raw_key
+from utils.run_manifest import build_manifest, write_manifest
+from utils.compression import check_codec, codec_suffix
+from utils.chunked_extract import (
+    extract_table_in_chunks,
+    read_checkpoint,
+    delete_checkpoints,
+    chunk_key,
+    chunk_keys,
+    ExtractIncompleteError,
+)
 
 """ EXTRACT LAMBDA: Includes extract lambda handler and util functions """
 
 
 load_dotenv()
 
+# seconds of the lambda timeout kept free after the last chunk, to save the checkpoints and the results
+CHUNKED_TIME_MARGIN = 15
+
 
 def lambda_handler(event, context):
     """Lambda handler that extracts data from a list of database tables (dbtables) and puts each table as a json inside an S3 bucket
 
+    Only rows updated after each table's high-water mark (the newest last_updated already extracted, see
+    utils/watermarks.py) are extracted. The watermarks are read once at the start of the run, and all of them
+    are saved together at the end, only once every table has been extracted successfully.
+
+    In "standard" mode, each table's payload is hashed (see utils/fingerprints.py) and compared with the hash of
+    the table's last uploaded payload. An unchanged table (e.g. a static table fully extracted again after a reload)
+    isn't uploaded, so no new raw file is seen by the transform lambda. The fingerprints are saved along with the
+    watermarks; deleting fingerprints.json makes the next run upload every table again.
+
+    Once every table is extracted, a run manifest listing the keys, row counts and byte sizes of the uploaded raw
+    files is saved under manifests/ (see utils/run_manifest.py), and its key is returned, so that the state machine
+    can pass it on to the transform lambda, which then doesn't need to list the bucket.
+
+    Run settings can be given in the event (lower case), or as environment variables:
+        - EXTRACT_MODE:
+            - "standard" (default): each table is queried in one go and uploaded with a single put_object, serialised
+              by the typed json encoder (utils/json_encoder.py)
+            - "stream": each table is read through a server-side cursor in batches of EXTRACT_BATCH_SIZE rows,
+              and each batch is serialised and streamed to s3 as soon as it is fetched
+            - "copy": each table is exported by Postgres with COPY ... TO STDOUT and the output is streamed
+              straight into s3, in EXTRACT_COPY_FORMAT ("csv", the default and only format the transform lambda
+              reads; "binary" is rejected)
+            - "chunked": each table is paged through by primary key, EXTRACT_BATCH_SIZE rows at a time, and each
+              chunk is uploaded as its own raw file with a checkpoint saved after it (see utils/chunked_extract.py).
+              When the lambda is about to time out, or if it fails, the run stops with the checkpoints in place and
+              the next invocation resumes after the last uploaded chunk, with the same run timestamp. Watermarks and
+              last_updated.txt are only saved once every table is complete.
+            - "cdc": instead of querying the tables, the changes recorded since the last run are read from a
+              logical replication slot (test_decoding, see utils/cdc_extract.py), at most EXTRACT_CDC_MAX_CHANGES
+              per run. Each changed table's inserted / updated rows are uploaded as a raw json file, and deleted keys
+              to {table}/deletes/. The first run creates the slot and does a "standard" extract of every table.
+              The slot is only advanced past the changes once the run's manifest and last_updated.txt are written,
+              so a run that fails reads them again.
+        - EXTRACT_FORMAT: format of the raw files in "standard" and "stream" mode:
+            - "json" (default): one json document per table, {table: [rows]}
+            - "parquet": rows are streamed through a server-side cursor into arrow record batches, typed from the
+              postgres column types, and written as parquet (one row group per EXTRACT_BATCH_SIZE rows)
+            - "ndjson" / "ndjson.gz": rows are streamed through a server-side cursor and written one json object per
+              line (gzipped for "ndjson.gz"), so neither extract nor transform hold a whole table document in memory
+        - EXTRACT_COMPRESSION: "none" (default), "gzip" or "zstd". Json, ndjson and COPY raw files are compressed
+          as they are written, with the codec's suffix added to the key (e.g. .json.gz, .csv.zst) and recorded in
+          the object's ContentEncoding; readers pick the codec from the key. Parquet files are compressed internally
+          and are not affected.
+        - EXTRACT_KEY_LAYOUT: key layout of the raw files (see utils/raw_keys.py):
+            - "flat" (default): {table}/{table}-{timestamp}.{extension}
+            - "hive": {table}/dt=YYYY-MM-DD/hour=HH/part-{timestamp}.{extension}
+        - EXTRACT_PREFLIGHT: "true" to probe every table's max(last_updated) in one query first, skip the tables
+          with nothing new, and extract the rest in one consistent read-only snapshot; "false" (default) to query
+          every table
+        - EXTRACT_CONCURRENCY: how many tables are extracted at the same time (default 1, i.e. one after another).
+          Each concurrent extraction uses its own database connection, so this also caps the load on the database.
+
     Args:
-        event (dict): an event given by AWS (unused but required by AWS)
+        event (dict): an event given by AWS, optionally containing any of the run settings above
         context (dict): an AWS Lambda context object (unused but required by AWS)
 
     Return:
-        dict: A dictionary to indicate successful completion, of the form {"result": "success"}
+        dict: A dictionary to indicate successful completion, of the form
+            {"result": "success", "manifest_key": "manifests/run-{timestamp}.json"}
 
     Raises:
+        ExtractIncompleteError: in "chunked" mode, if some tables still have chunks left to extract
         Exception: if the extraction or the upload fails
     """
 
     try:
-        s3_client = boto3.client("s3")
+        s3_client = get_client("s3")
+        extract_mode = get_setting(event, "EXTRACT_MODE", "standard")
+        batch_size = int(get_setting(event, "EXTRACT_BATCH_SIZE", DEFAULT_BATCH_SIZE))
+        concurrency = int(get_setting(event, "EXTRACT_CONCURRENCY", 1))
+        copy_format = get_setting(event, "EXTRACT_COPY_FORMAT", "csv")
+        extract_format = get_setting(event, "EXTRACT_FORMAT", "json")
+        key_layout = get_setting(event, "EXTRACT_KEY_LAYOUT", "flat")
+        compression = get_setting(event, "EXTRACT_COMPRESSION", "none")
+        compression = None if compression in ("", "none") else compression
+        check_codec(compression)
+        if extract_mode == "copy":
+            check_raw_copy_format(copy_format)
+        max_changes = int(
+            get_setting(event, "EXTRACT_CDC_MAX_CHANGES", DEFAULT_MAX_CHANGES)
+        )
+        preflight = (
+            str(get_setting(event, "EXTRACT_PREFLIGHT", "false")).lower() == "true"
+        )
         timestamp = datetime.now().isoformat()
+        checkpoints = {}
+        deadline = None
         table_list = [
             "address",
             "counterparty",
@@ -43,24 +152,425 @@ def lambda_handler(event, context):
             "transaction",
         ]
 
-        for table in table_list:
-            try:
-                """Run query with last updated if last_updated.txt exists"""
-                response = s3_client.get_object(
-                    Bucket="fscifa-raw-data", Key="last_updated.txt"
+        if extract_mode == "chunked":
+            checkpoints = {
+                table: read_checkpoint(table, "fscifa-raw-data", s3_client)
+                for table in table_list
+            }
+            resumed = [checkpoint for checkpoint in checkpoints.values() if checkpoint]
+            if resumed:
+                timestamp = resumed[0]["timestamp"]
+            if hasattr(context, "get_remaining_time_in_millis"):
+                deadline = (
+                    time.monotonic()
+                    + context.get_remaining_time_in_millis() / 1000
+                    - CHUNKED_TIME_MARGIN
                 )
-                last_updated = response["Body"].read().decode("utf-8")
-                check_time = last_updated.replace("T", " ")
-                table_dict = extract_db(table, check_time)
-            except Exception:
-                """Run full select * query if not"""
-                table_dict = extract_db(table)
-            key = f"{table}/{table}-{timestamp}.json"
-            if table_dict[table]:
-                json_data = dump_to_json(table_dict)
-                upload_json_to_s3(json_data, "fscifa-raw-data", key, s3_client)
+
+        watermarks = read_watermarks("fscifa-raw-data", s3_client, table_list)
+        fingerprints = read_fingerprints("fscifa-raw-data", s3_client)
+        results = None
+        last_lsn = None
+        if extract_mode == "cdc":
+            with db_connection() as conn:
+                if ensure_replication_slot(conn):
+                    print(
+                        "New replication slot, extracting the tables by query for this run"
+                    )
+                    extract_mode = "standard"
+                else:
+                    results, last_lsn = extract_changes_to_s3(
+                        table_list,
+                        timestamp,
+                        "fscifa-raw-data",
+                        s3_client,
+                        conn,
+                        max_changes=max_changes,
+                        watermarks=watermarks,
+                        key_layout=key_layout,
+                        compression=compression,
+                    )
+        if results is None:
+            results = extract_tables_to_s3(
+                table_list,
+                timestamp,
+                s3_client,
+                concurrency=concurrency,
+                extract_mode=extract_mode,
+                batch_size=batch_size,
+                watermarks=watermarks,
+                fingerprints=fingerprints,
+                copy_format=copy_format,
+                extract_format=extract_format,
+                checkpoints=checkpoints,
+                deadline=deadline,
+                preflight=preflight,
+                key_layout=key_layout,
+                compression=compression,
+            )
+        incomplete = [
+            table
+            for table, result in results.items()
+            if not result.get("complete", True)
+        ]
+        if incomplete:
+            raise ExtractIncompleteError(
+                f"Tables not fully extracted yet, resuming on the next run: {incomplete}"
+            )
+        for table, result in results.items():
+            if result["watermark"]:
+                watermarks[table] = result["watermark"]
+            if result.get("fingerprint"):
+                fingerprints[table] = result["fingerprint"]
+        write_watermarks(watermarks, "fscifa-raw-data", s3_client)
+        write_fingerprints(fingerprints, "fscifa-raw-data", s3_client)
+        table_keys = {
+            table: {
+                "keys": uploaded_keys(result, extract_mode),
+                "row_count": result["row_count"],
+            }
+            for table, result in results.items()
+        }
+        manifest_key = write_manifest(
+            build_manifest(timestamp, "fscifa-raw-data", table_keys, s3_client),
+            "fscifa-raw-data",
+            s3_client,
+        )
         upload_json_to_s3(timestamp, "fscifa-raw-data", "last_updated.txt", s3_client)
-        return {"result": "success"}
+        if last_lsn:
+            # only now that the run is complete, so a failed run reads the same changes again
+            with db_connection() as conn:
+                advance_slot(conn, last_lsn)
+        if extract_mode == "chunked":
+            delete_checkpoints(table_list, "fscifa-raw-data", s3_client)
+        return {"result": "success", "manifest_key": manifest_key}
+    except ExtractIncompleteError as error:
+        print(error)
+        raise error
     except Exception as error:
         print(f"Failed to extract data from database: {error}")
         raise Exception
+
+
+def uploaded_keys(result, extract_mode):
+    """Returns the keys of the raw files uploaded for a table, from its extract_table_to_s3 result"""
+    if not result["key"]:
+        return []
+    if extract_mode == "chunked":
+        return chunk_keys(result["key"])
+    return [result["key"]]
+
+
+def extract_tables_to_s3(
+    table_list,
+    timestamp,
+    s3_client,
+    concurrency=1,
+    extract_mode="standard",
+    batch_size=DEFAULT_BATCH_SIZE,
+    watermarks=None,
+    fingerprints=None,
+    copy_format="csv",
+    extract_format="json",
+    checkpoints=None,
+    deadline=None,
+    preflight=False,
+    key_layout="flat",
+    compression=None,
+):
+    """
+    Extracts every table in table_list to the raw data bucket.
+
+    - with a concurrency of 1, one connection is borrowed and the tables are extracted one after another
+    - otherwise the tables are extracted on a thread pool of at most `concurrency` workers, each borrowing its own
+      connection, and sharing s3_client (boto3 clients are thread safe). Wall-clock time is then close to the
+      slowest table rather than the sum of all tables.
+
+    Every table is attempted even if another one fails; the first error is raised once all tables are done.
+
+    With preflight, one connection first opens a REPEATABLE READ, READ ONLY transaction and probes every table in a
+    single query (see utils/preflight.py). Tables with no rows updated after their watermark are skipped, and the
+    changed tables are all extracted in that same snapshot: on that connection when extracting one table at a time,
+    otherwise on the workers' connections, which import the snapshot with SET TRANSACTION SNAPSHOT. The whole run
+    then reads one consistent state of the database.
+
+    Args:
+        table_list (list[str]): names of the tables to extract
+        timestamp (str): run timestamp used in the object keys
+        s3_client: a boto3 s3 client
+        concurrency (int): maximum number of tables extracted at the same time
+        extract_mode (str): "standard", "stream", "copy" or "chunked", see lambda_handler
+        batch_size (int): rows per batch in "stream" mode, or per chunk in "chunked" mode
+        watermarks (dict): table name -> high-water mark; tables without one are fully extracted
+        fingerprints (dict): table name -> fingerprint of the last uploaded payload, in "standard" mode
+        copy_format (str): "csv", used in "copy" mode (see check_raw_copy_format)
+        extract_format (str): "json", "parquet", "ndjson" or "ndjson.gz", used in "standard" and "stream" mode
+        checkpoints (dict): table name -> checkpoint to resume from, in "chunked" mode
+        deadline (float): time.monotonic() value after which no new chunk is started, in "chunked" mode
+        preflight (bool): whether to skip unchanged tables and extract the others in a single snapshot
+        key_layout (str): "flat" or "hive", see utils/raw_keys.py
+        compression (str): None, "gzip" or "zstd", see utils/compression.py
+
+    Returns:
+        dict: table name -> result of extract_table_to_s3 (skipped tables have no key, no rows and their old watermark)
+    """
+    watermarks = watermarks or {}
+    fingerprints = fingerprints or {}
+    checkpoints = checkpoints or {}
+
+    def extract_table(table, conn, in_snapshot=False):
+        return extract_table_to_s3(
+            table,
+            timestamp,
+            s3_client,
+            conn,
+            last_updated=watermarks.get(table),
+            previous_fingerprint=fingerprints.get(table),
+            extract_mode=extract_mode,
+            batch_size=batch_size,
+            copy_format=copy_format,
+            extract_format=extract_format,
+            checkpoint=checkpoints.get(table),
+            deadline=deadline,
+            in_snapshot=in_snapshot,
+            key_layout=key_layout,
+            compression=compression,
+        )
+
+    def extract_tables_concurrently(tables, snapshot_id=None):
+        def extract_table_with_own_connection(table):
+            with db_connection() as conn:
+                if not snapshot_id:
+                    return extract_table(table, conn)
+                with read_only_snapshot(conn, snapshot_id):
+                    return extract_table(table, conn, in_snapshot=True)
+
+        results = {}
+        errors = []
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {
+                executor.submit(extract_table_with_own_connection, table): table
+                for table in tables
+            }
+            for future in as_completed(futures):
+                table = futures[future]
+                try:
+                    results[table] = future.result()
+                except Exception as error:
+                    print(f"Failed to extract {table}: {error}")
+                    errors.append(error)
+        if errors:
+            raise errors[0]
+        return results
+
+    if not preflight:
+        if concurrency <= 1:
+            with db_connection() as conn:
+                return {table: extract_table(table, conn) for table in table_list}
+        return extract_tables_concurrently(table_list)
+
+    with db_connection() as conn, read_only_snapshot(conn):
+        probes = preflight_tables(table_list, watermarks, conn)
+        changed = [table for table in table_list if probes[table]["changed"]]
+        print(f"Tables changed since their watermark: {changed}")
+        results = {
+            table: {"key": None, "row_count": 0, "watermark": watermarks.get(table)}
+            for table in table_list
+            if table not in changed
+        }
+        if concurrency <= 1:
+            for table in changed:
+                results[table] = extract_table(table, conn, in_snapshot=True)
+            return results
+        # largest tables first, so a big table doesn't start last and hold up the whole run
+        changed.sort(key=lambda table: probes[table]["row_estimate"] or 0, reverse=True)
+        results.update(extract_tables_concurrently(changed, export_snapshot(conn)))
+        return results
+
+
+def extract_table_to_s3(
+    table,
+    timestamp,
+    s3_client,
+    conn,
+    last_updated=None,
+    previous_fingerprint=None,
+    extract_mode="standard",
+    batch_size=DEFAULT_BATCH_SIZE,
+    copy_format="csv",
+    extract_format="json",
+    checkpoint=None,
+    deadline=None,
+    in_snapshot=False,
+    key_layout="flat",
+    compression=None,
+):
+    """
+    Extracts one table (only rows updated after last_updated, if given) and uploads it to the raw data bucket
+    as {table}/{table}-{timestamp}.json (or .parquet, .ndjson, .ndjson.gz, or .csv in "copy" mode,
+    or {table}/{table}-{timestamp}-part-NNNNN.json chunks in "chunked" mode), or under
+    {table}/dt=YYYY-MM-DD/hour=HH/part-{timestamp} in the "hive" key layout. With compression, the codec's
+    suffix is added to the key (e.g. .json.gz), except for parquet files.
+
+    Args:
+        table (str): name of the table to extract
+        timestamp (str): run timestamp used in the object key
+        s3_client: a boto3 s3 client
+        conn (Connection): an open database connection
+        last_updated (str): the table's high-water mark, or None to extract the whole table
+        previous_fingerprint (str): fingerprint of the table's last uploaded payload, in "standard" mode;
+            if the new payload has the same fingerprint it isn't uploaded
+        extract_mode (str): "standard", "stream", "copy" or "chunked", see lambda_handler
+        batch_size (int): rows per batch in "stream" mode, or per chunk in "chunked" mode
+        copy_format (str): "csv", used in "copy" mode (see check_raw_copy_format)
+        extract_format (str): "json", "parquet", "ndjson" or "ndjson.gz", used in "standard" and "stream" mode
+        checkpoint (dict): the table's checkpoint to resume from, in "chunked" mode
+        deadline (float): time.monotonic() value after which no new chunk is started, in "chunked" mode
+        in_snapshot (bool): True if conn is already in the run's read-only snapshot transaction
+        key_layout (str): "flat" or "hive", see utils/raw_keys.py
+        compression (str): None, "gzip" or "zstd", see utils/compression.py
+
+    Returns:
+        dict: {"key": key of the uploaded object, or None if there was no new data,
+               "row_count": number of rows extracted,
+               "watermark": the table's new high-water mark}
+        in "chunked" mode, "key" is the key of the last chunk, and "complete" is False if chunks are left
+        in "standard" mode, "fingerprint" is the payload's fingerprint (and "key" is None if it was unchanged)
+    """
+    suffix = codec_suffix(compression)
+    key = raw_key(table, timestamp, f"json{suffix}", key_layout)
+    watermark = last_updated
+    if extract_mode == "chunked":
+        checkpoint = extract_table_in_chunks(
+            table,
+            timestamp,
+            "fscifa-raw-data",
+            s3_client,
+            conn,
+            last_updated=last_updated,
+            chunk_size=batch_size,
+            checkpoint=checkpoint,
+            deadline=deadline,
+            key_layout=key_layout,
+            compression=compression,
+        )
+        part = checkpoint["part"]
+        return {
+            "key": (
+                chunk_key(
+                    table,
+                    checkpoint["timestamp"],
+                    part,
+                    checkpoint.get("key_layout", "flat"),
+                    checkpoint.get("compression"),
+                )
+                if part
+                else None
+            ),
+            "row_count": checkpoint["row_count"],
+            "watermark": checkpoint["watermark"],
+            "complete": checkpoint["complete"],
+        }
+    elif extract_mode == "copy":
+        check_raw_copy_format(copy_format)
+        key = raw_key(
+            table, timestamp, f"{copy_file_extension(copy_format)}{suffix}", key_layout
+        )
+        result = copy_table_to_s3(
+            table,
+            "fscifa-raw-data",
+            key,
+            s3_client,
+            conn,
+            last_updated=last_updated,
+            copy_format=copy_format,
+            in_snapshot=in_snapshot,
+        )
+        row_count = result["row_count"]
+        watermark = result["watermark"] or watermark
+        if not row_count:
+            key = None
+    elif extract_format == "parquet":
+        key = raw_key(table, timestamp, "parquet", key_layout)
+        result = extract_table_to_parquet(
+            table,
+            "fscifa-raw-data",
+            key,
+            s3_client,
+            conn,
+            last_updated=last_updated,
+            batch_size=batch_size,
+            in_snapshot=in_snapshot,
+        )
+        row_count = result["row_count"]
+        watermark = result["watermark"]
+        if not row_count:
+            key = None
+    elif extract_format in ("ndjson", "ndjson.gz"):
+        # "ndjson.gz" is already gzipped, whatever the compression setting
+        extension = (
+            extract_format if extract_format == "ndjson.gz" else f"ndjson{suffix}"
+        )
+        key = raw_key(table, timestamp, extension, key_layout)
+
+        def rows_with_watermark():
+            nonlocal watermark
+            for batch in extract_db_in_batches(
+                table, last_updated, batch_size, conn=conn, in_snapshot=in_snapshot
+            ):
+                watermark = max_last_updated(batch, watermark)
+                yield from batch
+
+        row_count = upload_ndjson_to_s3(
+            rows_with_watermark(),
+            "fscifa-raw-data",
+            key,
+            s3_client,
+        )
+        if not row_count:
+            key = None
+    elif extract_mode == "stream":
+
+        def batches_with_watermark():
+            nonlocal watermark
+            for batch in extract_db_in_batches(
+                table, last_updated, batch_size, conn=conn, in_snapshot=in_snapshot
+            ):
+                watermark = max_last_updated(batch, watermark)
+                yield batch
+
+        row_count = upload_json_batches_to_s3(
+            batches_with_watermark(),
+            table,
+            "fscifa-raw-data",
+            key,
+            s3_client,
+        )
+        if not row_count:
+            key = None
+    else:
+        columns, rows = fetch_table(table, last_updated, conn)
+        row_count = len(rows)
+        if rows:
+            names = [column["name"] for column in columns]
+            if "last_updated" in names:
+                index = names.index("last_updated")
+                watermark = max_last_updated(
+                    ({"last_updated": row[index]} for row in rows), watermark
+                )
+            json_data = dump_rows_to_json(table, columns, rows)
+            content_hash = fingerprint(json_data)
+            if content_hash == previous_fingerprint:
+                print(f"{table} is unchanged since its last upload, skipping it")
+                key = None
+            else:
+                upload_json_to_s3(json_data, "fscifa-raw-data", key, s3_client)
+            return {
+                "key": key,
+                "row_count": row_count,
+                "watermark": watermark,
+                "fingerprint": content_hash,
+            }
+        else:
+            key = None
+    return {"key": key, "row_count": row_count, "watermark": watermark}
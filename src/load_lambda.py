@@ -1,4 +1,8 @@
+from db.connection import db_connection
+from utils.aws_clients import get_client
+from utils.calendar_dim import confirm_date_range
 from utils.parquet_to_sql import fetch_parquet, parquet_to_sql
+from utils.run_manifest import read_manifest
 
 
 def lambda_handler(event, context):
@@ -13,8 +17,14 @@ def lambda_handler(event, context):
     else:
         - it will do nothing
 
+    If the event has the transform run's "manifest_key" (passed on by the state machine), the files to load are
+    taken from that manifest (see utils/run_manifest.py) instead of listing the bucket and reading last_updated.txt.
+
+    Once the dim_date rows are inserted, the range of dates loaded is saved (see utils/calendar_dim.py), so the
+    transform lambda stops sending them; if the insert fails, they are sent again by the next transform run.
+
     Args:
-        event (dict): an event given by AWS (unused but required by AWS)
+        event (dict): an event given by AWS, optionally containing "manifest_key"
         context (dict): an AWS Lambda context object (unused but required by AWS)
 
     Return:
@@ -35,19 +45,27 @@ def lambda_handler(event, context):
         "fact_sales_order",
     ]
     errors = []
-    for table in table_list:
-        try:
-
-            parquet_df = fetch_parquet(table, bucket)
-            if parquet_df is not None:
-                parquet_to_sql(table, parquet_df)
-                print(f"{table} table updated in OLAP warehouse")
-            else:
-                print(f"No data to load for {table}")
-        except Exception as error:
-            print(f"Failed to update {table} in database: {error}")
-            errors.append(error)
-            continue
+    manifest_key = (event or {}).get("manifest_key")
+    manifest = (
+        read_manifest(bucket, manifest_key, get_client("s3")) if manifest_key else None
+    )
+    """Borrow one warehouse connection for the whole run, instead of connecting once per table"""
+    with db_connection() as conn:
+        for table in table_list:
+            try:
+
+                parquet_df = fetch_parquet(table, bucket, manifest=manifest)
+                if parquet_df is not None:
+                    parquet_to_sql(table, parquet_df, conn=conn)
+                    if table == "dim_date":
+                        confirm_date_range(parquet_df, bucket, get_client("s3"))
+                    print(f"{table} table updated in OLAP warehouse")
+                else:
+                    print(f"No data to load for {table}")
+            except Exception as error:
+                print(f"Failed to update {table} in database: {error}")
+                errors.append(error)
+                continue
 
     if len(errors) > 0:
         for error in errors:
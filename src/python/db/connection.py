@@ -1,12 +1,23 @@
 # import os
 from pg8000.native import Connection
 from dotenv import load_dotenv
+from contextlib import contextmanager
 import os
+import threading
+import time
 
 """ Functions for creating and closing database connections """
 load_dotenv()
 
 
+POOL_SIZE = int(os.getenv("PG_POOL_SIZE", "4"))
+HEALTH_CHECK_INTERVAL = 30
+
+# Idle connections are kept at module level, so they survive between warm lambda invocations
+_idle_connections = []
+_pool_lock = threading.Lock()
+
+
 def connect_to_db():
     try:
 
@@ -27,3 +38,78 @@ def close_db(db):
         db.close()
     except Exception:
         print("Error closing database connection.")
+
+
+def is_connection_healthy(db):
+    """Checks a connection is still usable by running a trivial query on it"""
+    try:
+        db.run("SELECT 1;")
+        return True
+    except Exception:
+        return False
+
+
+def borrow_connection():
+    """
+    Returns an open database connection, reusing an idle one from the pool if possible.
+
+    Idle connections that have not been used for HEALTH_CHECK_INTERVAL seconds are health checked
+    before being handed out, and silently replaced if they have gone stale.
+
+    Raises:
+        ConnectionError: if a new connection is needed and cannot be opened
+    """
+    while True:
+        with _pool_lock:
+            if not _idle_connections:
+                break
+            db, released_at = _idle_connections.pop()
+        if time.monotonic() - released_at < HEALTH_CHECK_INTERVAL:
+            return db
+        if is_connection_healthy(db):
+            return db
+        close_db(db)
+
+    db = connect_to_db()
+    if db is None:
+        raise ConnectionError("Unable to connect to database.")
+    return db
+
+
+def release_connection(db):
+    """Returns a borrowed connection to the pool, or closes it if the pool is already full"""
+    with _pool_lock:
+        if len(_idle_connections) < POOL_SIZE:
+            _idle_connections.append((db, time.monotonic()))
+            return
+    close_db(db)
+
+
+def close_all_connections():
+    """Closes every idle connection in the pool"""
+    with _pool_lock:
+        connections = [db for db, _ in _idle_connections]
+        _idle_connections.clear()
+    for db in connections:
+        close_db(db)
+
+
+@contextmanager
+def db_connection():
+    """
+    Context manager that borrows a connection from the pool and gives it back afterwards.
+
+    If the block raises, the connection is closed rather than returned to the pool,
+    so a connection left in a broken or aborted-transaction state is never reused.
+
+    Usage:
+        with db_connection() as conn:
+            extract_db("staff", conn=conn)
+    """
+    db = borrow_connection()
+    try:
+        yield db
+    except BaseException:
+        close_db(db)
+        raise
+    release_connection(db)
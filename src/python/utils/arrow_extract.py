@@ -0,0 +1,157 @@
+import json
+from utils.extract_db import fetch_row_batches, DEFAULT_BATCH_SIZE
+from utils.s3_multipart_writer import S3MultipartWriter
+from utils.watermarks import max_last_updated
+
+""" Extracting tables straight from pg8000 rows into Arrow record batches, written to s3 as parquet """
+
+
+# postgres type oids (see pg8000.converters) -> name of the pyarrow type factory
+PG_TYPE_OIDS_TO_ARROW = {
+    16: "bool_",
+    17: "binary",
+    20: "int64",
+    21: "int16",
+    23: "int32",
+    700: "float32",
+    701: "float64",
+    1082: "date32",
+    1114: "timestamp",
+    1184: "timestamptz",
+}
+
+NUMERIC_OID = 1700
+JSON_OIDS = [114, 3802]
+
+
+def arrow_type_for_column(column):
+    """
+    Returns the pyarrow type for a column described by pg8000's conn.columns.
+
+    - integers, floats, booleans, dates and timestamps map onto the matching arrow types
+    - numeric columns with a declared precision and scale (e.g. numeric(10, 2)) become decimal128
+    - everything else (text, varchar, unconstrained numeric, json, ...) is stored as a string
+
+    Arguments:
+    - column (dict): one entry of conn.columns, with "type_oid" and "type_modifier"
+
+    Returns:
+    - pyarrow.DataType
+    """
+    import pyarrow as pa
+
+    type_oid = column["type_oid"]
+    type_name = PG_TYPE_OIDS_TO_ARROW.get(type_oid)
+    if type_name == "timestamp":
+        return pa.timestamp("us")
+    if type_name == "timestamptz":
+        return pa.timestamp("us", tz="UTC")
+    if type_name:
+        return getattr(pa, type_name)()
+    type_modifier = column.get("type_modifier", -1)
+    if type_oid == NUMERIC_OID and type_modifier not in (None, -1):
+        precision = ((type_modifier - 4) >> 16) & 0xFFFF
+        scale = (type_modifier - 4) & 0xFFFF
+        return pa.decimal128(precision, scale)
+    return pa.string()
+
+
+def arrow_schema_for_columns(columns):
+    """Returns the pyarrow schema for conn.columns"""
+    import pyarrow as pa
+
+    return pa.schema(
+        [pa.field(column["name"], arrow_type_for_column(column)) for column in columns]
+    )
+
+
+def rows_to_record_batch(rows, schema, columns):
+    """
+    Builds an arrow record batch column by column from pg8000 result rows, without building a dict per row.
+
+    Arguments:
+    - rows (list[list]): rows as returned by conn.run
+    - schema (pyarrow.Schema): from arrow_schema_for_columns
+    - columns (list[dict]): conn.columns for the rows
+
+    Returns:
+    - pyarrow.RecordBatch
+    """
+    import pyarrow as pa
+
+    arrays = []
+    for index, field in enumerate(schema):
+        values = [row[index] for row in rows]
+        if pa.types.is_string(field.type):
+            if columns[index]["type_oid"] in JSON_OIDS:
+                values = [None if v is None else json.dumps(v) for v in values]
+            else:
+                values = [None if v is None else str(v) for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def extract_table_to_parquet(
+    table_name,
+    bucket_name,
+    key,
+    s3_client,
+    conn,
+    last_updated=None,
+    batch_size=DEFAULT_BATCH_SIZE,
+    compression="snappy",
+    in_snapshot=False,
+):
+    """
+    This function:
+    - streams a table through a server-side cursor (fetch_row_batches), batch_size rows at a time
+    - turns each batch directly into an arrow record batch, typed from the pg8000 column type oids
+    - writes each record batch as a parquet row group, streamed to s3 through S3MultipartWriter
+    - doesn't create an object if there are no rows
+
+    Arguments:
+    - table_name (str): name of the table to extract
+    - bucket_name (str): the name of the target s3 bucket
+    - key (str): key of the object to write
+    - s3_client: a boto3 s3 client
+    - conn (Connection): an open database connection
+    - last_updated (str): only extract rows updated after this timestamp, if given
+    - batch_size (int): rows per cursor fetch, and per parquet row group
+    - compression (str): parquet compression codec
+    - in_snapshot (bool): True if conn is already in a read-only snapshot transaction (see utils/preflight.py)
+
+    Returns:
+    - dict: {"row_count": number of rows extracted, "watermark": max(last_updated) of the extracted rows}
+    """
+    import pyarrow.parquet as pq
+
+    writer = None
+    parquet_writer = None
+    row_count = 0
+    watermark = last_updated
+    try:
+        for columns, rows in fetch_row_batches(
+            table_name, last_updated, batch_size, conn, in_snapshot
+        ):
+            if parquet_writer is None:
+                schema = arrow_schema_for_columns(columns)
+                writer = S3MultipartWriter(bucket_name, key, s3_client)
+                parquet_writer = pq.ParquetWriter(
+                    writer, schema, compression=compression
+                )
+            parquet_writer.write_batch(rows_to_record_batch(rows, schema, columns))
+            row_count += len(rows)
+            if "last_updated" in schema.names:
+                index = schema.names.index("last_updated")
+                watermark = max_last_updated(
+                    ({"last_updated": row[index]} for row in rows), watermark
+                )
+        if parquet_writer is not None:
+            parquet_writer.close()
+            writer.close()
+        return {"row_count": row_count, "watermark": watermark}
+    except Exception as error:
+        print(f"Failed to write {table_name} to parquet: {error}")
+        if writer is not None:
+            writer.abort()
+        raise error
@@ -0,0 +1,63 @@
+import os
+import threading
+import boto3
+from botocore.config import Config
+
+""" Shared boto3 clients: created once per container and reused by every util and every warm invocation """
+
+
+MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "50"))
+
+# - a connection pool big enough for every extract / read worker to keep its own warm connection
+# - adaptive retries, so throttling (503 SlowDown) backs off instead of failing the run
+# - short connect timeout, so a stuck connection is retried quickly; read timeout long enough for big objects
+# - TCP keepalive, so pooled connections aren't silently dropped between calls
+CLIENT_CONFIG = Config(
+    max_pool_connections=MAX_POOL_CONNECTIONS,
+    retries={"max_attempts": 5, "mode": "adaptive"},
+    connect_timeout=5,
+    read_timeout=60,
+    tcp_keepalive=True,
+)
+
+# Kept at module level, so they survive between warm lambda invocations (like the database connection pool)
+_session = None
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_session():
+    """Returns the container's boto3 session, creating it (and resolving credentials) on first use"""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = boto3.session.Session()
+        return _session
+
+
+def get_client(service_name="s3"):
+    """
+    Returns the container's client for an AWS service, created on first use with CLIENT_CONFIG.
+
+    boto3 clients are thread safe, so one client is shared by every thread, and its connection pool is reused
+    by every call instead of opening new HTTPS connections.
+
+    Arguments:
+    - service_name (str): e.g. "s3"
+
+    Returns:
+    - a boto3 client
+    """
+    session = get_session()
+    with _lock:
+        if service_name not in _clients:
+            _clients[service_name] = session.client(service_name, config=CLIENT_CONFIG)
+        return _clients[service_name]
+
+
+def reset_clients():
+    """Forgets the cached session and clients, e.g. after the credentials or region have changed"""
+    global _session
+    with _lock:
+        _session = None
+        _clients.clear()
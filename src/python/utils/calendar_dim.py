@@ -0,0 +1,151 @@
+import json
+import pandas as pd
+from botocore.exceptions import ClientError
+
+""" Calendar dim_date: a contiguous range of dates, generated in one go, only extended by the dates not sent yet """
+
+
+# range of the dim_date rows loaded into the warehouse, saved by the load lambda once they are inserted
+DATE_RANGE_KEY = "state/dim_date_range.json"
+
+# range of the dim_date rows uploaded by the transform lambda, but not loaded yet (sent again until they are)
+PENDING_DATE_RANGE_KEY = "state/dim_date_pending.json"
+
+ONE_DAY = pd.Timedelta(days=1)
+
+
+def read_date_range(bucket_name, s3_client, key=DATE_RANGE_KEY):
+    """
+    This function:
+    - reads the range of dates already loaded as dim_date rows (state/dim_date_range.json), or the range of dates
+      uploaded but not loaded yet if key is PENDING_DATE_RANGE_KEY
+    - returns no range if there is no saved state yet, so the whole calendar needed is sent
+
+    Arguments:
+    - bucket_name (str): the name of the processed data bucket
+    - s3_client: a boto3 s3 client
+    - key (str): DATE_RANGE_KEY or PENDING_DATE_RANGE_KEY
+
+    Returns:
+    - tuple: (first date, last date), as "YYYY-MM-DD" strings, or None
+    """
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=key)
+    except ClientError as err:
+        if err.response["Error"]["Code"] not in ["404", "NoSuchKey"]:
+            raise err
+        return None
+    date_range = json.loads(response["Body"].read().decode("utf-8"))
+    return date_range["start"], date_range["end"]
+
+
+def write_date_range(date_range, bucket_name, s3_client, key=DATE_RANGE_KEY):
+    """
+    Saves a range of dim_date rows. The loaded range (DATE_RANGE_KEY) should only be saved once those rows have been
+    inserted into the warehouse (see confirm_date_range); the pending range once they have been uploaded.
+
+    Arguments:
+    - date_range (tuple): (first date, last date), as "YYYY-MM-DD" strings
+    - bucket_name (str): the name of the processed data bucket
+    - s3_client: a boto3 s3 client
+    - key (str): DATE_RANGE_KEY or PENDING_DATE_RANGE_KEY
+    """
+    start, end = date_range
+    s3_client.put_object(
+        Body=json.dumps({"start": start, "end": end}),
+        Bucket=bucket_name,
+        Key=key,
+    )
+    print(f"Successfully uploaded {key} to s3://{bucket_name}/{key}")
+
+
+def confirm_date_range(dim_date, bucket_name, s3_client):
+    """
+    This function, called by the load lambda once dim_date rows are inserted into the warehouse:
+    - extends the loaded range (state/dim_date_range.json) to the dates of those rows
+    - removes the pending range, as its rows are now loaded
+
+    Arguments:
+    - dim_date (pd.DataFrame): the dim_date rows just inserted, with a date_id column
+    - bucket_name (str): the name of the processed data bucket
+    - s3_client: a boto3 s3 client
+    """
+    if dim_date.empty:
+        return
+    date_range = extend_date_range(read_date_range(bucket_name, s3_client), dim_date)
+    write_date_range(date_range, bucket_name, s3_client)
+    s3_client.delete_object(Bucket=bucket_name, Key=PENDING_DATE_RANGE_KEY)
+
+
+def calendar_dim_date(dates):
+    """
+    Builds the dim_date rows of dates, every attribute computed for all the dates at once.
+
+    Arguments:
+    - dates: the dates (anything pd.DatetimeIndex takes, e.g. a pd.date_range or parsed datetimes)
+
+    Returns:
+    - pd.DataFrame: one row per date, with the columns of dim_date
+    """
+    dates = pd.DatetimeIndex(dates)
+    return pd.DataFrame(
+        {
+            "date_id": dates.date,
+            "year": dates.year,
+            "month": dates.month,
+            "day": dates.day,
+            "day_of_week": dates.dayofweek,
+            "day_name": dates.day_name(),
+            "month_name": dates.month_name(),
+            "quarter": dates.quarter,
+        }
+    )
+
+
+def new_calendar_dates(dates, date_range=None, pending_range=None):
+    """
+    This function:
+    - finds the first and last of dates (invalid or missing dates are ignored), and of pending_range, so that the
+      days uploaded by a run whose load didn't complete are sent again
+    - returns every day from the first to the last date, if no dates have been sent yet (date_range is None)
+    - otherwise, returns only the days needed to extend date_range to the first and last date: the days before
+      its start and the days after its end, so the calendar stays contiguous and no date is sent twice
+
+    Arguments:
+    - dates (iterable[str]): "YYYY-MM-DD" dates, e.g. the distinct dates of the fact table
+    - date_range (tuple): (first date, last date) already loaded, see read_date_range
+    - pending_range (tuple): (first date, last date) uploaded but not loaded yet, or None
+
+    Returns:
+    - pd.DatetimeIndex: the new days, in order (empty if every date is already in date_range)
+    """
+    dates = list(dates) + list(pending_range or [])
+    dates = pd.to_datetime(
+        pd.Series(dates, dtype=object), format="%Y-%m-%d", errors="coerce"
+    ).dropna()
+    if dates.empty:
+        return pd.DatetimeIndex([])
+    first, last = dates.min(), dates.max()
+    if date_range is None:
+        return pd.date_range(first, last, freq="D")
+    start, end = pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1])
+    return pd.date_range(first, start - ONE_DAY, freq="D").append(
+        pd.date_range(end + ONE_DAY, last, freq="D")
+    )
+
+
+def extend_date_range(date_range, dim_date):
+    """
+    Returns date_range extended to the dates of the dim_date rows just sent, see new_calendar_dates.
+
+    Arguments:
+    - date_range (tuple): (first date, last date) already sent, or None
+    - dim_date (pd.DataFrame): the dim_date rows just sent, with a date_id column
+
+    Returns:
+    - tuple: (first date, last date), as "YYYY-MM-DD" strings
+    """
+    dates = pd.to_datetime(pd.Series(dim_date["date_id"]))
+    if date_range is not None:
+        dates = pd.concat([dates, pd.to_datetime(pd.Series(list(date_range)))])
+    return dates.min().strftime("%Y-%m-%d"), dates.max().strftime("%Y-%m-%d")
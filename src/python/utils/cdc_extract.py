@@ -0,0 +1,268 @@
+import re
+from datetime import datetime
+from utils.extract_catalog import catalog_entry
+from utils.json_dumps import dump_to_json
+from utils.insert_into_s3 import upload_json_to_s3
+from utils.raw_keys import raw_key
+from utils.compression import codec_suffix
+from utils.watermarks import max_last_updated
+
+""" Change data capture: extracts the changes decoded from a Postgres logical replication slot (test_decoding) """
+
+
+CDC_SLOT_NAME = "fscifa_cdc"
+
+DEFAULT_MAX_CHANGES = 100000
+
+# e.g. "table public.staff: UPDATE: staff_id[integer]:1 first_name[character varying]:'Jeremie'"
+CHANGE_HEADER = re.compile(
+    r"^table (?P<schema>[^.]+)\.(?P<table>\S+): (?P<operation>INSERT|UPDATE|DELETE): (?P<columns>.*)$"
+)
+CHANGE_COLUMN = re.compile(
+    r"(?P<name>[^\s\[]+)\[(?P<type>.+?)\]:(?P<value>'(?:[^']|'')*'|\S+)"
+)
+
+INTEGER_TYPES = {"smallint", "integer", "bigint"}
+FLOAT_TYPES = {"real", "double precision"}
+TIMESTAMP_TYPES = {"timestamp without time zone", "timestamp with time zone"}
+
+
+def ensure_replication_slot(conn, slot_name=CDC_SLOT_NAME):
+    """
+    Creates the logical replication slot (with the test_decoding plugin) if it doesn't exist yet.
+    The database needs wal_level = logical, and the user the REPLICATION role attribute.
+
+    Arguments:
+    - conn (Connection): an open database connection, not in a transaction
+    - slot_name (str): name of the slot
+
+    Returns:
+    - bool: True if the slot was just created (its changes start now, so the tables need a full extract first)
+    """
+    exists = conn.run(
+        "SELECT 1 FROM pg_replication_slots WHERE slot_name = :slot_name;",
+        slot_name=slot_name,
+    )
+    if exists:
+        return False
+    conn.run(
+        "SELECT pg_create_logical_replication_slot(:slot_name, 'test_decoding');",
+        slot_name=slot_name,
+    )
+    print(f"Created logical replication slot {slot_name}")
+    return True
+
+
+def peek_changes(conn, slot_name=CDC_SLOT_NAME, max_changes=DEFAULT_MAX_CHANGES):
+    """
+    Returns the changes waiting in the slot, without consuming them (see advance_slot).
+    Decoding stops at the end of the transaction in which max_changes is reached, so only whole transactions
+    are returned.
+
+    Returns:
+    - list[list]: [lsn, xid, data] rows, data being test_decoding's text for one change (or BEGIN / COMMIT)
+    """
+    return conn.run(
+        "SELECT lsn::text, xid::text, data FROM pg_logical_slot_peek_changes(:slot_name, NULL, :max_changes);",
+        slot_name=slot_name,
+        max_changes=max_changes,
+    )
+
+
+def advance_slot(conn, lsn, slot_name=CDC_SLOT_NAME):
+    """
+    Consumes the slot's changes up to and including lsn. It should only be called once the run that extracted them
+    is complete (its manifest and last_updated.txt written), so that a failed run reads the same changes again.
+    """
+    conn.run(
+        "SELECT pg_replication_slot_advance(:slot_name, CAST(:lsn AS pg_lsn));",
+        slot_name=slot_name,
+        lsn=lsn,
+    )
+
+
+def parse_change(data):
+    """
+    Parses one change decoded by test_decoding.
+
+    Arguments:
+    - data (str): e.g. "table public.staff: INSERT: staff_id[integer]:1 first_name[character varying]:'Jeremie'"
+
+    Returns:
+    - dict: {"table": "staff", "operation": "INSERT", "row": {"staff_id": 1, "first_name": "Jeremie"}},
+      or None for anything that isn't a row change (BEGIN, COMMIT, or a DELETE without key data).
+      For an UPDATE that changes the key, "row" is the new row and "old_row" has the old key.
+      Values are converted from their postgres types the way the other extract modes write them: integers and
+      floats as numbers, booleans as true / false, timestamps as "YYYY-MM-DD HH:MM:SS.ffffff", anything else
+      (numerics, dates, text) as strings.
+    """
+    match = CHANGE_HEADER.match(data)
+    if match is None:
+        return None
+    change = {"table": match["table"], "operation": match["operation"]}
+    columns = match["columns"]
+    if columns.startswith("old-key: "):
+        old_columns, _, columns = columns[len("old-key: ") :].partition(" new-tuple: ")
+        change["old_row"] = parse_columns(old_columns)
+    change["row"] = parse_columns(columns)
+    if not change["row"]:
+        return None
+    return change
+
+
+def parse_columns(columns):
+    """Parses test_decoding's "name[type]:value ..." list into a row dict, leaving out unchanged TOASTed values"""
+    row = {}
+    for column in CHANGE_COLUMN.finditer(columns):
+        if column["value"] == "unchanged-toast-datum":
+            continue
+        row[column["name"]] = parse_value(column["value"], column["type"])
+    return row
+
+
+def parse_value(value, pg_type):
+    if value == "null":
+        return None
+    if value.startswith("'"):
+        value = value[1:-1].replace("''", "'")
+    if pg_type in INTEGER_TYPES:
+        return int(value)
+    if pg_type in FLOAT_TYPES:
+        return float(value)
+    if pg_type == "boolean":
+        return value == "true"
+    if pg_type in TIMESTAMP_TYPES:
+        return str(datetime.fromisoformat(value))
+    return value
+
+
+class ChangeBuffer:
+    """
+    Collects the changes of each extracted table, keeping only the latest state of each row (by primary key):
+    - an INSERT or UPDATE replaces any earlier change to the row, and is written to the table's raw file
+    - a DELETE drops any earlier change to the row, and is written to the table's deletes file
+    - an UPDATE changing the primary key deletes the row under its old key
+
+    Rows are projected to the table's catalog columns, just like a polled extract.
+    """
+
+    def __init__(self, table_list):
+        self.upserts = {table: {} for table in table_list}
+        self.deletes = {table: {} for table in table_list}
+
+    def add(self, change):
+        table_name = change["table"]
+        if table_name not in self.upserts:
+            return
+        entry = catalog_entry(table_name)
+        key = change["row"].get(entry["key"])
+        old_key = change.get("old_row", {}).get(entry["key"], key)
+        if change["operation"] == "DELETE":
+            self.delete(table_name, entry["key"], key)
+        else:
+            if old_key != key:
+                self.delete(table_name, entry["key"], old_key)
+            self.deletes[table_name].pop(key, None)
+            self.upserts[table_name][key] = {
+                column: change["row"].get(column) for column in entry["columns"]
+            }
+
+    def delete(self, table_name, key_column, key):
+        self.upserts[table_name].pop(key, None)
+        self.deletes[table_name][key] = {key_column: key}
+
+
+def deletes_key(table_name, timestamp, compression=None, key_layout="flat"):
+    """
+    Returns the key of a table's deletes file: the key of its rows file in key_layout (see utils/raw_keys.py), under
+    a deletes/ folder that the raw file listings don't pick up, e.g. staff/deletes/staff-2025-05-29T11:06:18.399084.json
+    or staff/deletes/dt=2025-05-29/hour=11/part-2025-05-29T11:06:18.399084.json
+    """
+    key = raw_key(table_name, timestamp, f"json{codec_suffix(compression)}", key_layout)
+    return f"{table_name}/deletes/{key[len(table_name) + 1:]}"
+
+
+def extract_changes_to_s3(
+    table_list,
+    timestamp,
+    bucket_name,
+    s3_client,
+    conn,
+    slot_name=CDC_SLOT_NAME,
+    max_changes=DEFAULT_MAX_CHANGES,
+    watermarks=None,
+    key_layout="flat",
+    compression=None,
+):
+    """
+    This function:
+    - reads the changes waiting in the replication slot (up to about max_changes, in whole transactions)
+    - buffers them per table with ChangeBuffer
+    - uploads each changed table's inserted / updated rows in the same raw file layout as the other extract modes
+      ({table: [rows]} json, under raw_key), so the transform lambda reads them like any other extract
+    - uploads deleted keys to a separate {table}/deletes/ file, which the raw file listings don't pick up
+    - doesn't advance the slot: the caller does, with the returned LSN, once the run is complete (see advance_slot),
+      so if anything fails the same changes are read again by the next run
+
+    The database work is proportional to the number of changes, not to the size of the tables. Changes left over
+    when max_changes is reached are extracted by the next run.
+
+    Arguments:
+    - table_list (list[str]): names of the tables to extract; changes to other tables are consumed and ignored
+    - timestamp (str): run timestamp used in the object keys
+    - bucket_name (str): the name of the raw data bucket
+    - s3_client: a boto3 s3 client
+    - conn (Connection): an open database connection, not in a transaction
+    - slot_name (str): name of the replication slot, see ensure_replication_slot
+    - max_changes (int): maximum number of changes to read
+    - watermarks (dict): table name -> high-water mark, advanced with the extracted rows' last_updated
+    - key_layout (str): "flat" or "hive", see utils/raw_keys.py
+    - compression (str): None, "gzip" or "zstd", see utils/compression.py
+
+    Returns:
+    - tuple:
+        - dict: table name -> {"key": key of the uploaded rows or None, "row_count": number of rows uploaded,
+          "watermark": the table's new high-water mark, "deletes_key": key of the uploaded deletes or None,
+          "delete_count": number of deleted keys}
+        - str: the LSN of the last change read, to advance the slot to, or None if there were no changes
+    """
+    watermarks = watermarks or {}
+    changes = peek_changes(conn, slot_name, max_changes)
+    buffer = ChangeBuffer(table_list)
+    for _, _, data in changes:
+        change = parse_change(data)
+        if change is not None:
+            buffer.add(change)
+
+    suffix = codec_suffix(compression)
+    results = {}
+    for table_name in table_list:
+        rows = list(buffer.upserts[table_name].values())
+        deletes = list(buffer.deletes[table_name].values())
+        result = {
+            "key": None,
+            "row_count": len(rows),
+            "watermark": watermarks.get(table_name),
+            "deletes_key": None,
+            "delete_count": len(deletes),
+        }
+        if rows:
+            result["key"] = raw_key(table_name, timestamp, f"json{suffix}", key_layout)
+            upload_json_to_s3(
+                dump_to_json({table_name: rows}), bucket_name, result["key"], s3_client
+            )
+            result["watermark"] = max_last_updated(rows, result["watermark"])
+        if deletes:
+            result["deletes_key"] = deletes_key(
+                table_name, timestamp, compression, key_layout
+            )
+            upload_json_to_s3(
+                dump_to_json({table_name: deletes}),
+                bucket_name,
+                result["deletes_key"],
+                s3_client,
+            )
+        results[table_name] = result
+
+    print(f"Extracted {len(changes)} decoded changes from slot {slot_name}")
+    return results, (changes[-1][0] if changes else None)
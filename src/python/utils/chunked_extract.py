@@ -0,0 +1,169 @@
+import json
+import re
+import time
+from botocore.exceptions import ClientError
+from utils.extract_db import extract_db_chunk, DEFAULT_BATCH_SIZE
+from utils.extract_catalog import catalog_entry
+from utils.json_dumps import dump_to_json
+from utils.insert_into_s3 import upload_json_to_s3
+from utils.watermarks import max_last_updated
+from utils.raw_keys import raw_key
+from utils.compression import codec_suffix
+
+""" Resumable extraction of large tables in primary key chunks, with a checkpoint saved after every chunk """
+
+
+CHECKPOINT_PREFIX = "checkpoints"
+
+# the part number in a chunk's key, e.g. "-part-00001" in address/address-...-part-00001.json.gz
+CHUNK_PART = re.compile(r"-part-(\d+)(?=\.json(\.gz|\.zst)?$)")
+
+
+class ExtractIncompleteError(Exception):
+    """Raised when a run stops before every chunk is extracted; the next invocation resumes from the checkpoints"""
+
+
+def chunk_key(table_name, timestamp, part, key_layout="flat", compression=None):
+    """
+    Returns the key of a chunk, e.g. address/address-2025-05-29T11:06:18.399084-part-00001.json, or
+    address/dt=2025-05-29/hour=11/part-2025-05-29T11:06:18.399084-part-00001.json in the "hive" key layout,
+    followed by the codec suffix if the chunk is compressed (e.g. ...-part-00001.json.gz)
+    """
+    key = raw_key(table_name, timestamp, "json", key_layout)
+    return f"{key[:-len('.json')]}-part-{part:05d}.json{codec_suffix(compression)}"
+
+
+def chunk_keys(last_chunk_key):
+    """Returns the keys of every chunk of an extract, from the first one up to and including last_chunk_key"""
+    match = CHUNK_PART.search(last_chunk_key)
+    return [
+        f"{last_chunk_key[:match.start()]}-part-{part:05d}{last_chunk_key[match.end():]}"
+        for part in range(1, int(match[1]) + 1)
+    ]
+
+
+def checkpoint_key(table_name):
+    return f"{CHECKPOINT_PREFIX}/{table_name}.json"
+
+
+def read_checkpoint(table_name, bucket_name, s3_client):
+    """
+    Returns the checkpoint saved for a table by an unfinished chunked run, or None if there isn't one.
+
+    A checkpoint is a dict with:
+    - "timestamp": the run timestamp used in the keys of all of the run's chunks
+    - "last_id": primary key of the last extracted row
+    - "part": number of chunks written so far
+    - "row_count": number of rows extracted so far
+    - "watermark": max(last_updated) of the rows extracted so far
+    - "complete": True once every chunk of the table has been written
+    - "key_layout": key layout of the run's chunks, see utils/raw_keys.py
+    - "compression": codec of the run's chunks, or None, see utils/compression.py
+    """
+    try:
+        response = s3_client.get_object(
+            Bucket=bucket_name, Key=checkpoint_key(table_name)
+        )
+        return json.loads(response["Body"].read().decode("utf-8"))
+    except ClientError as err:
+        if err.response["Error"]["Code"] not in ["404", "NoSuchKey"]:
+            raise err
+    return None
+
+
+def write_checkpoint(checkpoint, table_name, bucket_name, s3_client):
+    s3_client.put_object(
+        Body=json.dumps(checkpoint),
+        Bucket=bucket_name,
+        Key=checkpoint_key(table_name),
+    )
+
+
+def delete_checkpoints(table_list, bucket_name, s3_client):
+    """Removes the checkpoints of a finished run, so the next run starts from scratch"""
+    s3_client.delete_objects(
+        Bucket=bucket_name,
+        Delete={"Objects": [{"Key": checkpoint_key(table)} for table in table_list]},
+    )
+
+
+def extract_table_in_chunks(
+    table_name,
+    timestamp,
+    bucket_name,
+    s3_client,
+    conn,
+    last_updated=None,
+    chunk_size=DEFAULT_BATCH_SIZE,
+    checkpoint=None,
+    deadline=None,
+    key_layout="flat",
+    compression=None,
+):
+    """
+    This function:
+    - pages through a table by primary key (extract_db_chunk), chunk_size rows at a time
+    - uploads each chunk as its own raw json object (see chunk_key), in the same {table: [rows]} layout as a whole table
+    - saves a checkpoint after every uploaded chunk
+    - if a checkpoint is given, carries on after its last chunk instead of starting again
+    - stops after the current chunk once the deadline (a time.monotonic() value) has passed, leaving the rest
+      of the table for the next invocation
+
+    Arguments:
+    - table_name (str): name of the table to extract
+    - timestamp (str): run timestamp used in the chunk keys (ignored when resuming, the checkpoint's is used)
+    - bucket_name (str): the name of the raw data bucket, where the chunks and checkpoints are saved
+    - s3_client: a boto3 s3 client
+    - conn (Connection): an open database connection
+    - last_updated (str): only extract rows updated after this timestamp, if given
+    - chunk_size (int): rows per chunk
+    - checkpoint (dict): the table's checkpoint from read_checkpoint, to resume from
+    - deadline (float): time.monotonic() value after which no new chunk is started
+    - key_layout (str): "flat" or "hive", see utils/raw_keys.py (ignored when resuming, the checkpoint's is used)
+    - compression (str): None, "gzip" or "zstd" (ignored when resuming, the checkpoint's is used)
+
+    Returns:
+    - dict: the table's latest checkpoint (see read_checkpoint)
+    """
+    checkpoint = checkpoint or {
+        "timestamp": timestamp,
+        "last_id": 0,
+        "part": 0,
+        "row_count": 0,
+        "watermark": last_updated,
+        "complete": False,
+        "key_layout": key_layout,
+        "compression": compression,
+    }
+    while not checkpoint["complete"]:
+        if deadline is not None and time.monotonic() > deadline:
+            print(
+                f"Stopped extracting {table_name} after {checkpoint['part']} chunks, to resume on the next run"
+            )
+            break
+        rows = extract_db_chunk(
+            table_name, last_updated, checkpoint["last_id"], chunk_size, conn=conn
+        )
+        if rows:
+            part = checkpoint["part"] + 1
+            key = chunk_key(
+                table_name,
+                checkpoint["timestamp"],
+                part,
+                checkpoint.get("key_layout", "flat"),
+                checkpoint.get("compression"),
+            )
+            upload_json_to_s3(
+                dump_to_json({table_name: rows}), bucket_name, key, s3_client
+            )
+            checkpoint = {
+                **checkpoint,
+                "last_id": rows[-1][catalog_entry(table_name)["key"]],
+                "part": part,
+                "row_count": checkpoint["row_count"] + len(rows),
+                "watermark": max_last_updated(rows, checkpoint["watermark"]),
+            }
+        if len(rows) < chunk_size:
+            checkpoint = {**checkpoint, "complete": True}
+        write_checkpoint(checkpoint, table_name, bucket_name, s3_client)
+    return checkpoint
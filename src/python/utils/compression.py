@@ -0,0 +1,94 @@
+import gzip
+import io
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+""" Compression codecs of raw data files: the codec is recorded in the key suffix and in ContentEncoding """
+
+
+# codec -> key suffix; the codec name is also the object's ContentEncoding
+CODECS = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def check_codec(codec):
+    """
+    Raises ValueError if codec isn't one of CODECS, or ImportError if it needs a library that isn't installed.
+    None (no compression) is always valid.
+    """
+    if codec is None:
+        return
+    if codec not in CODECS:
+        raise ValueError(
+            f"Invalid compression: {codec}, should be one of {list(CODECS)}"
+        )
+    if codec == "zstd" and zstandard is None:
+        raise ImportError("zstd compression needs the zstandard package")
+
+
+def codec_suffix(codec):
+    """Returns the key suffix of a codec, e.g. ".gz" for "gzip", or "" for no compression"""
+    check_codec(codec)
+    return CODECS[codec] if codec else ""
+
+
+def codec_from_key(key):
+    """Returns the codec recorded in a key or filename's suffix, e.g. "gzip" for "address-...json.gz", or None"""
+    for codec, suffix in CODECS.items():
+        if key.endswith(suffix):
+            return codec
+    return None
+
+
+def strip_codec_suffix(key):
+    """Returns the key without its codec suffix, e.g. "address-...json" for "address-...json.gz" """
+    codec = codec_from_key(key)
+    return key[: -len(CODECS[codec])] if codec else key
+
+
+def content_encoding_args(codec):
+    """Returns the extra put_object / create_multipart_upload arguments recording a codec"""
+    return {"ContentEncoding": codec} if codec else {}
+
+
+def compress(data, codec):
+    """
+    Compresses a whole document in one go.
+
+    Arguments:
+    - data (str or bytes): the document (str is encoded as utf-8)
+    - codec (str): "gzip" or "zstd"
+
+    Returns:
+    - bytes: the compressed document
+    """
+    check_codec(codec)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    if codec == "gzip":
+        return gzip.compress(data)
+    return zstandard.ZstdCompressor().compress(data)
+
+
+def compressing_writer(fileobj, codec):
+    """
+    Wraps a binary file-like object (e.g. an S3MultipartWriter) so that whatever is written is compressed on the way.
+    Closing the returned writer finishes the compressed stream, but doesn't close fileobj.
+    """
+    check_codec(codec)
+    if codec == "gzip":
+        return gzip.GzipFile(fileobj=fileobj, mode="wb")
+    return zstandard.ZstdCompressor().stream_writer(fileobj, closefd=False)
+
+
+def decompressing_reader(body, codec):
+    """
+    Wraps a binary file-like object (e.g. an s3 object's "Body") so that it is decompressed as it is read,
+    without downloading or decompressing the whole object first. Lines can be iterated over.
+    """
+    check_codec(codec)
+    if codec == "gzip":
+        return gzip.GzipFile(fileobj=body, mode="rb")
+    return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(body))
@@ -0,0 +1,116 @@
+from utils.extract_db import build_extract_query
+from utils.extract_catalog import catalog_entry
+from utils.s3_multipart_writer import S3MultipartWriter, MIN_PART_SIZE
+from utils.compression import codec_from_key, compressing_writer, content_encoding_args
+
+COPY_FORMATS = {
+    "csv": ("FORMAT csv, HEADER true", "csv"),
+    "binary": ("FORMAT binary", "pgcopy"),
+}
+
+# COPY formats the transform lambda can read back from the raw data bucket (json_to_pd_dataframe has no reader for
+# Postgres' binary format, and doesn't list .pgcopy files)
+RAW_COPY_FORMATS = ["csv"]
+
+
+def copy_table_to_s3(
+    table_name,
+    bucket_name,
+    key,
+    s3_client,
+    conn,
+    last_updated=None,
+    copy_format="csv",
+    part_size=MIN_PART_SIZE,
+    in_snapshot=False,
+):
+    """
+    This function:
+    - runs COPY (SELECT ...) TO STDOUT for a table, so Postgres itself formats the rows
+    - streams the COPY output, chunk by chunk, straight into an s3 multipart upload (no per-row python objects are built)
+    - in the same REPEATABLE READ snapshot, reads max(last_updated) of the copied rows for the table's watermark
+    - doesn't create an object if no rows were copied
+    - if the key ends with a codec suffix (".gz" or ".zst"), compresses the COPY output on the way with that codec
+
+    Arguments:
+    - table_name (str): name of the table to extract
+    - bucket_name (str): the name of the target s3 bucket
+    - key (str): key of the object to write
+    - s3_client: a boto3 s3 client
+    - conn (Connection): an open database connection
+    - last_updated (str): only copy rows updated after this timestamp, if given
+    - copy_format (str): "csv" (with a header row, readable by json_to_pd_dataframe) or
+      "binary" (Postgres binary COPY format, for reloading into Postgres with COPY FROM)
+    - part_size (int): size in bytes of each multipart upload part
+    - in_snapshot (bool): True if conn is already in a read-only snapshot transaction (see utils/preflight.py),
+      which is then used instead of starting and committing a new one
+
+    Returns:
+    - dict: {"row_count": number of rows copied, "watermark": max(last_updated) of the copied rows}
+
+    Raises:
+    - ValueError: if copy_format isn't supported
+    - Exception: if the copy or the upload fails
+    """
+    if copy_format not in COPY_FORMATS:
+        raise ValueError(f"Invalid copy format: {copy_format}")
+    copy_options = COPY_FORMATS[copy_format][0]
+    query = build_extract_query(table_name, last_updated)
+    codec = codec_from_key(key)
+    writer = S3MultipartWriter(
+        bucket_name,
+        key,
+        s3_client,
+        part_size=part_size,
+        extra_args=content_encoding_args(codec),
+    )
+    try:
+        if not in_snapshot:
+            conn.run("START TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY;")
+        stream = compressing_writer(writer, codec) if codec else writer
+        conn.run(f"COPY ({query}) TO STDOUT WITH ({copy_options});", stream=stream)
+        if codec:
+            stream.close()
+        row_count = conn.row_count
+        watermark = None
+        if row_count > 0:
+            max_query = build_extract_query(
+                table_name,
+                last_updated,
+                select=f"max({catalog_entry(table_name)['watermark']})",
+            )
+            watermark = conn.run(f"{max_query};")[0][0]
+        if not in_snapshot:
+            conn.run("COMMIT;")
+    except Exception as error:
+        print(f"Failed to copy {table_name} from DB: {error}")
+        writer.abort()
+        if not in_snapshot:
+            try:
+                conn.run("ROLLBACK;")
+            except Exception:
+                pass
+        raise error
+    if row_count > 0:
+        writer.close()
+    else:
+        writer.abort()
+    if watermark is not None:
+        watermark = watermark.isoformat(sep=" ", timespec="microseconds")
+    return {"row_count": row_count, "watermark": watermark}
+
+
+def check_raw_copy_format(copy_format):
+    """
+    Raises ValueError if copy_format can't be written to the raw data bucket (see RAW_COPY_FORMATS), so that a
+    "copy" extract never advances the watermarks past rows the transform lambda can't read.
+    """
+    if copy_format not in RAW_COPY_FORMATS:
+        raise ValueError(
+            f"Invalid copy format for the raw data bucket: {copy_format}, should be one of {RAW_COPY_FORMATS}"
+        )
+
+
+def copy_file_extension(copy_format):
+    """Returns the raw file extension used for a COPY format, e.g. "csv" """
+    return COPY_FORMATS[copy_format][1]
@@ -0,0 +1,119 @@
+import io
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from botocore.exceptions import ClientError
+from utils.json_to_pd_dataframe import CHUNK_SUFFIX
+from utils.raw_keys import list_raw_files, raw_file_timestamp
+from utils.raw_reader import iter_raw_dataframes
+
+""" Incremental state of dim_location: the delivery location of every sales order extracted so far """
+
+
+DELIVERY_LOCATIONS_KEY = "state/delivery_locations.parquet"
+
+
+def read_delivery_locations(bucket_name, s3_client):
+    """
+    This function:
+    - reads the saved delivery location ids (a single column parquet file, state/delivery_locations.parquet)
+    - reads the timestamp of the newest sales_order raw file they were collected from, kept in the file's metadata
+    - returns no ids and no timestamp if there is no saved state yet, so every sales_order file is read
+
+    Arguments:
+    - bucket_name (str): the name of the raw data bucket
+    - s3_client: a boto3 s3 client
+
+    Returns:
+    - tuple: (pd.Series of agreed_delivery_location_id, processed_until timestamp or None)
+    """
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=DELIVERY_LOCATIONS_KEY)
+    except ClientError as err:
+        if err.response["Error"]["Code"] not in ["404", "NoSuchKey"]:
+            raise err
+        return pd.Series([], dtype="int64", name="agreed_delivery_location_id"), None
+    table = pq.read_table(io.BytesIO(response["Body"].read()))
+    processed_until = (table.schema.metadata or {}).get(b"processed_until")
+    return (
+        table.column("agreed_delivery_location_id").to_pandas(),
+        processed_until.decode("utf-8") if processed_until else None,
+    )
+
+
+def write_delivery_locations(location_ids, processed_until, bucket_name, s3_client):
+    """
+    Saves the delivery location ids as a single column parquet file, with processed_until in its metadata.
+
+    Arguments:
+    - location_ids (pd.Series): the unique agreed_delivery_location_ids
+    - processed_until (str): timestamp of the newest sales_order raw file read
+    - bucket_name (str): the name of the raw data bucket
+    - s3_client: a boto3 s3 client
+    """
+    table = pa.table(
+        {"agreed_delivery_location_id": pa.array(location_ids, pa.int64())}
+    ).replace_schema_metadata({"processed_until": processed_until})
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer)
+    s3_client.put_object(
+        Body=buffer.getvalue(), Bucket=bucket_name, Key=DELIVERY_LOCATIONS_KEY
+    )
+    print(
+        f"Successfully uploaded {DELIVERY_LOCATIONS_KEY} to s3://{bucket_name}/{DELIVERY_LOCATIONS_KEY}"
+    )
+
+
+def update_delivery_locations(bucket_name, s3_client):
+    """
+    This function:
+    - reads the saved delivery location ids, and the timestamp of the newest sales_order file they came from
+    - lists only the sales_order raw files made after that timestamp (see utils/raw_keys.py)
+    - reads the new files concurrently (see utils/raw_reader.py), each once (all the chunks of a chunked extract are
+      read together), decoding only their agreed_delivery_location_id column
+    - adds the new ids to the saved ones, and saves them with the newest file's timestamp
+
+    Each run only reads the sales_order files extracted since the last one, instead of every file ever
+    extracted. Deleting state/delivery_locations.parquet makes the next run rebuild it from every file.
+
+    Arguments:
+    - bucket_name (str): the name of the raw data bucket
+    - s3_client: a boto3 s3 client
+
+    Returns:
+    - pd.DataFrame: a single column dataframe of the unique agreed_delivery_location_ids, sorted
+    """
+    location_ids, processed_until = read_delivery_locations(bucket_name, s3_client)
+    files = {}
+    for file in list_raw_files(
+        "sales_order", bucket_name, s3_client, since=processed_until
+    ):
+        timestamp = raw_file_timestamp(file, "sales_order")
+        if timestamp and (processed_until is None or timestamp > processed_until):
+            # every chunk of a chunked extract is read with its first chunk
+            files.setdefault(CHUNK_SUFFIX.sub("-part-", file), (timestamp, file))
+
+    if files:
+        new_ids = []
+        for _, sales_order_df in iter_raw_dataframes(
+            [file for _, file in files.values()],
+            "sales_order",
+            bucket_name,
+            columns=["agreed_delivery_location_id"],
+        ):
+            if "agreed_delivery_location_id" in sales_order_df:
+                new_ids.append(
+                    sales_order_df["agreed_delivery_location_id"].drop_duplicates()
+                )
+        location_ids = (
+            pd.concat([location_ids, *new_ids], ignore_index=True)
+            .dropna()
+            .astype("int64")
+            .drop_duplicates()
+            .sort_values(ignore_index=True)
+        )
+        processed_until = max(timestamp for timestamp, _ in files.values())
+        write_delivery_locations(location_ids, processed_until, bucket_name, s3_client)
+        print(f"Read {len(files)} new sales_order files for the delivery locations")
+
+    return pd.DataFrame({"agreed_delivery_location_id": location_ids.to_numpy()})
@@ -0,0 +1,174 @@
+"""Declarative catalog of what is extracted from each totesys table"""
+
+# For every source table:
+# - "key": primary key, used to page through the table in "chunked" mode
+# - "watermark": column compared with the table's high-water mark to find new rows
+# - "columns": the columns extracted, in order, each with the postgres type it is extracted as.
+#   Numerics are declared with their precision and scale, as a bare ::numeric cast would drop them
+#   (and the parquet extract would then store them as strings rather than decimals).
+#   Columns the transforms never use (e.g. created_at of the dimension tables, counterparty contacts,
+#   department manager) are left out, so they don't cross the wire, get serialised or land in s3.
+#   Tables that aren't transformed yet keep all of their columns.
+EXTRACT_CATALOG = {
+    "address": {
+        "key": "address_id",
+        "watermark": "last_updated",
+        "columns": {
+            "address_id": "int",
+            "address_line_1": "varchar",
+            "address_line_2": "varchar",
+            "district": "varchar",
+            "city": "varchar",
+            "postal_code": "varchar",
+            "country": "varchar",
+            "phone": "varchar",
+            "last_updated": "timestamp",
+        },
+    },
+    "counterparty": {
+        "key": "counterparty_id",
+        "watermark": "last_updated",
+        "columns": {
+            "counterparty_id": "int",
+            "counterparty_legal_name": "varchar",
+            "legal_address_id": "int",
+            "last_updated": "timestamp",
+        },
+    },
+    "currency": {
+        "key": "currency_id",
+        "watermark": "last_updated",
+        "columns": {
+            "currency_id": "int",
+            "currency_code": "varchar",
+            "last_updated": "timestamp",
+        },
+    },
+    "department": {
+        "key": "department_id",
+        "watermark": "last_updated",
+        "columns": {
+            "department_id": "int",
+            "department_name": "varchar",
+            "location": "varchar",
+            "last_updated": "timestamp",
+        },
+    },
+    "design": {
+        "key": "design_id",
+        "watermark": "last_updated",
+        "columns": {
+            "design_id": "int",
+            "design_name": "varchar",
+            "file_location": "varchar",
+            "file_name": "varchar",
+            "last_updated": "timestamp",
+        },
+    },
+    "payment": {
+        "key": "payment_id",
+        "watermark": "last_updated",
+        "columns": {
+            "payment_id": "int",
+            "created_at": "timestamp",
+            "last_updated": "timestamp",
+            "transaction_id": "int",
+            "counterparty_id": "int",
+            "payment_amount": "numeric(10,2)",
+            "currency_id": "int",
+            "payment_type_id": "int",
+            "paid": "boolean",
+            "payment_date": "varchar",
+            "company_ac_number": "int",
+            "counterparty_ac_number": "int",
+        },
+    },
+    "payment_type": {
+        "key": "payment_type_id",
+        "watermark": "last_updated",
+        "columns": {
+            "payment_type_id": "int",
+            "payment_type_name": "varchar",
+            "created_at": "timestamp",
+            "last_updated": "timestamp",
+        },
+    },
+    "purchase_order": {
+        "key": "purchase_order_id",
+        "watermark": "last_updated",
+        "columns": {
+            "purchase_order_id": "int",
+            "created_at": "timestamp",
+            "last_updated": "timestamp",
+            "staff_id": "int",
+            "counterparty_id": "int",
+            "item_code": "varchar",
+            "item_quantity": "int",
+            "item_unit_price": "numeric(10,2)",
+            "currency_id": "int",
+            "agreed_delivery_date": "varchar",
+            "agreed_payment_date": "varchar",
+            "agreed_delivery_location_id": "int",
+        },
+    },
+    "sales_order": {
+        "key": "sales_order_id",
+        "watermark": "last_updated",
+        "columns": {
+            "sales_order_id": "int",
+            "created_at": "timestamp",
+            "last_updated": "timestamp",
+            "design_id": "int",
+            "staff_id": "int",
+            "counterparty_id": "int",
+            "units_sold": "int",
+            "unit_price": "numeric(10,2)",
+            "currency_id": "int",
+            "agreed_delivery_date": "varchar",
+            "agreed_payment_date": "varchar",
+            "agreed_delivery_location_id": "int",
+        },
+    },
+    "staff": {
+        "key": "staff_id",
+        "watermark": "last_updated",
+        "columns": {
+            "staff_id": "int",
+            "first_name": "varchar",
+            "last_name": "varchar",
+            "department_id": "int",
+            "email_address": "varchar",
+            "last_updated": "timestamp",
+        },
+    },
+    "transaction": {
+        "key": "transaction_id",
+        "watermark": "last_updated",
+        "columns": {
+            "transaction_id": "int",
+            "transaction_type": "varchar",
+            "sales_order_id": "int",
+            "purchase_order_id": "int",
+            "created_at": "timestamp",
+            "last_updated": "timestamp",
+        },
+    },
+}
+
+
+def catalog_entry(table_name):
+    """Returns the catalog entry of a table, raising Exception("Invalid table name.") if it isn't in the catalog"""
+    if table_name not in EXTRACT_CATALOG:
+        raise Exception("Invalid table name.")
+    return EXTRACT_CATALOG[table_name]
+
+
+def select_list(table_name):
+    """
+    Returns the select list for a table's catalog columns, each cast to its catalog type, e.g.
+    "staff_id::int, first_name::varchar, ...". A cast column keeps its name in the result.
+    """
+    return ", ".join(
+        f"{column}::{column_type}"
+        for column, column_type in catalog_entry(table_name)["columns"].items()
+    )
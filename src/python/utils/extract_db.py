@@ -1,47 +1,247 @@
+import weakref
 from db.connection import connect_to_db, close_db
+from utils.extract_catalog import EXTRACT_CATALOG, catalog_entry, select_list
 
+TABLE_NAMES = list(EXTRACT_CATALOG)
 
-def extract_db(table_name, last_updated=None):
+DEFAULT_BATCH_SIZE = 5000
+
+"""Prepared extract statements of each connection, kept for as long as the (pooled) connection lives"""
+_prepared_statements = weakref.WeakKeyDictionary()
+
+
+def build_extract_query(table_name, last_updated=None, select=None):
+    """Builds the SELECT query (without a trailing semicolon) used to extract a table
+
+    Only the table's catalog columns are selected (see utils/extract_catalog.py).
+
+    Args:
+        table_name (string): name of the dbtable to extract data from
+        last_updated (string): optional timestamp, only rows whose watermark column is after it are selected
+        select (string): optional select list to use instead of the catalog columns, e.g. "max(last_updated)"
+
+    Returns:
+        string: the SELECT query
+
+    Raises:
+        Exception: if table_name is not one of the totesys tables
+    """
+    entry = catalog_entry(table_name)
+    query = f"SELECT {select or select_list(table_name)} FROM {table_name}"
+    if not last_updated:
+        return query
+    return f"{query} WHERE {entry['watermark']} > '{last_updated}'"
+
+
+def prepared_extract_statement(conn, table_name, incremental=False):
+    """Returns the prepared statement extracting a table's catalog columns on conn, preparing it on first use
+
+    Statements are parsed and planned by Postgres once per connection, then reused by every later run that
+    borrows the same pooled connection.
+
+    Args:
+        conn (Connection): an open database connection
+        table_name (string): name of the dbtable to extract data from
+        incremental (bool): if True, the statement takes a :last_updated parameter and only selects newer rows
+
+    Returns:
+        PreparedStatement: run it with statement.run() (or statement.run(last_updated=...) if incremental)
+
+    Raises:
+        Exception: if table_name is not one of the totesys tables
+    """
+    statements = _prepared_statements.setdefault(conn, {})
+    if (table_name, incremental) not in statements:
+        query = build_extract_query(table_name)
+        if incremental:
+            query += f" WHERE {catalog_entry(table_name)['watermark']} > :last_updated"
+        statements[(table_name, incremental)] = conn.prepare(query)
+    return statements[(table_name, incremental)]
+
+
+def extract_db(table_name, last_updated=None, conn=None):
     """Lambda function that extracts data from a database table and returns it as a formatted dictionary
 
+    The table's catalog columns are selected with a prepared statement, reused for as long as the connection lives.
+
     Args:
         table_name (string): name of the dbtable to extract data from
+        last_updated (string): optional timestamp, only rows updated after it are extracted
+        conn (Connection): optional open connection (e.g. borrowed with db_connection), which is left open.
+            If not given, a new connection is opened and closed for this call.
 
     Returns:
         dict: dictionary with table name as the key and a list  value containing each table row as a dict
     """
 
+    own_connection = conn is None
+    try:
+        if own_connection:
+            conn = connect_to_db()
+        columns, response = fetch_table(table_name, last_updated, conn)
+        columns = [column["name"] for column in columns]
+        table_dict = {table_name: [dict(zip(columns, row)) for row in response]}
+        return table_dict
+
+    except Exception as error:
+        print(f"Failed to extract from DB: {error}")
+        raise error
+    finally:
+        if own_connection and conn:
+            close_db(conn)
+
+
+def fetch_table(table_name, last_updated, conn):
+    """Runs a table's prepared extract statement on conn and returns the result exactly as pg8000 gives it
+
+    Args:
+        table_name (string): name of the dbtable to extract data from
+        last_updated (string): optional timestamp, only rows updated after it are extracted
+        conn (Connection): an open database connection
+
+    Returns:
+        tuple: (columns, rows) where columns is the statement's list of column dicts, including each column's
+        "name" and postgres "type_oid", and rows is a list of rows, each row as a list
+    """
+    if last_updated:
+        statement = prepared_extract_statement(conn, table_name, incremental=True)
+        rows = statement.run(last_updated=last_updated)
+    else:
+        statement = prepared_extract_statement(conn, table_name)
+        rows = statement.run()
+    return statement.columns, rows
+
+
+def extract_db_in_batches(
+    table_name,
+    last_updated=None,
+    batch_size=DEFAULT_BATCH_SIZE,
+    conn=None,
+    in_snapshot=False,
+):
+    """Generator that streams a database table through a server-side cursor, one batch of rows at a time
+
+    Only batch_size rows are ever held in memory, so peak memory is set by the batch size rather than the table size.
+
+    Args:
+        table_name (string): name of the dbtable to extract data from
+        last_updated (string): optional timestamp, only rows updated after it are extracted
+        batch_size (int): number of rows fetched from the cursor per round trip
+        conn (Connection): optional open connection, which is left open. If not given, one is opened for this call.
+        in_snapshot (bool): True if conn is already in a read-only snapshot transaction (see utils/preflight.py),
+            which is then used instead of starting and committing a new transaction
+
+    Yields:
+        list: a list of up to batch_size table rows, each row as a dict
+
+    Raises:
+        Exception: if the table name is invalid or the extraction fails
+    """
+    for columns, rows in fetch_row_batches(
+        table_name, last_updated, batch_size, conn, in_snapshot
+    ):
+        names = [column["name"] for column in columns]
+        yield [dict(zip(names, row)) for row in rows]
+
+
+def fetch_row_batches(
+    table_name,
+    last_updated=None,
+    batch_size=DEFAULT_BATCH_SIZE,
+    conn=None,
+    in_snapshot=False,
+):
+    """Generator behind extract_db_in_batches, yielding each batch exactly as pg8000 returns it
+
+    Args:
+        see extract_db_in_batches
+
+    Yields:
+        tuple: (columns, rows) where columns is conn.columns (a list of dicts, including each column's
+        "name" and postgres "type_oid") and rows is a list of up to batch_size rows, each row as a list
+
+    Raises:
+        Exception: if the table name is invalid or the extraction fails
+    """
+
+    own_connection = conn is None
+    in_transaction = False
+    cursor_open = False
+    try:
+        query = build_extract_query(table_name, last_updated)
+        if own_connection:
+            conn = connect_to_db()
+        if not in_snapshot:
+            conn.run("START TRANSACTION READ ONLY;")
+            in_transaction = True
+        conn.run(f"DECLARE extract_cursor NO SCROLL CURSOR FOR {query};")
+        cursor_open = True
+        while True:
+            rows = conn.run(f"FETCH FORWARD {int(batch_size)} FROM extract_cursor;")
+            if not rows:
+                break
+            yield conn.columns, rows
+            if len(rows) < batch_size:
+                break
+        conn.run("CLOSE extract_cursor;")
+        cursor_open = False
+        if in_transaction:
+            conn.run("COMMIT;")
+            in_transaction = False
+    except Exception as error:
+        print(f"Failed to extract from DB: {error}")
+        raise error
+    finally:
+        """Also reached if the caller stops consuming batches early"""
+        if in_transaction:
+            try:
+                conn.run("ROLLBACK;")
+            except Exception:
+                pass
+        elif cursor_open:
+            try:
+                conn.run("CLOSE extract_cursor;")
+            except Exception:
+                pass
+        if own_connection and conn:
+            close_db(conn)
+
+
+def extract_db_chunk(
+    table_name, last_updated=None, after_id=0, chunk_size=DEFAULT_BATCH_SIZE, conn=None
+):
+    """Extracts the next chunk of a table by primary key (keyset pagination)
+
+    Runs `... WHERE {key} > after_id ORDER BY {key} LIMIT chunk_size` on the table's catalog key, so each chunk is
+    an index range scan that starts where the previous chunk ended, however far into the table it is. Passing the last id of a
+    chunk as after_id returns the next one, which lets an extraction be resumed from any completed chunk.
+
+    Args:
+        table_name (string): name of the dbtable to extract data from
+        last_updated (string): optional timestamp, only rows updated after it are extracted
+        after_id (int): only rows with a primary key greater than this are extracted
+        chunk_size (int): maximum number of rows in the chunk
+        conn (Connection): optional open connection, which is left open. If not given, one is opened for this call.
+
+    Returns:
+        list: up to chunk_size table rows, each row as a dict, in primary key order
+    """
+
+    own_connection = conn is None
     try:
-        conn = connect_to_db()
-        if table_name in [
-            "address",
-            "counterparty",
-            "currency",
-            "department",
-            "design",
-            "payment",
-            "payment_type",
-            "purchase_order",
-            "sales_order",
-            "staff",
-            "transaction",
-        ]:
-            if not last_updated:
-                query = f"SELECT * FROM {table_name};"
-            else:
-                query = (
-                    f"SELECT * FROM {table_name} WHERE last_updated > '{last_updated}';"
-                )
-            response = conn.run(query)
-            columns = [column["name"] for column in conn.columns]
-            table_dict = {table_name: [dict(zip(columns, row)) for row in response]}
-            return table_dict
-        else:
-            raise Exception("Invalid table name.")
+        key = catalog_entry(table_name)["key"]
+        query = build_extract_query(table_name, last_updated)
+        query += " AND" if last_updated else " WHERE"
+        query += f" {key} > :after_id ORDER BY {key} LIMIT :chunk_size;"
+        if own_connection:
+            conn = connect_to_db()
+        response = conn.run(query, after_id=after_id, chunk_size=chunk_size)
+        columns = [column["name"] for column in conn.columns]
+        return [dict(zip(columns, row)) for row in response]
 
     except Exception as error:
         print(f"Failed to extract from DB: {error}")
         raise error
     finally:
-        if conn:
+        if own_connection and conn:
             close_db(conn)
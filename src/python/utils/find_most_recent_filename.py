@@ -1,11 +1,18 @@
-import boto3
 from botocore.exceptions import ClientError
+from utils.raw_keys import list_raw_files, raw_file_timestamp
+from utils.aws_clients import get_client
+from utils.run_manifest import manifest_file
+from utils.table_cache import cached_value
 
 
-def find_most_recent_filename(table_name, bucket_name, file_type="json"):
+def find_most_recent_filename(table_name, bucket_name, file_type="json", manifest=None):
     """
     This function:
+    - if given the previous stage's run manifest (see utils/run_manifest.py), returns the table's file from it,
+      or None if the run produced nothing for the table, without listing the bucket or reading last_updated.txt
     - looks through files (of default json type, or parquet type if specified) in a specified s3 bucket, with a specified table name
+    - reads the date/time in last_updated.txt first, so only the files from that date/time onwards are listed
+      (older files are skipped with StartAfter, so finding the new file doesn't get slower as files accumulate)
     - selects the most recent file starting with this table name
     - compares the date/time in this file with the date/time in the last_updated.txt
     - if date/time are the same, returns string of the filename
@@ -13,12 +20,17 @@ def find_most_recent_filename(table_name, bucket_name, file_type="json"):
     These functionalities are implemented using dependency injection.
 
     Arguments: table_name (str): a specified table name from the original OLTP database
+               manifest (dict): the previous stage's run manifest, if the lambda was given one
 
     Returns: if a new file is found in the specified bucket containing the specified table_name,
     returns a string containing that file's name, otherwise raises an appropriate exception.
 
     """
-    files = find_files_with_specified_table_name(table_name, bucket_name)
+    if manifest is not None:
+        return manifest_file(manifest, table_name)
+    files = find_files_with_specified_table_name(
+        table_name, bucket_name, since=read_last_updated(bucket_name)
+    )
     most_recent_file = find_most_recent_file(files, table_name, bucket_name, file_type)
     return most_recent_file
 
@@ -26,25 +38,43 @@ def find_most_recent_filename(table_name, bucket_name, file_type="json"):
 """The below functions are used as dependencies, injected within find_most_recent_filename:"""
 
 
-def find_files_with_specified_table_name(table_name, bucket_name):
+def find_files_with_specified_table_name(table_name, bucket_name, since=None):
     """
     This function:
-    - Retrieves a list of files in a specified s3 bucket (bucket_name) whose names contain the specified table_name
+    - Retrieves a list of raw files in a specified s3 bucket (bucket_name), in the table_name folder
+    - files are listed in both key layouts, {table}/{table}-{timestamp}.json and {table}/dt=YYYY-MM-DD/hour=HH/part-*.json
+      (see utils/raw_keys.py); other tables' folders whose names start with table_name (e.g. payment_type for payment)
+      are not listed
 
     Arguments:
     - table_name (str): name contained within the name of the file you're searching for
     - bucket_name (str): the name of the s3 bucket you're searching in
+    - since (str): if given, only files made at or after this date/time are listed
 
     Returns:
-    - list[str]: A list of filenames in the s3 bucket containing table_name
+    - list[str]: A list of filenames in the s3 bucket containing table_name, relative to the table's folder
     """
-    s3 = boto3.resource("s3")
-    bucket = s3.Bucket(bucket_name)
-    files = []
-    for obj in bucket.objects.filter(Prefix=table_name):
-        if "" not in obj.key.split("/"):
-            files.append(obj.key.split("/")[1])
-    return files
+    return list_raw_files(table_name, bucket_name, get_client("s3"), since=since)
+
+
+def read_last_updated(bucket_name):
+    """Returns the date/time saved in last_updated.txt by the last extract run, or None if there isn't one"""
+    try:
+        return get_last_updated(bucket_name)
+    except ClientError:
+        return None
+
+
+def get_last_updated(bucket_name):
+    """Returns the date/time saved in last_updated.txt, read only once per transform run (see utils/table_cache.py)"""
+
+    def read():
+        response = get_client("s3").get_object(
+            Bucket=bucket_name, Key="last_updated.txt"
+        )
+        return response["Body"].read().decode("utf-8").strip()
+
+    return cached_value(("last_updated", bucket_name), read)
 
 
 def find_most_recent_file(files, table_name, bucket_name, filetype="json"):
@@ -62,18 +92,20 @@ def find_most_recent_file(files, table_name, bucket_name, filetype="json"):
 
     """
     try:
-        most_recent_file = sorted(files, reverse=True)[0]
+        most_recent_file = sorted(
+            files,
+            key=lambda file: (raw_file_timestamp(file, table_name) or "", file),
+            reverse=True,
+        )[0]
         if filetype == "json":
-            file_date_time = most_recent_file[len(table_name) + 1 : -5]
+            file_date_time = raw_file_timestamp(most_recent_file, table_name)
         elif filetype == "parquet":
             file_date_time = most_recent_file[
                 len(table_name) + 1 : -8
             ]  # Removes ".parquet"# Get only "2025-05-29T11:06"
             # file_date_time = file_datetime_full[:16]  # Get only "2025-05-29T11:06"
 
-        s3 = boto3.resource("s3")
-        last_updated_file = s3.Object(bucket_name, "last_updated.txt")
-        last_update = last_updated_file.get()["Body"].read().decode("utf-8").strip()
+        last_update = get_last_updated(bucket_name)
         print(f"last_update: {last_update}")
         print(f"file_date: {file_date_time}")
 
@@ -0,0 +1,63 @@
+import hashlib
+import json
+from botocore.exceptions import ClientError
+
+FINGERPRINTS_KEY = "fingerprints.json"
+
+
+def fingerprint(payload):
+    """
+    Returns the content hash of a table payload: the sha256 hex digest of the serialised document,
+    taken before any compression so that it doesn't depend on the codec.
+
+    Arguments:
+    - payload (str or bytes): the serialised table, e.g. from dump_rows_to_json, whose encoding is the same
+      whichever json backend is installed (see utils/json_encoder.py)
+
+    Returns:
+    - str: the hex digest
+    """
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def read_fingerprints(bucket_name, s3_client):
+    """
+    This function:
+    - reads the per-table fingerprints of the last uploaded payloads (fingerprints.json)
+    - returns no fingerprints if there is no fingerprints.json yet, so every table is uploaded
+
+    Arguments:
+    - bucket_name (str): the name of the raw data bucket
+    - s3_client: a boto3 s3 client
+
+    Returns:
+    - dict: table name -> fingerprint of the table's last uploaded payload
+    """
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=FINGERPRINTS_KEY)
+        return json.loads(response["Body"].read().decode("utf-8"))
+    except ClientError as err:
+        if err.response["Error"]["Code"] not in ["404", "NoSuchKey"]:
+            raise err
+    return {}
+
+
+def write_fingerprints(fingerprints, bucket_name, s3_client):
+    """
+    Saves all per-table fingerprints as a single json object, like write_watermarks.
+
+    Arguments:
+    - fingerprints (dict): table name -> fingerprint
+    - bucket_name (str): the name of the raw data bucket
+    - s3_client: a boto3 s3 client
+    """
+    s3_client.put_object(
+        Body=json.dumps(fingerprints, sort_keys=True),
+        Bucket=bucket_name,
+        Key=FINGERPRINTS_KEY,
+    )
+    print(
+        f"Successfully uploaded {FINGERPRINTS_KEY} to s3://{bucket_name}/{FINGERPRINTS_KEY}"
+    )
@@ -1,11 +1,151 @@
+import json
 from botocore.exceptions import ClientError
+from utils.s3_multipart_writer import S3MultipartWriter, MIN_PART_SIZE
+from utils.compression import (
+    codec_from_key,
+    compress,
+    compressing_writer,
+    content_encoding_args,
+)
 
 
 def upload_json_to_s3(json_file, bucket_name, key, s3_client):
+    """
+    Uploads a document with a single put_object. If the key ends with a codec suffix (".gz" or ".zst",
+    see utils/compression.py), the document is compressed with that codec and ContentEncoding is set.
+    """
     try:
-        s3_client.put_object(Body=json_file, Bucket=bucket_name, Key=key)
+        codec = codec_from_key(key)
+        if codec:
+            s3_client.put_object(
+                Body=compress(json_file, codec),
+                Bucket=bucket_name,
+                Key=key,
+                **content_encoding_args(codec),
+            )
+        else:
+            s3_client.put_object(Body=json_file, Bucket=bucket_name, Key=key)
         print(f"Successfully uploaded {key} to s3://{bucket_name}/{key}")
 
     except ClientError as e:
         print(f"Failed to put object: {e}")
         raise e
+
+
+def upload_json_batches_to_s3(
+    batches, table_name, bucket_name, key, s3_client, part_size=MIN_PART_SIZE
+):
+    """
+    This function:
+    - takes an iterable of row batches (e.g. from extract_db_in_batches)
+    - serialises each batch as soon as it arrives and streams it into s3 with S3MultipartWriter
+    - writes exactly the same document as dump_to_json({table_name: rows}), so readers don't need to change
+    - doesn't create an object at all if there are no rows, just like the extract lambda does for empty tables
+    - if the key ends with a codec suffix (".gz" or ".zst"), compresses the stream on the way with that codec
+
+    Arguments:
+    - batches (iterable[list[dict]]): batches of table rows
+    - table_name (str): name of the table, used as the top level key of the json document
+    - bucket_name (str): the name of the target s3 bucket
+    - key (str): the key of the object to write
+    - s3_client: a boto3 s3 client
+    - part_size (int): size in bytes of each multipart upload part
+
+    Returns:
+    - int: the number of rows uploaded
+    """
+    codec = codec_from_key(key)
+    writer = None
+    stream = None
+    row_count = 0
+    try:
+        for batch in batches:
+            for row in batch:
+                if writer is None:
+                    writer = S3MultipartWriter(
+                        bucket_name,
+                        key,
+                        s3_client,
+                        part_size=part_size,
+                        extra_args=content_encoding_args(codec),
+                    )
+                    stream = compressing_writer(writer, codec) if codec else writer
+                    stream.write(json.dumps({table_name: []})[:-2].encode("utf-8"))
+                else:
+                    stream.write(b", ")
+                stream.write(json.dumps(row, default=str).encode("utf-8"))
+                row_count += 1
+        if writer is not None:
+            stream.write(b"]}")
+            if codec:
+                stream.close()
+            writer.close()
+        return row_count
+    except ClientError as e:
+        print(f"Failed to put object: {e}")
+        if writer is not None:
+            writer.abort()
+        raise e
+    except Exception:
+        if writer is not None:
+            writer.abort()
+        raise
+
+
+def upload_ndjson_to_s3(
+    rows, bucket_name, key, s3_client, compress=False, part_size=MIN_PART_SIZE
+):
+    """
+    This function:
+    - takes an iterator of table rows (dicts), e.g. flattened from extract_db_in_batches
+    - writes each row as one line of newline-delimited json (ndjson) as soon as it arrives
+    - streams the lines into s3 with S3MultipartWriter, so only up to part_size bytes are held in memory
+    - compresses the stream on the way with the codec of the key's suffix (".ndjson.gz" or ".ndjson.zst"),
+      or with gzip if compress is True
+    - doesn't create an object at all if there are no rows
+
+    Arguments:
+    - rows (iterable[dict]): table rows
+    - bucket_name (str): the name of the target s3 bucket
+    - key (str): the key of the object to write
+    - s3_client: a boto3 s3 client
+    - compress (bool): whether to gzip the object, whatever the key
+    - part_size (int): size in bytes of each multipart upload part
+
+    Returns:
+    - int: the number of rows uploaded
+    """
+    codec = "gzip" if compress else codec_from_key(key)
+    writer = None
+    stream = None
+    row_count = 0
+    try:
+        for row in rows:
+            if writer is None:
+                writer = S3MultipartWriter(
+                    bucket_name,
+                    key,
+                    s3_client,
+                    part_size=part_size,
+                    extra_args={
+                        "ContentType": "application/x-ndjson",
+                        **content_encoding_args(codec),
+                    },
+                )
+                stream = compressing_writer(writer, codec) if codec else writer
+            stream.write((json.dumps(row, default=str) + "\n").encode("utf-8"))
+            row_count += 1
+        if writer is not None:
+            if codec:
+                stream.close()
+            writer.close()
+        return row_count
+    except ClientError as e:
+        print(f"Failed to put object: {e}")
+        if writer is not None:
+            writer.abort()
+        raise e
+    except Exception:
+        if writer is not None:
+            writer.abort()
+        raise
@@ -0,0 +1,93 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+""" Typed json encoding of extracted rows, with formatters chosen once per column from the pg8000 type oids """
+
+
+def format_decimal(value):
+    """Fixed-point string of a Decimal, e.g. Decimal("3.50") -> "3.50" (never exponent notation)"""
+    return format(value, "f")
+
+
+# postgres type oids (see pg8000.converters) -> formatter returning a json-native value.
+# Timestamps and dates are formatted with str(), exactly as json.dumps(..., default=str) does,
+# so files written by either encoder read the same; decimals stay strings, in fixed-point notation.
+PG_TYPE_OIDS_TO_FORMATTER = {
+    17: str,  # bytea
+    1082: str,  # date
+    1083: str,  # time
+    1114: str,  # timestamp
+    1184: str,  # timestamptz
+    1700: format_decimal,  # numeric
+    2950: str,  # uuid
+}
+
+
+def formatter_for_column(column):
+    """
+    Returns the formatter for a column described by pg8000's conn.columns, or None if its values
+    (ints, floats, strings, booleans, json) can be serialised as they are.
+    """
+    return PG_TYPE_OIDS_TO_FORMATTER.get(column["type_oid"])
+
+
+def make_row_encoder(columns):
+    """
+    Binds the formatters of a query's columns once, and returns a function turning each result row
+    (a list, as returned by conn.run) into a dict of json-native values.
+
+    Arguments:
+    - columns (list[dict]): conn.columns of the query
+
+    Returns:
+    - function: row (list) -> dict of column name to value
+    """
+    names = [column["name"] for column in columns]
+    formatters = [
+        (index, formatter)
+        for index, formatter in enumerate(map(formatter_for_column, columns))
+        if formatter is not None
+    ]
+
+    def encode_row(row):
+        values = list(row)
+        for index, formatter in formatters:
+            value = values[index]
+            if value is not None:
+                values[index] = formatter(value)
+        return dict(zip(names, values))
+
+    return encode_row
+
+
+def dumps(data):
+    """
+    Serialises json-native data in one canonical encoding: compact separators, non-ASCII characters as UTF-8.
+    orjson writes it natively and is used if it is installed; otherwise json.dumps is set up to write the same
+    bytes, so a payload's fingerprint (see utils/fingerprints.py) doesn't depend on which backend wrote it.
+    (The two only differ on floats in exponent notation, which the extracted tables don't have.)
+    """
+    if orjson is not None:
+        return orjson.dumps(data).decode("utf-8")
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def dump_rows_to_json(table_name, columns, rows):
+    """
+    Typed fast path for dump_to_json: returns the same {table_name: [rows]} json document, in the canonical
+    encoding of dumps, without a python-level default=str fallback call for every timestamp and decimal.
+
+    Arguments:
+    - table_name (str): name of the table, used as the top level key of the json document
+    - columns (list[dict]): conn.columns of the query the rows came from
+    - rows (list[list]): rows as returned by conn.run
+
+    Returns:
+    - str: the json document
+    """
+    encode_row = make_row_encoder(columns)
+    return dumps({table_name: [encode_row(row) for row in rows]})
@@ -1,40 +1,439 @@
 import pandas as pd
 import json
-import boto3
+import re
+import operator
+import tempfile
+import pyarrow.parquet as pq
+from io import BytesIO
 from botocore.exceptions import ClientError
+from utils.compression import codec_from_key, strip_codec_suffix, decompressing_reader
+from utils.aws_clients import get_client
+from utils.table_cache import active_cache, reference_cache, REFERENCE_TABLES
+from utils.table_schemas import apply_schema
 
+RAW_FILE_EXTENSIONS = [".json", ".csv", ".parquet", ".ndjson", ".ndjson.gz"]
 
-def json_to_pd_dataframe(most_recent_file: str, table_name, bucket_name):
+# chunks written by the "chunked" extract mode, e.g. address-2025-05-29T11:06:18.399084-part-00001.json
+CHUNK_SUFFIX = re.compile(r"-part-\d+\.json(\.gz|\.zst)?$")
+
+
+def is_in(value, values):
+    return value.isin(values) if isinstance(value, pd.Series) else value in values
+
+
+def is_not_in(value, values):
+    return ~value.isin(values) if isinstance(value, pd.Series) else value not in values
+
+
+# row filter operators, the same as pyarrow's (and pd.read_parquet's) filters; each works on a value or a column
+FILTER_OPERATORS = {
+    "=": operator.eq,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": is_in,
+    "not in": is_not_in,
+}
+
+
+def json_to_pd_dataframe(
+    most_recent_file: str,
+    table_name,
+    bucket_name,
+    columns=None,
+    filters=None,
+    chunk_keys=None,
+):
     """
         This function:
                - downloads most_recent_file containing table_name in its name, from specified s3 bucket
                - loads the data from this json file into a pandas dataframe, which is returned
+               - csv files (written by the COPY extract mode, with a header row) are read with pd.read_csv
+               - parquet files (written by the parquet extract format) are read with pd.read_parquet,
+                 keeping the column types they were extracted with
+               - newline-delimited json files (.ndjson, or gzipped .ndjson.gz) are decoded one line at a time
+               - if most_recent_file is one chunk of a chunked extract, every chunk of that extract is loaded: the
+                 chunk_keys given (from the run manifest), or else the chunks found by listing the bucket
+               - compressed files (".gz" or ".zst" after the extension, see utils/compression.py) are
+                 decompressed as they are read
+               - most_recent_file can also be a hive-partitioned file, e.g. "dt=2025-05-29/hour=11/part-2025-05-29T11:06:18.399084.json"
+               - if columns is given, only those columns are kept, as the file is decoded (json rows are cut down to
+                 them as each one is parsed, csv and parquet files only read them), in the order of columns
+               - if filters is given, only the rows matching every filter are kept, as the file is decoded
+               - columns are converted once, at load time, to the table's declared dtypes (int32 ids, float prices,
+                 parsed timestamps, categories; see utils/table_schemas.py)
+               - inside a transform run (see utils/table_cache.py), the dataframe is cached by (bucket, key), so
+                 each object is only downloaded and parsed once per run, and a copy is returned; raw files are
+                 written once under a timestamped key, so they aren't checked again during the run
+               - the frames of the small, rarely changing REFERENCE_TABLES (address, currency, department) are cached
+                 for as long as the lambda container lives instead (see reference_cache), keyed by (bucket, key, ETag),
+                 so a warm invocation only checks their ETags
 
     Arguments: - most_recent_file, which is the most recent file in the s3 bucket, "fscifa-raw-data", with the specified table_name
                - table_name, which is a table name from the original OLTP database.
                - bucket_name, which should be set to "fscifa-raw-data" in production.
+               - columns (optional), a list of the columns to keep; columns the file doesn't have are left out
+               - filters (optional), a list of (column, operator, value) tuples, e.g. [("currency_id", "in", [1, 2])],
+                 with the operators of pd.read_parquet's filters (see FILTER_OPERATORS); values are compared with the
+                 values as they are stored in the file (e.g. json timestamps are strings), and rows where the column
+                 is missing or null never match
+               - chunk_keys (optional), the keys of every chunk of a chunked extract, in order, e.g. from the run
+                 manifest (see utils/run_manifest.py manifest_keys), so that they aren't listed
 
     Returns: a pandas dataframe of the data from the specified file.
 
     """
+    for _, op, _ in filters or []:
+        if op not in FILTER_OPERATORS:
+            raise Exception(f"Invalid filter operator: {op}")
+    cache = active_cache()
+    if cache is None:
+        return read_raw_dataframe(
+            most_recent_file, table_name, bucket_name, columns, filters, chunk_keys
+        )
+    s3_file_path = f"{table_name}/{most_recent_file}"
+    etag = None
+    if table_name in REFERENCE_TABLES:
+        cache = reference_cache()
+        try:
+            etag = get_client("s3").head_object(Bucket=bucket_name, Key=s3_file_path)[
+                "ETag"
+            ]
+        except ClientError:
+            # not cached, so that the error is raised as it is outside of a run
+            return read_raw_dataframe(
+                most_recent_file, table_name, bucket_name, columns, filters, chunk_keys
+            )
+    return cache.frame(
+        bucket_name,
+        s3_file_path,
+        etag,
+        lambda: read_raw_dataframe(
+            most_recent_file, table_name, bucket_name, columns, filters, chunk_keys
+        ),
+        variant=projection_key(columns, filters),
+    )
+
+
+def read_raw_dataframe(
+    most_recent_file,
+    table_name,
+    bucket_name,
+    columns=None,
+    filters=None,
+    chunk_keys=None,
+):
+    """Downloads and parses a raw file into a dataframe with the table's declared dtypes, see json_to_pd_dataframe"""
+    return apply_schema(
+        parse_raw_file(
+            most_recent_file, table_name, bucket_name, columns, filters, chunk_keys
+        ),
+        table_name,
+    )
+
+
+def parse_raw_file(
+    most_recent_file,
+    table_name,
+    bucket_name,
+    columns=None,
+    filters=None,
+    chunk_keys=None,
+):
     try:
-        s3 = boto3.resource("s3")
+        s3_client = get_client("s3")
         s3_file_path = f"{table_name}/{most_recent_file}"
-        last_updated_file = s3.Object(bucket_name, s3_file_path)
-        updated_data = last_updated_file.get()["Body"].read().decode("utf-8")
-        data = json.loads(updated_data)
-        data_df = pd.json_normalize(data[table_name])
-        return data_df
+        codec = codec_from_key(most_recent_file)
+        filename = strip_codec_suffix(most_recent_file)
+        select = row_selector(columns, filters)
+
+        def get_body(key=s3_file_path):
+            return s3_client.get_object(Bucket=bucket_name, Key=key)["Body"]
+
+        if filename.endswith(".csv"):
+            read_columns = filtered_columns(columns, filters)
+            data_df = pd.read_csv(
+                read_raw_body(get_body(), codec),
+                usecols=(lambda column: column in read_columns) if columns else None,
+                # COPY writes postgres booleans as t/f
+                true_values=["t"],
+                false_values=["f"],
+            )
+            return project_frame(filter_frame(data_df, filters), columns)
+        if filename.endswith(".parquet"):
+            buffer = BytesIO(get_body().read())
+            read_columns = None
+            if columns:
+                stored = set(pq.read_schema(buffer).names)
+                read_columns = [
+                    column
+                    for column in filtered_columns(columns, filters)
+                    if column in stored
+                ]
+            data_df = pd.read_parquet(
+                buffer, columns=read_columns, filters=filters or None
+            )
+            return project_frame(data_df, columns)
+        if filename.endswith(".ndjson"):
+            rows = iter_ndjson_rows(get_body(), codec)
+            if select is not None:
+                rows = (select(row) for row in rows)
+            return rows_to_frame([row for row in rows if row is not None], columns)
+        if CHUNK_SUFFIX.search(most_recent_file):
+            rows = []
+            if chunk_keys is None:
+                chunk_keys = iter_chunk_keys(s3_client, bucket_name, s3_file_path)
+            for chunk_key in chunk_keys:
+                body = read_raw_body(get_body(chunk_key), codec_from_key(chunk_key))
+                rows.extend(load_rows(body, table_name, select))
+            return rows_to_frame(rows, columns)
+        rows = load_rows(read_raw_body(get_body(), codec), table_name, select)
+        return rows_to_frame(rows, columns)
     except Exception:
-        if not most_recent_file.startswith(table_name):
+        if not most_recent_file.startswith((table_name, "dt=")):
             raise Exception(
                 "Error when converting file to dataframe: incorrect table_name"
             )
-        elif not most_recent_file.endswith(".json"):
+        elif not strip_codec_suffix(most_recent_file).endswith(
+            tuple(RAW_FILE_EXTENSIONS)
+        ):
             raise Exception(
-                "Error when converting file to dataframe: most_recent_file should be of type json"
+                "Error when converting file to dataframe: most_recent_file should be of type json, ndjson, csv or parquet"
             )
         else:
             raise ClientError(
                 "Error retrieving data from specified bucket, check bucket_name is correct"
             )
+
+
+def iter_raw_batches(
+    most_recent_file,
+    table_name,
+    bucket_name,
+    batch_size,
+    columns=None,
+    chunk_keys=None,
+):
+    """
+    Generator that reads a raw file (the same files as json_to_pd_dataframe) in dataframes of at most batch_size
+    rows, each converted to the table's declared dtypes, without holding the whole file in memory:
+    - ndjson files (compressed or not) are decoded line by line
+    - csv files are parsed batch_size rows at a time, as they are downloaded
+    - parquet files are downloaded to a temporary file and read batch_size rows at a time
+    - chunked extracts are read one chunk at a time
+    - a single json document has to be decoded in one go, so only its dataframes are built batch by batch; use
+      one of the formats above (or the "chunked" extract mode) for memory bounded by batch_size
+
+    Batches are not cached (see utils/table_cache.py): they are meant to be used once, as they are read.
+
+    Arguments:
+    - most_recent_file (str): the raw file, relative to the table's folder
+    - table_name (str): the table the file belongs to
+    - bucket_name (str): the name of the raw data bucket
+    - batch_size (int): maximum number of rows per dataframe
+    - columns (list[str]): the only columns to read (see json_to_pd_dataframe)
+    - chunk_keys (list[str]): the keys of every chunk of a chunked extract, e.g. from the run manifest, so that
+      they aren't listed (see json_to_pd_dataframe)
+
+    Returns:
+    - an iterator of pd.DataFrame
+    """
+    s3_client = get_client("s3")
+    s3_file_path = f"{table_name}/{most_recent_file}"
+    codec = codec_from_key(most_recent_file)
+    filename = strip_codec_suffix(most_recent_file)
+    select = row_selector(columns)
+
+    def get_body(key=s3_file_path):
+        return s3_client.get_object(Bucket=bucket_name, Key=key)["Body"]
+
+    def row_batches(rows, select=None):
+        batch = []
+        for row in rows:
+            batch.append(row if select is None else select(row))
+            if len(batch) >= batch_size:
+                yield rows_to_frame(batch, columns)
+                batch = []
+        if batch:
+            yield rows_to_frame(batch, columns)
+
+    if filename.endswith(".csv"):
+        batches = pd.read_csv(
+            read_raw_body(get_body(), codec),
+            usecols=(lambda column: column in columns) if columns else None,
+            true_values=["t"],
+            false_values=["f"],
+            chunksize=batch_size,
+        )
+        batches = (project_frame(batch, columns) for batch in batches)
+    elif filename.endswith(".parquet"):
+        batches = iter_parquet_batches(
+            s3_client, bucket_name, s3_file_path, batch_size, columns
+        )
+    elif filename.endswith(".ndjson"):
+        batches = row_batches(iter_ndjson_rows(get_body(), codec), select)
+    elif CHUNK_SUFFIX.search(most_recent_file):
+        if chunk_keys is None:
+            chunk_keys = iter_chunk_keys(s3_client, bucket_name, s3_file_path)
+        batches = (
+            batch
+            for chunk_key in chunk_keys
+            for batch in row_batches(
+                load_rows(
+                    read_raw_body(get_body(chunk_key), codec_from_key(chunk_key)),
+                    table_name,
+                    select,
+                )
+            )
+        )
+    else:
+        batches = row_batches(
+            load_rows(read_raw_body(get_body(), codec), table_name, select)
+        )
+    for batch in batches:
+        yield apply_schema(batch, table_name)
+
+
+def iter_parquet_batches(s3_client, bucket_name, key, batch_size, columns=None):
+    """Generator that downloads a parquet object to a temporary file, and reads it batch_size rows at a time"""
+    with tempfile.TemporaryFile() as file:
+        s3_client.download_fileobj(bucket_name, key, file)
+        file.seek(0)
+        parquet_file = pq.ParquetFile(file)
+        if columns:
+            stored = set(parquet_file.schema_arrow.names)
+            columns = [column for column in columns if column in stored]
+        for record_batch in parquet_file.iter_batches(
+            batch_size=batch_size, columns=columns
+        ):
+            yield record_batch.to_pandas()
+
+
+def iter_chunk_keys(s3_client, bucket_name, s3_file_path):
+    """
+    Generator of the keys of every chunk of the chunked extract s3_file_path is a chunk of, in order, found by
+    listing the bucket: only used when the chunk keys aren't given from a run manifest
+    """
+    pages = s3_client.get_paginator("list_objects_v2").paginate(
+        Bucket=bucket_name, Prefix=CHUNK_SUFFIX.sub("-part-", s3_file_path)
+    )
+    for page in pages:
+        for chunk in page.get("Contents", []):
+            yield chunk["Key"]
+
+
+def row_selector(columns=None, filters=None):
+    """
+    Returns a function that cuts a raw row (dict) down to columns, or returns None if the row doesn't match filters
+    (see json_to_pd_dataframe), or None if every row and column is kept.
+    """
+    if columns is None and not filters:
+        return None
+    wanted = None if columns is None else set(columns)
+
+    def select(row):
+        for column, op, value in filters or []:
+            if row.get(column) is None or not FILTER_OPERATORS[op](row[column], value):
+                return None
+        if wanted is None:
+            return row
+        return {column: value for column, value in row.items() if column in wanted}
+
+    return select
+
+
+def load_rows(body, table_name, select=None):
+    """
+    Decodes a raw json file ({table_name: [row, ...]}, with flat rows) into its list of rows. With select (see row_selector), each row
+    is cut down (or dropped) as soon as it is decoded, so only the selected fields of the file are ever held at once.
+    """
+    if select is None:
+        return json.load(body)[table_name]
+
+    def select_pairs(pairs):
+        if len(pairs) == 1 and pairs[0][0] == table_name:
+            # the top-level object: its rows were already selected
+            return {table_name: [row for row in pairs[0][1] if row is not None]}
+        return select(dict(pairs))
+
+    return json.load(body, object_pairs_hook=select_pairs)[table_name]
+
+
+def rows_to_frame(rows, columns=None):
+    """Builds the dataframe of a list of raw rows, with columns in the order of columns if given"""
+    return project_frame(pd.json_normalize(rows), columns)
+
+
+def project_frame(data_df, columns=None):
+    """Keeps the columns of data_df that are in columns, in their order (all of them if columns is None)"""
+    if columns is None:
+        return data_df
+    if data_df.empty and len(data_df.columns) == 0:
+        return pd.DataFrame(columns=list(columns))
+    return data_df[[column for column in columns if column in data_df.columns]]
+
+
+def filter_frame(data_df, filters=None):
+    """Keeps the rows of data_df matching every filter (see json_to_pd_dataframe)"""
+    if not filters:
+        return data_df
+    mask = pd.Series(True, index=data_df.index)
+    for column, op, value in filters:
+        if column not in data_df.columns:
+            return data_df.iloc[0:0]
+        mask &= data_df[column].notna() & FILTER_OPERATORS[op](data_df[column], value)
+    return data_df[mask].reset_index(drop=True)
+
+
+def filtered_columns(columns, filters=None):
+    """The columns to read to keep columns and apply filters: columns, then any other filtered column"""
+    filter_columns = [column for column, _, _ in filters or []]
+    return list(dict.fromkeys([*columns, *filter_columns])) if columns else None
+
+
+def projection_key(columns=None, filters=None):
+    """A hashable key of a projection (columns and filters), so projected reads are cached separately"""
+    if columns is None and not filters:
+        return None
+    return (
+        None if columns is None else tuple(columns),
+        tuple(
+            (
+                column,
+                op,
+                tuple(value) if isinstance(value, (list, set, frozenset)) else value,
+            )
+            for column, op, value in filters or []
+        ),
+    )
+
+
+def read_raw_body(body, codec=None):
+    """Returns a raw file's body (a binary file-like object) as is, or decompressing it as it is read if codec is given"""
+    return decompressing_reader(body, codec) if codec else body
+
+
+def iter_ndjson_rows(body, codec=None):
+    """
+    Generator that reads a newline-delimited json stream (e.g. an s3 object's "Body") line by line,
+    yielding one row (dict) at a time, so the whole file is never decoded in one go.
+
+    Arguments: - body, a binary file-like object (botocore's StreamingBody is read with iter_lines)
+               - codec, "gzip" or "zstd" if the stream is compressed (True is taken as "gzip")
+
+    Returns: an iterator of dicts, one per non-empty line.
+
+    """
+    if codec:
+        lines = decompressing_reader(body, "gzip" if codec is True else codec)
+    elif hasattr(body, "iter_lines"):
+        lines = body.iter_lines()
+    else:
+        lines = body
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
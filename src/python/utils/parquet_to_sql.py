@@ -1,15 +1,16 @@
 from utils.find_most_recent_filename import find_most_recent_filename
 import pandas as pd
-import boto3
+from utils.aws_clients import get_client
 from db.connection import connect_to_db, close_db
 import io
 import datetime
 
 
-def fetch_parquet(table_name, bucket):
+def fetch_parquet(table_name, bucket, manifest=None):
     """
     This function:
     - invokes find_most_recent_filename, to find the most recent parquet file for a given table_name, in the specified s3 bucket
+      (or in the transform run's manifest, if given)
     - gets the s3 file path for the parquet file
     - reads the parquet file, and puts its contents into a dataframe
     - returns this dataframe
@@ -20,6 +21,8 @@ def fetch_parquet(table_name, bucket):
         Name of the dimensions or fact table
     bucket : str
         Name of the target S3 bucket.
+    manifest : dict, optional
+        The transform run's manifest (see utils/run_manifest.py); if given, the bucket isn't listed.
 
     Returns
     ----------
@@ -32,10 +35,12 @@ def fetch_parquet(table_name, bucket):
     """
 
     try:
-        most_recent_file = find_most_recent_filename(table_name, bucket, "parquet")
+        most_recent_file = find_most_recent_filename(
+            table_name, bucket, "parquet", manifest=manifest
+        )
         if not most_recent_file:
             return None
-        s3 = boto3.client("s3")
+        s3 = get_client("s3")
         s3_file_path = f"{table_name}/{most_recent_file}"
         obj = s3.get_object(Bucket=bucket, Key=s3_file_path)
         parquet_df = pd.read_parquet(io.BytesIO(obj["Body"].read()))
@@ -45,7 +50,7 @@ def fetch_parquet(table_name, bucket):
         raise err
 
 
-def parquet_to_sql(table_name, df):
+def parquet_to_sql(table_name, df, conn=None):
     """
     This function:
     - takes a dataframe for a given dimension or fact table
@@ -62,6 +67,9 @@ def parquet_to_sql(table_name, df):
         Name of a dimension or fact table
     df : dataframe
         Dataframe of the dimension or fact table, table_name
+    conn : Connection, optional
+        An open connection to the data warehouse (e.g. borrowed with db_connection), which is left open.
+        If not given, a new connection is opened and closed for this call.
 
     Returns
     ----------
@@ -73,7 +81,7 @@ def parquet_to_sql(table_name, df):
 
     """
 
-    conn = None
+    own_connection = conn is None
     try:
         # put dataframe column names into a list:
         columns = df.columns.tolist()
@@ -104,12 +112,13 @@ def parquet_to_sql(table_name, df):
             query = query[:-3] + ";"
 
         # connect to the data warehouse, and run the query
-        conn = connect_to_db()
+        if own_connection:
+            conn = connect_to_db()
         conn.run(query)
         return {"result": "success"}
     except Exception as err:
         print(f"Unable to run sql query: {err}")
         raise err
     finally:
-        if conn:
+        if own_connection and conn:
             close_db(conn)
@@ -0,0 +1,100 @@
+from contextlib import contextmanager
+from utils.extract_catalog import catalog_entry
+from utils.watermarks import parse_watermark
+
+""" Change-probe preflight and consistent read-only snapshots for the extract lambda """
+
+
+def build_preflight_query(table_list):
+    """
+    Builds one query returning, for every table, max(last_updated) and the planner's row estimate
+    (pg_class.reltuples, -1 if the table has never been analysed), so all tables are probed in a single round trip.
+
+    Arguments:
+    - table_list (list[str]): names of the tables to probe
+
+    Returns:
+    - str: the query, with one (table_name, max of the watermark column, row_estimate) row per table
+
+    Raises:
+    - Exception: if a table name is not one of the totesys tables
+    """
+    probes = []
+    for table_name in table_list:
+        watermark = catalog_entry(table_name)["watermark"]
+        probes.append(
+            f"SELECT '{table_name}', max({watermark}), "
+            f"(SELECT reltuples::bigint FROM pg_class WHERE oid = '{table_name}'::regclass) "
+            f"FROM {table_name}"
+        )
+    return " UNION ALL ".join(probes) + ";"
+
+
+def preflight_tables(table_list, watermarks, conn):
+    """
+    This function:
+    - probes every table in one query (see build_preflight_query)
+    - compares each table's max(last_updated) with its watermark
+    - a table has changed if it has rows updated after its watermark, or has rows and no watermark yet
+    - tables missing from the result are assumed to have changed, so they are never wrongly skipped
+
+    Arguments:
+    - table_list (list[str]): names of the tables to probe
+    - watermarks (dict): table name -> high-water mark, see utils/watermarks.py
+    - conn (Connection): an open database connection
+
+    Returns:
+    - dict: table name -> {"changed": bool, "row_estimate": int or None}
+    """
+    probes = {
+        table_name: (max_last_updated, row_estimate)
+        for table_name, max_last_updated, row_estimate in conn.run(
+            build_preflight_query(table_list)
+        )
+    }
+    preflight = {}
+    for table_name in table_list:
+        if table_name not in probes:
+            preflight[table_name] = {"changed": True, "row_estimate": None}
+            continue
+        max_last_updated, row_estimate = probes[table_name]
+        watermark = watermarks.get(table_name)
+        changed = max_last_updated is not None and (
+            not watermark or max_last_updated > parse_watermark(watermark)
+        )
+        preflight[table_name] = {"changed": changed, "row_estimate": row_estimate}
+    return preflight
+
+
+@contextmanager
+def read_only_snapshot(conn, snapshot_id=None):
+    """
+    Context manager running the block in a REPEATABLE READ, READ ONLY transaction, so every query in it
+    sees the same snapshot of the database. The transaction is committed when the block ends, or rolled back
+    if it raises.
+
+    Arguments:
+    - conn (Connection): an open database connection, not already in a transaction
+    - snapshot_id (str): a snapshot exported by another connection (see export_snapshot) to share, so that
+      several connections read exactly the same data
+
+    Yields:
+    - Connection: conn
+    """
+    conn.run("START TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY;")
+    try:
+        if snapshot_id:
+            conn.run(f"SET TRANSACTION SNAPSHOT '{snapshot_id}';")
+        yield conn
+    except Exception:
+        try:
+            conn.run("ROLLBACK;")
+        except Exception:
+            pass
+        raise
+    conn.run("COMMIT;")
+
+
+def export_snapshot(conn):
+    """Returns the id of conn's current snapshot, which stays importable while conn's transaction is open"""
+    return conn.run("SELECT pg_export_snapshot();")[0][0]
@@ -0,0 +1,149 @@
+from utils.json_to_pd_dataframe import RAW_FILE_EXTENSIONS, CHUNK_SUFFIX
+from utils.compression import strip_codec_suffix
+
+""" Raw data bucket key layouts, and listing of a table's raw files from a point in time """
+
+
+KEY_LAYOUTS = ["flat", "hive"]
+
+
+def partition_prefix(table_name, timestamp):
+    """
+    Returns the hive-style partition of a run timestamp, e.g. "address/dt=2025-05-29/hour=11/"
+    for "2025-05-29T11:06:18.399084"
+    """
+    return f"{table_name}/dt={timestamp[:10]}/hour={timestamp[11:13]}/"
+
+
+def raw_key(table_name, timestamp, extension, key_layout="flat"):
+    """
+    Returns the key of a raw data file.
+
+    Arguments:
+    - table_name (str): name of the extracted table
+    - timestamp (str): run timestamp, e.g. "2025-05-29T11:06:18.399084"
+    - extension (str): file extension without the leading dot, e.g. "json" or "ndjson.gz"
+    - key_layout (str):
+        - "flat" (default): {table}/{table}-{timestamp}.{extension}
+        - "hive": {table}/dt=YYYY-MM-DD/hour=HH/part-{timestamp}.{extension}, so a time window can be listed
+          without going through the table's whole history (see list_raw_files)
+
+    Returns:
+    - str: the object key
+    """
+    if key_layout == "hive":
+        return f"{partition_prefix(table_name, timestamp)}part-{timestamp}.{extension}"
+    if key_layout == "flat":
+        return f"{table_name}/{table_name}-{timestamp}.{extension}"
+    raise ValueError(
+        f"Invalid key layout: {key_layout}, should be one of {KEY_LAYOUTS}"
+    )
+
+
+def raw_file_timestamp(filename, table_name):
+    """
+    Returns the date/time part of a raw data filename (relative to the table's folder), e.g. "2025-05-29T11:06:18.399084" for
+    "address-2025-05-29T11:06:18.399084.json" or "dt=2025-05-29/hour=11/part-2025-05-29T11:06:18.399084.json"
+    (or any other RAW_FILE_EXTENSIONS, compressed or not, or a chunk such as
+    "address-2025-05-29T11:06:18.399084-part-00002.json"), or None if it isn't a raw data file.
+    """
+    filename = strip_codec_suffix(CHUNK_SUFFIX.sub(".json", filename))
+    directory, _, basename = filename.rpartition("/")
+    prefix = "part-" if directory else f"{table_name}-"
+    for extension in RAW_FILE_EXTENSIONS:
+        if basename.endswith(extension):
+            return basename[len(prefix) : -len(extension)]
+    return None
+
+
+def listing_ranges(table_name, since=None):
+    """
+    Returns the (Prefix, StartAfter) pairs to list to find a table's raw files made at or after since, one per
+    key layout. Keys in each layout sort by timestamp, so StartAfter skips straight past the older files.
+    """
+    flat_prefix = f"{table_name}/{table_name}-"
+    hive_prefix = f"{table_name}/dt="
+    if not since:
+        return [(flat_prefix, None), (hive_prefix, None)]
+    return [
+        (flat_prefix, f"{flat_prefix}{since}"),
+        (hive_prefix, partition_prefix(table_name, since)),
+    ]
+
+
+def list_raw_files(table_name, bucket_name, s3_client, since=None, until=None):
+    """
+    This function:
+    - lists the raw files of a table, in both key layouts, made in the time window [since, until)
+    - starts each listing at since (with StartAfter), and stops paging once past until, so the number of
+      objects listed depends on the size of the window and not on how much history the table has
+    - only lists under "{table}/", so e.g. payment_type's files are never returned for payment
+
+    Arguments:
+    - table_name (str): name of the table
+    - bucket_name (str): the name of the raw data bucket
+    - s3_client: a boto3 s3 client
+    - since (str): earliest run timestamp to return, e.g. "2025-05-29T11:06:18.399084", or None for no lower bound
+    - until (str): run timestamp to stop before, or None for no upper bound
+
+    Returns:
+    - list[str]: filenames relative to the table's folder (as returned by find_files_with_specified_table_name),
+      oldest first within each layout
+    """
+    files = []
+    for prefix, start_after in listing_ranges(table_name, since):
+        for key in iter_keys(bucket_name, s3_client, prefix, start_after):
+            filename = key[len(table_name) + 1 :]
+            timestamp = raw_file_timestamp(filename, table_name)
+            if timestamp is None or (since and timestamp < since):
+                continue
+            if until and timestamp >= until:
+                break
+            files.append(filename)
+    return files
+
+
+def iter_keys(bucket_name, s3_client, prefix, start_after=None):
+    """Generator of the keys under prefix (after start_after, if given), fetching each page only when it is reached"""
+    params = {"Bucket": bucket_name, "Prefix": prefix}
+    if start_after:
+        params["StartAfter"] = start_after
+    for page in s3_client.get_paginator("list_objects_v2").paginate(**params):
+        for obj in page.get("Contents", []):
+            yield obj["Key"]
+
+
+def list_partitions(table_name, bucket_name, s3_client, since=None):
+    """
+    Lists a table's hive partitions (e.g. "address/dt=2025-05-29/hour=11/") from the partition of since onwards,
+    one level at a time with Delimiter="/", so only partition prefixes are returned, never the files in them.
+
+    Arguments:
+    - table_name (str): name of the table
+    - bucket_name (str): the name of the raw data bucket
+    - s3_client: a boto3 s3 client
+    - since (str): run timestamp whose partition to start from, or None to list every partition
+
+    Returns:
+    - list[str]: the hour partition prefixes, oldest first
+    """
+    paginator = s3_client.get_paginator("list_objects_v2")
+
+    def common_prefixes(prefix, start_after=None):
+        params = {"Bucket": bucket_name, "Prefix": prefix, "Delimiter": "/"}
+        if start_after:
+            params["StartAfter"] = start_after
+        for page in paginator.paginate(**params):
+            for common_prefix in page.get("CommonPrefixes", []):
+                yield common_prefix["Prefix"]
+
+    first_day = first_hour = None
+    if since:
+        first_hour = partition_prefix(table_name, since)
+        first_day = first_hour[: first_hour.index("/hour=")]
+    partitions = []
+    for day in common_prefixes(f"{table_name}/dt=", first_day):
+        for hour in common_prefixes(day):
+            if not first_hour or hour >= first_hour:
+                partitions.append(hour)
+    return partitions
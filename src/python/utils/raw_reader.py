@@ -0,0 +1,103 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from utils.json_to_pd_dataframe import json_to_pd_dataframe
+
+""" Bulk reader of raw files: many objects fetched and decoded concurrently, for the historical scans """
+
+
+# how many raw files are fetched and decoded at the same time (each worker uses one of the s3 client's connections)
+DEFAULT_READ_CONCURRENCY = int(os.getenv("RAW_READ_CONCURRENCY", "8"))
+
+
+def iter_raw_dataframes(
+    files,
+    table_name,
+    bucket_name,
+    max_workers=DEFAULT_READ_CONCURRENCY,
+    columns=None,
+    filters=None,
+):
+    """
+    Generator that reads many raw files of a table, each with json_to_pd_dataframe, on a thread pool of at most
+    max_workers threads, so the files are downloaded and decoded concurrently instead of one after another.
+
+    Results are yielded in the order of files, as soon as each one (and those before it) is ready. At most
+    max_workers files are being read (or waiting to be consumed) at any time, so memory is bounded by the caller
+    consuming each dataframe (e.g. keeping only the columns it needs) before asking for the next one.
+
+    Arguments:
+    - files (iterable[str]): names of the raw files, relative to the table's folder
+      (e.g. from find_files_with_specified_table_name)
+    - table_name (str): the table the files belong to
+    - bucket_name (str): the name of the raw data bucket
+    - max_workers (int): maximum number of files read at the same time
+    - columns (list[str]): the only columns to read from each file (see json_to_pd_dataframe)
+    - filters (list[tuple]): the only rows to read from each file, as (column, operator, value) tuples
+
+    Returns:
+    - an iterator of (file, pd.DataFrame) tuples
+
+    Raises:
+    - the error of the first file that couldn't be read; the files not started yet are cancelled
+    """
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            for file in files:
+                pending.append(
+                    (
+                        file,
+                        executor.submit(
+                            json_to_pd_dataframe,
+                            file,
+                            table_name,
+                            bucket_name,
+                            columns=columns,
+                            filters=filters,
+                        ),
+                    )
+                )
+                if len(pending) >= max_workers:
+                    file, future = pending.popleft()
+                    yield file, future.result()
+            while pending:
+                file, future = pending.popleft()
+                yield file, future.result()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def read_raw_dataframes(
+    files,
+    table_name,
+    bucket_name,
+    max_workers=DEFAULT_READ_CONCURRENCY,
+    columns=None,
+    filters=None,
+):
+    """
+    Reads many raw files of a table concurrently (see iter_raw_dataframes), and concatenates them once at the end.
+
+    Arguments:
+    - files (iterable[str]): names of the raw files, relative to the table's folder
+    - table_name (str): the table the files belong to
+    - bucket_name (str): the name of the raw data bucket
+    - max_workers (int): maximum number of files read at the same time
+    - columns (list[str]): the only columns to read from each file (see json_to_pd_dataframe)
+    - filters (list[tuple]): the only rows to read from each file, as (column, operator, value) tuples
+
+    Returns:
+    - pd.DataFrame: the rows of every file, in the order of files (an empty dataframe if there are no files)
+    """
+    frames = [
+        df
+        for _, df in iter_raw_dataframes(
+            files, table_name, bucket_name, max_workers, columns, filters
+        )
+    ]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,98 @@
+import json
+
+""" Run manifests: the objects a stage produced, handed to the next stage so it doesn't have to list the bucket """
+
+
+MANIFEST_PREFIX = "manifests"
+
+
+def manifest_key(timestamp):
+    """Returns the key of a run's manifest, e.g. manifests/run-2025-05-29T11:06:18.399084.json"""
+    return f"{MANIFEST_PREFIX}/run-{timestamp}.json"
+
+
+def build_manifest(timestamp, bucket_name, table_keys, s3_client):
+    """
+    This function:
+    - lists the objects uploaded for each table in a run, with their row counts
+    - reads each object's size in bytes with head_object (no listing)
+    - leaves out the tables for which nothing was uploaded
+
+    Arguments:
+    - timestamp (str): the run timestamp
+    - bucket_name (str): the bucket the objects were uploaded to
+    - table_keys (dict): table name -> {"keys": keys of the objects uploaded for the table, "row_count": number of rows}
+    - s3_client: a boto3 s3 client
+
+    Returns:
+    - dict: {"timestamp": timestamp, "bucket": bucket_name,
+             "tables": {table name: {"row_count": int, "files": [{"key": str, "bytes": int}, ...]}}}
+    """
+    tables = {}
+    for table_name, uploaded in table_keys.items():
+        if not uploaded["keys"]:
+            continue
+        tables[table_name] = {
+            "row_count": uploaded.get("row_count"),
+            "files": [
+                {
+                    "key": key,
+                    "bytes": s3_client.head_object(Bucket=bucket_name, Key=key)[
+                        "ContentLength"
+                    ],
+                }
+                for key in uploaded["keys"]
+            ],
+        }
+    return {"timestamp": timestamp, "bucket": bucket_name, "tables": tables}
+
+
+def write_manifest(manifest, bucket_name, s3_client):
+    """
+    Saves a run manifest under manifests/, where the raw / processed file listings don't pick it up.
+
+    Returns:
+    - str: the manifest's key, to be passed on to the next stage (e.g. in the Step Functions output)
+    """
+    key = manifest_key(manifest["timestamp"])
+    s3_client.put_object(
+        Body=json.dumps(manifest, sort_keys=True), Bucket=bucket_name, Key=key
+    )
+    print(f"Successfully uploaded {key} to s3://{bucket_name}/{key}")
+    return key
+
+
+def read_manifest(bucket_name, key, s3_client):
+    """Returns the run manifest saved under key, see build_manifest"""
+    response = s3_client.get_object(Bucket=bucket_name, Key=key)
+    return json.loads(response["Body"].read().decode("utf-8"))
+
+
+def manifest_files(manifest, table_name):
+    """
+    Returns the names of a table's files in a run manifest, relative to the table's folder
+    (like find_files_with_specified_table_name), or an empty list if the run produced nothing for the table
+    """
+    files = manifest["tables"].get(table_name, {}).get("files", [])
+    return [file["key"][len(table_name) + 1 :] for file in files]
+
+
+def manifest_keys(manifest, table_name):
+    """
+    Returns the keys of a table's files in a run manifest (every chunk of a chunked extract, in order), to be read
+    without listing the bucket, or None if there is no manifest
+    """
+    if manifest is None:
+        return None
+    files = manifest["tables"].get(table_name, {}).get("files", [])
+    return [file["key"] for file in files]
+
+
+def manifest_file(manifest, table_name):
+    """
+    Returns the name of a table's file in a run manifest, relative to the table's folder (like
+    find_most_recent_filename), or None if the run produced nothing for the table. For a chunked extract,
+    this is the name of the last chunk, which json_to_pd_dataframe reads with all the other chunks.
+    """
+    files = manifest_files(manifest, table_name)
+    return files[-1] if files else None
@@ -0,0 +1,133 @@
+from io import BytesIO
+
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class S3MultipartWriter:
+    """
+    A binary file-like object that streams whatever is written to it into a single s3 object.
+
+    - data is buffered in memory until the buffer reaches part_size, then sent as one part of an s3 multipart upload
+    - the multipart upload is only started once the first full part is ready, so small objects are sent with
+      a single put_object call on close(), exactly like upload_json_to_s3
+    - if anything goes wrong, the multipart upload is aborted so no orphaned parts are left in the bucket
+
+    Peak memory is therefore bounded by part_size, not by the size of the object being written.
+
+    Arguments:
+    - bucket_name (str): name of the target s3 bucket
+    - key (str): key of the object to write
+    - s3_client: a boto3 s3 client
+    - part_size (int): size in bytes of each uploaded part (s3 requires at least 5MB for all but the last part)
+    - extra_args (dict): any additional arguments for create_multipart_upload / put_object, e.g. ContentEncoding
+
+    Usage:
+        with S3MultipartWriter("fscifa-raw-data", key, s3_client) as writer:
+            writer.write(b"...")
+    """
+
+    def __init__(
+        self, bucket_name, key, s3_client, part_size=MIN_PART_SIZE, extra_args=None
+    ):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes")
+        self.bucket_name = bucket_name
+        self.key = key
+        self.s3_client = s3_client
+        self.part_size = part_size
+        self.extra_args = extra_args or {}
+        self.bytes_written = 0
+        self.closed = False
+        self._buffer = BytesIO()
+        self._upload_id = None
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self.bytes_written
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError("I/O operation on closed S3MultipartWriter")
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._buffer.write(data)
+        self.bytes_written += len(data)
+        if self._buffer.tell() >= self.part_size:
+            self._upload_part()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        """Uploads whatever is left in the buffer and completes the upload."""
+        if self.closed:
+            return
+        try:
+            if self._upload_id is None:
+                self.s3_client.put_object(
+                    Body=self._buffer.getvalue(),
+                    Bucket=self.bucket_name,
+                    Key=self.key,
+                    **self.extra_args,
+                )
+            else:
+                if self._buffer.tell() > 0:
+                    self._upload_part()
+                self.s3_client.complete_multipart_upload(
+                    Bucket=self.bucket_name,
+                    Key=self.key,
+                    UploadId=self._upload_id,
+                    MultipartUpload={"Parts": self._parts},
+                )
+            print(
+                f"Successfully uploaded {self.key} to s3://{self.bucket_name}/{self.key}"
+            )
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self.closed = True
+            self._buffer = BytesIO()
+
+    def abort(self):
+        """Abandons the upload, removing any parts already sent to s3."""
+        if self._upload_id is not None:
+            try:
+                self.s3_client.abort_multipart_upload(
+                    Bucket=self.bucket_name, Key=self.key, UploadId=self._upload_id
+                )
+            except Exception as error:
+                print(f"Failed to abort multipart upload for {self.key}: {error}")
+            self._upload_id = None
+        self.closed = True
+        self._buffer = BytesIO()
+
+    def _upload_part(self):
+        if self._upload_id is None:
+            response = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket_name, Key=self.key, **self.extra_args
+            )
+            self._upload_id = response["UploadId"]
+        part_number = len(self._parts) + 1
+        response = self.s3_client.upload_part(
+            Body=self._buffer.getvalue(),
+            Bucket=self.bucket_name,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+        )
+        self._parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+        self._buffer = BytesIO()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,11 @@
+import os
+
+""" Run settings of the lambdas, given in the event or as environment variables """
+
+
+def get_setting(event, name, default):
+    """Returns a run setting from the event (lower case name) if given, otherwise from the environment"""
+    value = (event or {}).get(name.lower())
+    if value is None:
+        value = os.getenv(name, default)
+    return value
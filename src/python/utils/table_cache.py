@@ -0,0 +1,122 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import pandas as pd
+
+""" Run-scoped cache of the raw tables (and of frames derived from them) read by the transform lambda """
+
+
+# the cache of the run in progress, set by run_cache; None outside a run, so nothing is cached
+_active_cache = None
+
+# small raw tables that rarely change: their frames are kept in reference_cache, between the invocations of a
+# warm lambda container, instead of in the run's cache
+REFERENCE_TABLES = ["address", "currency", "department"]
+
+# most frames kept in reference_cache; the least recently used are dropped first
+MAX_REFERENCE_FRAMES = 64
+
+
+class TableCache:
+    """
+    Caches, for one transform run:
+    - the dataframe of each raw object, keyed by (bucket, key, ETag), so an object is only downloaded and parsed
+      once. The ETag can be None when the object can't change while the cache is used (e.g. a raw file, during
+      a run), so that it isn't looked up for every read
+    - any other value computed once per run and shared by several transforms (e.g. the fact table, which dim_date
+      is derived from), keyed by name
+
+    Dataframes are handed out as copies, because the transforms drop and rename columns in place.
+
+    Frames can be read from several threads at once (see utils/raw_reader.py); objects are loaded outside the lock,
+    so different objects are read concurrently.
+
+    If max_frames is given, at most max_frames frames are kept, the least recently used being dropped first.
+    """
+
+    def __init__(self, max_frames=None):
+        self.max_frames = max_frames
+        self.frames = OrderedDict()
+        self.values = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def frame(self, bucket_name, key, etag, load, variant=None):
+        """
+        Returns (a copy of) the dataframe of an object, calling load() to read it if it isn't cached yet.
+        variant tells apart different reads of the same object (e.g. of some of its columns only).
+        """
+        cache_key = (bucket_name, key, etag, variant)
+        with self._lock:
+            frame = self.frames.get(cache_key)
+            if frame is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.frames.move_to_end(cache_key)
+        if frame is None:
+            frame = load()
+            with self._lock:
+                frame = self.frames.setdefault(cache_key, frame)
+                if self.max_frames is not None:
+                    while len(self.frames) > self.max_frames:
+                        self.frames.popitem(last=False)
+        return copy_frame(frame)
+
+    def value(self, name, build):
+        """Returns the value cached under name, calling build() to compute it if it isn't cached yet"""
+        if name in self.values:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.values[name] = build()
+        return copy_frame(self.values[name])
+
+
+def copy_frame(value):
+    return value.copy() if isinstance(value, pd.DataFrame) else value
+
+
+@contextmanager
+def run_cache():
+    """
+    Makes a new TableCache the active cache for the duration of the with block (one lambda invocation),
+    so that nothing is kept between invocations.
+
+    Yields:
+    - TableCache: the run's cache
+    """
+    global _active_cache
+    previous = _active_cache
+    _active_cache = TableCache()
+    try:
+        yield _active_cache
+    finally:
+        _active_cache = previous
+
+
+def active_cache():
+    """Returns the cache of the run in progress, or None outside of run_cache"""
+    return _active_cache
+
+
+# module-level, so it lasts as long as the lambda container: warm invocations reuse its frames
+_reference_cache = TableCache(max_frames=MAX_REFERENCE_FRAMES)
+
+
+def reference_cache():
+    """
+    Returns the cache of the REFERENCE_TABLES' frames, which is kept between runs (and so between the invocations
+    of a warm lambda container). Its frames are keyed by (bucket, key, ETag) like any other, so an object is only
+    reused if it is unchanged in s3, and is read again if it was overwritten.
+    """
+    return _reference_cache
+
+
+def cached_value(name, build):
+    """Returns build(), computed only once per run inside run_cache (and every time outside of it)"""
+    cache = active_cache()
+    if cache is None:
+        return build()
+    return cache.value(name, build)
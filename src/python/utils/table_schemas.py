@@ -0,0 +1,75 @@
+import pandas as pd
+from utils.extract_catalog import EXTRACT_CATALOG
+
+""" Schema registry: the dtype of every column of the raw totesys tables, applied by the raw readers at load time """
+
+
+# catalog (postgres) type, without its precision and scale -> dtype the column is loaded as:
+# - ids and other integers as int32 rather than int64
+# - numerics (prices, amounts) as float64, parsed once from the decimal strings the extract writes
+# - timestamps parsed once, as ISO 8601 (the "YYYY-MM-DD HH:MM:SS[.ffffff]" the extract writes), to datetime64
+# - strings are left as read (None: no conversion)
+CATALOG_DTYPES = {
+    "int": "int32",
+    "numeric": "float64",
+    "boolean": "boolean",
+    "timestamp": "timestamp",
+    "varchar": None,
+}
+
+# columns loaded differently from their catalog type: nullable integers, and low-cardinality strings as category
+DTYPE_OVERRIDES = {
+    "address": {"country": "category"},
+    "currency": {"currency_code": "category"},
+    "payment_type": {"payment_type_name": "category"},
+    "transaction": {
+        "transaction_type": "category",
+        "sales_order_id": "Int32",
+        "purchase_order_id": "Int32",
+    },
+}
+
+TABLE_SCHEMAS = {
+    table_name: {
+        column: DTYPE_OVERRIDES.get(table_name, {}).get(
+            column, CATALOG_DTYPES[column_type.split("(")[0]]
+        )
+        for column, column_type in entry["columns"].items()
+    }
+    for table_name, entry in EXTRACT_CATALOG.items()
+}
+
+
+def table_schema(table_name):
+    """Returns a table's column -> dtype schema (see TABLE_SCHEMAS), or an empty schema for an unknown table"""
+    return TABLE_SCHEMAS.get(table_name, {})
+
+
+def table_columns(table_name, exclude=()):
+    """Returns the names of a table's columns, in the order they are extracted, leaving out the columns in exclude"""
+    return [column for column in table_schema(table_name) if column not in exclude]
+
+
+def apply_schema(df, table_name):
+    """
+    Converts the columns of a raw table's dataframe to the table's declared dtypes, in place.
+
+    Columns not in the schema, and schema columns not in the dataframe (e.g. a projection), are left alone.
+    Columns that already have their dtype (e.g. read from parquet) are not converted again.
+
+    Arguments:
+    - df (pd.DataFrame): the dataframe of a raw file, e.g. from pd.json_normalize
+    - table_name (str): the totesys table the file belongs to
+
+    Returns:
+    - pd.DataFrame: df, with its columns converted
+    """
+    for column, dtype in table_schema(table_name).items():
+        if dtype is None or column not in df:
+            continue
+        if dtype == "timestamp":
+            if not pd.api.types.is_datetime64_any_dtype(df[column]):
+                df[column] = pd.to_datetime(df[column], format="ISO8601")
+        elif df[column].dtype != dtype:
+            df[column] = df[column].astype(dtype)
+    return df
@@ -1,14 +1,64 @@
+import os
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from utils.aws_clients import get_client
+from utils.calendar_dim import calendar_dim_date, new_calendar_dates
 from utils.find_most_recent_filename import find_most_recent_filename
-from utils.json_to_pd_dataframe import json_to_pd_dataframe
+from utils.json_to_pd_dataframe import json_to_pd_dataframe, iter_raw_batches
+from utils.run_manifest import manifest_keys
+from utils.s3_multipart_writer import S3MultipartWriter
 
+# rows of sales_order read, transformed and written at a time by transform_fact_sales_order_chunked
+DEFAULT_FACT_BATCH_SIZE = int(os.getenv("TRANSFORM_BATCH_SIZE", "50000"))
 
-def transform_fact_sales_order():
+FACT_SALES_ORDER_COLUMNS = [
+    "sales_order_id",
+    "created_date",
+    "created_time",
+    "last_updated_date",
+    "last_updated_time",
+    "sales_staff_id",
+    "counterparty_id",
+    "units_sold",
+    "unit_price",
+    "currency_id",
+    "design_id",
+    "agreed_payment_date",
+    "agreed_delivery_date",
+    "agreed_delivery_location_id",
+]
+
+# parquet schema of fact_sales_order, so that every row group written by the chunked transform has the same types
+FACT_SALES_ORDER_SCHEMA = pa.schema(
+    [
+        ("sales_order_id", pa.int32()),
+        ("created_date", pa.string()),
+        ("created_time", pa.string()),
+        ("last_updated_date", pa.string()),
+        ("last_updated_time", pa.string()),
+        ("sales_staff_id", pa.int32()),
+        ("counterparty_id", pa.int32()),
+        ("units_sold", pa.int32()),
+        ("unit_price", pa.float64()),
+        ("currency_id", pa.int32()),
+        ("design_id", pa.int32()),
+        ("agreed_payment_date", pa.string()),
+        ("agreed_delivery_date", pa.string()),
+        ("agreed_delivery_location_id", pa.int32()),
+    ]
+)
+
+
+def transform_fact_sales_order(manifest=None):
     """
     This function takes in an OLTP-style dataframe describing company sales.
     It outputs a fact table, which will occupy the centre of an OLAP-style star-schema database,
     ready to be converted to parquet and sent to a 'processed' S3 bucket.
 
+    Arguments:
+        - manifest (dict): the extract run's manifest, if given (see find_most_recent_filename)
+
     Returns:
         - pd.DataFrame: a Pandas dataframe in star schema.
 
@@ -17,67 +67,183 @@ def transform_fact_sales_order():
     """
     global fact_sales_order
     try:
-        most_recent_file = find_most_recent_filename("sales_order", "fscifa-raw-data")
+        most_recent_file = find_most_recent_filename(
+            "sales_order", "fscifa-raw-data", manifest=manifest
+        )
         if not most_recent_file:
             return None
         fact_sales_order = json_to_pd_dataframe(
-            most_recent_file, "sales_order", "fscifa-raw-data"
+            most_recent_file,
+            "sales_order",
+            "fscifa-raw-data",
+            chunk_keys=manifest_keys(manifest, "sales_order"),
         )
+        fact_sales_order = map_fact_sales_order(fact_sales_order)
 
-        fact_sales_order["created_date"] = pd.to_datetime(
-            fact_sales_order["created_at"], format="mixed", errors="raise"
-        ).dt.date.astype(str)
-        fact_sales_order["created_time"] = pd.to_datetime(
-            fact_sales_order["created_at"], format="mixed", errors="raise"
-        ).dt.time.astype(str)
-
-        fact_sales_order["last_updated_date"] = pd.to_datetime(
-            fact_sales_order["last_updated"], format="mixed", errors="raise"
-        ).dt.date.astype(str)
-        fact_sales_order["last_updated_time"] = pd.to_datetime(
-            fact_sales_order["last_updated"], format="mixed", errors="raise"
-        ).dt.time.astype(str)
-        fact_sales_order["sales_staff_id"] = fact_sales_order["staff_id"]
-
-        fact_sales_order.drop(
-            columns=["created_at", "last_updated", "staff_id"], inplace=True
-        )
+        return fact_sales_order
+    except Exception as err:
+        print(f"Unable to make facts table: {err}.")
+        raise err
 
-        new_column_order = [
-            "sales_order_id",
-            "created_date",
-            "created_time",
-            "last_updated_date",
-            "last_updated_time",
-            "sales_staff_id",
-            "counterparty_id",
-            "units_sold",
-            "unit_price",
-            "currency_id",
-            "design_id",
-            "agreed_payment_date",
-            "agreed_delivery_date",
-            "agreed_delivery_location_id",
-        ]
-
-        fact_sales_order = fact_sales_order[new_column_order]
 
-        return fact_sales_order
+def map_fact_sales_order(fact_sales_order):
+    """
+    Maps a dataframe of raw sales_order rows (the whole table, or one batch of it) to fact_sales_order's columns,
+    see transform_fact_sales_order.
+
+    Arguments:
+        - fact_sales_order (pd.DataFrame): raw sales_order rows, with the declared dtypes (see utils/table_schemas.py)
+
+    Returns:
+        - pd.DataFrame: the rows in star schema, with the columns of FACT_SALES_ORDER_COLUMNS
+    """
+    # created_at and last_updated are already parsed to datetimes by the reader (see utils/table_schemas.py)
+    created_at = fact_sales_order["created_at"].dt
+    fact_sales_order["created_date"] = created_at.date.astype(str)
+    fact_sales_order["created_time"] = created_at.time.astype(str)
+
+    last_updated = fact_sales_order["last_updated"].dt
+    fact_sales_order["last_updated_date"] = last_updated.date.astype(str)
+    fact_sales_order["last_updated_time"] = last_updated.time.astype(str)
+    fact_sales_order["sales_staff_id"] = fact_sales_order["staff_id"]
+
+    fact_sales_order.drop(
+        columns=["created_at", "last_updated", "staff_id"], inplace=True
+    )
+
+    return fact_sales_order[FACT_SALES_ORDER_COLUMNS]
+
+
+def transform_fact_sales_order_chunked(
+    bucket_name,
+    key_prefix,
+    timestamp,
+    manifest=None,
+    batch_size=DEFAULT_FACT_BATCH_SIZE,
+    s3_client=None,
+):
+    """
+    This function makes the same fact table as transform_fact_sales_order, without ever holding all of it in memory:
+    - the most recent sales_order raw file is read batch_size rows at a time (see iter_raw_batches)
+    - each batch is mapped to the fact table's columns (see map_fact_sales_order), and written as one row group of
+      a parquet file, streamed to s3 as it is written (see utils/s3_multipart_writer.py), at
+      {key_prefix}/fact_sales_order-{timestamp}.parquet, like upload_dataframe_to_s3_parquet
+    - the distinct dates of each batch are collected for transform_dim_date as the batches go by
+
+    Peak memory is bounded by batch_size rows (and the multipart upload's part size), whatever the size of the
+    extract, as long as the raw file can be read in batches (ndjson, csv, parquet or a chunked extract).
+
+    Arguments:
+        - bucket_name (str): the processed data bucket
+        - key_prefix (str): the folder the parquet file is written to
+        - timestamp (str): the transform run's timestamp, used in the file name
+        - manifest (dict): the extract run's manifest, if given (see find_most_recent_filename)
+        - batch_size (int): rows read, transformed and written at a time
+        - s3_client: boto3 s3 client, the shared client (see utils/aws_clients.py) if not given
+
+    Returns:
+        - None if there is no new sales_order file, otherwise a dict:
+            {"s3_uri": the parquet file's uri, "row_count": rows written, "dates": set of the distinct dates}
+
+    Raises:
+        - Exception: a generic exception if an error occurs (nothing is left in s3).
+    """
+    try:
+        most_recent_file = find_most_recent_filename(
+            "sales_order", "fscifa-raw-data", manifest=manifest
+        )
+        if not most_recent_file:
+            return None
+        s3_client = s3_client or get_client("s3")
+        s3_key = f"{key_prefix.rstrip('/')}/fact_sales_order-{timestamp}.parquet"
+        row_count = 0
+        dates = set()
+        with S3MultipartWriter(bucket_name, s3_key, s3_client) as sink:
+            with pq.ParquetWriter(
+                sink, FACT_SALES_ORDER_SCHEMA, compression="snappy"
+            ) as writer:
+                for batch in iter_raw_batches(
+                    most_recent_file,
+                    "sales_order",
+                    "fscifa-raw-data",
+                    batch_size,
+                    chunk_keys=manifest_keys(manifest, "sales_order"),
+                ):
+                    fact_batch = map_fact_sales_order(batch)
+                    writer.write_table(
+                        pa.Table.from_pandas(
+                            fact_batch,
+                            schema=FACT_SALES_ORDER_SCHEMA,
+                            preserve_index=False,
+                        )
+                    )
+                    row_count += len(fact_batch)
+                    dates.update(fact_sales_order_dates(fact_batch))
+        print(f"Transformed {row_count} sales orders in batches of {batch_size}")
+        return {
+            "s3_uri": f"s3://{bucket_name}/{s3_key}",
+            "row_count": row_count,
+            "dates": dates,
+        }
     except Exception as err:
         print(f"Unable to make facts table: {err}.")
         raise err
 
 
-def transform_dim_date(fact_sales_order):
+def fact_sales_order_dates(fact_sales_order):
+    """
+    Returns the distinct dates (as "YYYY-MM-DD" strings) of a fact table (or of one batch of it): its created,
+    last updated, agreed payment and agreed delivery dates, in the order they are first found.
+    """
+    created_date = pd.Series(fact_sales_order["created_date"], name="date_id")
+    last_updated_date = pd.Series(fact_sales_order["last_updated_date"], name="date_id")
+    agreed_payment_date = pd.to_datetime(
+        fact_sales_order["agreed_payment_date"], errors="coerce"
+    )
+    agreed_delivery_date = pd.to_datetime(
+        fact_sales_order["agreed_delivery_date"], errors="coerce"
+    )
+
+    return (
+        pd.concat(
+            [
+                created_date.astype(str),
+                last_updated_date.astype(str),
+                pd.Series(agreed_payment_date, name="date_id").astype(str),
+                pd.Series(agreed_delivery_date, name="date_id").astype(str),
+            ],
+            ignore_index=True,
+        )
+        .drop_duplicates()
+        .dropna()
+        .reset_index(drop=True)
+    )
+
+
+def transform_dim_date(
+    fact_sales_order=None,
+    dates=None,
+    date_range=None,
+    calendar=False,
+    pending_range=None,
+):
     """
     This function takes in THE RESULT OF make_fact_sales_order_table(df_sales), i.e., a fact table for sales data
     It outputs a dimension table of date data
 
     Arguments:
         - fact_sales_order (pd.DataFrame): a fact table representing sales data, to occupy the centre of a star schema
+        - dates (iterable[str]): the distinct dates of the fact table, used instead of fact_sales_order when the fact
+          table was made in batches (see transform_fact_sales_order_chunked); the dimension table is sorted by date
+        - calendar (bool): if True, the dimension table is a contiguous calendar, from the first to the last date,
+          of only the days outside date_range, i.e. not sent yet (see utils/calendar_dim.py)
+        - date_range (tuple): (first date, last date) of the dim_date rows already loaded, see read_date_range
+        - pending_range (tuple): (first date, last date) of the dim_date rows uploaded by a previous run but not
+          loaded yet, sent again in calendar mode
 
     Returns:
         - pd.DataFrame: a Pandas dataframe, which is a dimensions table
+          (None in calendar mode if there are no new days)
 
     Raises:
         - Exception: a generic exception if an error occurs.
@@ -85,45 +251,23 @@ def transform_dim_date(fact_sales_order):
     """
     global dim_date
     try:
-        if fact_sales_order is not None:
-            created_date = pd.Series(fact_sales_order["created_date"], name="date_id")
-            last_updated_date = pd.Series(
-                fact_sales_order["last_updated_date"], name="date_id"
-            )
-            agreed_payment_date = pd.to_datetime(
-                fact_sales_order["agreed_payment_date"], errors="coerce"
-            )
-            agreed_delivery_date = pd.to_datetime(
-                fact_sales_order["agreed_delivery_date"], errors="coerce"
-            )
-
-            all_the_dates = (
-                pd.concat(
-                    [
-                        created_date.astype(str),
-                        last_updated_date.astype(str),
-                        pd.Series(agreed_payment_date, name="date_id").astype(str),
-                        pd.Series(agreed_delivery_date, name="date_id").astype(str),
-                    ],
-                    ignore_index=True,
-                )
-                .drop_duplicates()
-                .dropna()
-                .reset_index(drop=True)
+        if dates is not None:
+            all_the_dates = pd.Series(sorted(dates))
+        elif fact_sales_order is not None:
+            all_the_dates = fact_sales_order_dates(fact_sales_order)
+        else:
+            return None
+        if calendar:
+            new_dates = new_calendar_dates(all_the_dates, date_range, pending_range)
+            if new_dates.empty:
+                print("No new dates for dim_date")
+                return None
+            dim_date = calendar_dim_date(new_dates)
+        else:
+            dim_date = calendar_dim_date(
+                pd.to_datetime(all_the_dates, format="%Y-%m-%d")
             )
-
-            dim_date = pd.DataFrame()
-            dim_date["date_id"] = pd.to_datetime(all_the_dates, format="%Y-%m-%d")
-            dim_date["year"] = dim_date["date_id"].dt.year
-            dim_date["month"] = dim_date["date_id"].dt.month
-            dim_date["day"] = dim_date["date_id"].dt.day
-            dim_date["day_of_week"] = dim_date["date_id"].dt.dayofweek
-            dim_date["day_name"] = dim_date["date_id"].dt.day_name()
-            dim_date["month_name"] = dim_date["date_id"].dt.month_name()
-            dim_date["quarter"] = dim_date["date_id"].dt.quarter
-            dim_date["date_id"] = dim_date["date_id"].dt.date
-            return dim_date
-        return None
+        return dim_date
     except Exception as err:
         print(f"Unable to make dimensions table: {err}.")
         raise err
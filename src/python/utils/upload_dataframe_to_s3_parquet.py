@@ -1,5 +1,5 @@
-import boto3
 from io import BytesIO
+from utils.aws_clients import get_client
 
 
 def upload_dataframe_to_s3_parquet(
@@ -17,14 +17,16 @@ def upload_dataframe_to_s3_parquet(
     - df: dataframe of transformed table
     - table_name: name of the dimensions /fact table
     - bucket_name:The name of the target S3 bucket
-    - compression: One of ["snappy", "gzip", "brotli", "none"] user choice"""
+    - compression: One of ["snappy", "gzip", "brotli", "none"] user choice
+    - s3_client: boto3 s3 client to upload with, the shared client (see utils/aws_clients.py) if not given
+    """
     if compression not in ["snappy", "gzip", "brotli", "none"]:
         raise ValueError(f"Invalid compression: {compression}")
     """compression can be "snappy" => Fast compression, moderate size reduction
                         "gzip"  => Higher compression ratio, slower compression/decompression
                         "brotli"=> Very good compression ratio, slower, newer
                         "none"=> No Compression, larger file size but fastest to read/ write  """
-    s3_client = boto3.client("s3")
+    s3_client = s3_client or get_client("s3")
 
     # timestamp = datetime.now().isoformat()
     filename = f"{table_name}-{timestamp}.parquet"
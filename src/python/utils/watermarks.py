@@ -0,0 +1,89 @@
+import json
+from datetime import datetime
+from botocore.exceptions import ClientError
+
+WATERMARKS_KEY = "watermarks.json"
+LEGACY_LAST_UPDATED_KEY = "last_updated.txt"
+
+
+def read_watermarks(bucket_name, s3_client, table_list):
+    """
+    This function:
+    - reads the per-table high-water marks saved by the previous extract run (watermarks.json)
+    - if there is no watermarks.json yet, falls back to the old global last_updated.txt for every table
+    - if neither exists, returns no watermarks, so every table is fully extracted
+
+    It should be called once per run, before any table is extracted.
+
+    Arguments:
+    - bucket_name (str): the name of the raw data bucket
+    - s3_client: a boto3 s3 client
+    - table_list (list[str]): names of the tables being extracted
+
+    Returns:
+    - dict: table name -> last_updated value (str, "YYYY-MM-DD HH:MM:SS.ffffff") of the newest row already extracted
+    """
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=WATERMARKS_KEY)
+        return json.loads(response["Body"].read().decode("utf-8"))
+    except ClientError as err:
+        if err.response["Error"]["Code"] not in ["404", "NoSuchKey"]:
+            raise err
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=LEGACY_LAST_UPDATED_KEY)
+        last_updated = response["Body"].read().decode("utf-8").strip()
+        return {table: last_updated.replace("T", " ") for table in table_list}
+    except ClientError as err:
+        if err.response["Error"]["Code"] not in ["404", "NoSuchKey"]:
+            raise err
+    return {}
+
+
+def write_watermarks(watermarks, bucket_name, s3_client):
+    """
+    Saves all per-table high-water marks as a single json object. A single put_object either fully
+    replaces the previous watermarks or leaves them untouched, so the watermarks are never half written.
+
+    Arguments:
+    - watermarks (dict): table name -> last_updated value
+    - bucket_name (str): the name of the raw data bucket
+    - s3_client: a boto3 s3 client
+    """
+    s3_client.put_object(
+        Body=json.dumps(watermarks, sort_keys=True),
+        Bucket=bucket_name,
+        Key=WATERMARKS_KEY,
+    )
+    print(
+        f"Successfully uploaded {WATERMARKS_KEY} to s3://{bucket_name}/{WATERMARKS_KEY}"
+    )
+
+
+def max_last_updated(rows, current=None):
+    """
+    Returns the high-water mark for a table: the largest last_updated value among the rows actually extracted,
+    or current if no row is newer.
+
+    Arguments:
+    - rows (iterable[dict]): extracted table rows
+    - current (str): the table's existing watermark, if any
+
+    Returns:
+    - str: the new watermark, formatted as "YYYY-MM-DD HH:MM:SS.ffffff", or None
+    """
+    newest = parse_watermark(current) if current else None
+    for row in rows:
+        value = row.get("last_updated")
+        if value is None:
+            continue
+        if not isinstance(value, datetime):
+            value = parse_watermark(value)
+        if newest is None or value > newest:
+            newest = value
+    if newest is None:
+        return None
+    return newest.isoformat(sep=" ", timespec="microseconds")
+
+
+def parse_watermark(value):
+    return datetime.fromisoformat(str(value))
@@ -1,7 +1,13 @@
-import boto3
 from datetime import datetime
+from utils.aws_clients import get_client
+from utils.settings import get_setting
 from utils.insert_into_s3 import upload_json_to_s3
-from utils.transform_sales import transform_dim_date, transform_fact_sales_order
+from utils.transform_sales import (
+    DEFAULT_FACT_BATCH_SIZE,
+    transform_dim_date,
+    transform_fact_sales_order,
+    transform_fact_sales_order_chunked,
+)
 from utils.transform_dimension_tables import (
     transform_dim_counterparty,
     transform_dim_currency,
@@ -10,6 +16,14 @@ from utils.transform_dimension_tables import (
     transform_dim_staff,
 )
 from utils.upload_dataframe_to_s3_parquet import upload_dataframe_to_s3_parquet
+from utils.run_manifest import read_manifest, build_manifest, write_manifest
+from utils.table_cache import run_cache, reference_cache
+from utils.calendar_dim import (
+    PENDING_DATE_RANGE_KEY,
+    read_date_range,
+    write_date_range,
+    extend_date_range,
+)
 
 
 def lambda_handler(event, context):
@@ -18,6 +32,28 @@ def lambda_handler(event, context):
     - invoke util functions to create dataframes for dimension tables, and fact table, sales_order
     - creates parquet files containing these dataframes, by invoking function dataframe_to_parquet
     - uploads these parquet files to s3 bucket, "fscifa-processed-data"
+    - if the event has the extract run's "manifest_key" (passed on by the state machine), takes the new raw files
+      from that manifest (see utils/run_manifest.py) instead of listing the raw bucket and reading last_updated.txt
+    - writes its own run manifest of the uploaded parquet files, and returns its key for the load lambda
+    - reads each raw file at most once, through a cache that lasts for the invocation (see utils/table_cache.py),
+      and builds the fact table once for both dim_date and fact_sales_order
+    - keeps the frames of the small reference tables (address, currency, department) between invocations of a warm
+      container, reusing them as long as their ETags are unchanged (see reference_cache)
+    - makes dim_date a contiguous calendar, and only sends the days not loaded by a previous run: the range of days
+      already loaded is kept in "fscifa-processed-data" (state/dim_date_range.json, see utils/calendar_dim.py), and
+      only saved by the load lambda once it has inserted them. The days uploaded here are kept as pending
+      (state/dim_date_pending.json), and sent again by the next run until a load confirms them
+
+    Run settings can be given in the event (lower case), or as environment variables:
+        - TRANSFORM_FACT_MODE:
+            - "memory" (default): the fact table is built as one dataframe, and uploaded with the other tables
+            - "chunked": the sales_order raw file is read, transformed and written to parquet TRANSFORM_BATCH_SIZE
+              rows at a time (see transform_fact_sales_order_chunked), and dim_date is made from the dates
+              collected from each batch, so memory is bounded whatever the size of the extract (e.g. after a full
+              reload, with an ndjson, parquet or chunked extract)
+        - TRANSFORM_BATCH_SIZE: rows per batch in "chunked" mode (default 50000)
+
+    Returns: {"result": "success", "manifest_key": key of the transform run's manifest in "fscifa-processed-data"}
 
     """
 
@@ -31,37 +67,117 @@ def lambda_handler(event, context):
         "fact_sales_order",
     ]
 
-    s3_client = boto3.client("s3")
+    s3_client = get_client("s3")
     timestamp = datetime.now().isoformat(timespec="minutes")
-    for table in table_list:
-        table_name = table
-        if table == "dim_location":
-            df = transform_dim_location()
-        elif table == "dim_staff":
-            df = transform_dim_staff()
-        elif table == "dim_currency":
-            df = transform_dim_currency()
-        elif table == "dim_counterparty":
-            df = transform_dim_counterparty()
-        elif table == "dim_design":
-            df = transform_dim_design()
-        elif table == "dim_date":
-            fact_sales = transform_fact_sales_order()
-            df = transform_dim_date(fact_sales)
-        elif table == "fact_sales_order":
-            df = transform_fact_sales_order()
-        else:
-            print(f"No transformation function found for: {table}")
-            continue
-        if df is not None:
-            key_prefix = f"{table_name}"
-            upload_dataframe_to_s3_parquet(
-                df,
-                table_name,
+    manifest_key = (event or {}).get("manifest_key")
+    manifest = (
+        read_manifest("fscifa-raw-data", manifest_key, s3_client)
+        if manifest_key
+        else None
+    )
+    uploaded = {}
+    date_range = read_date_range("fscifa-processed-data", s3_client)
+    pending_range = read_date_range(
+        "fscifa-processed-data", s3_client, key=PENDING_DATE_RANGE_KEY
+    )
+    new_pending_range = None
+    fact_mode = get_setting(event, "TRANSFORM_FACT_MODE", "memory")
+    batch_size = int(
+        get_setting(event, "TRANSFORM_BATCH_SIZE", DEFAULT_FACT_BATCH_SIZE)
+    )
+    if fact_mode not in ["memory", "chunked"]:
+        raise ValueError(f"Invalid TRANSFORM_FACT_MODE: {fact_mode}")
+
+    def build_fact():
+        if fact_mode == "chunked":
+            return transform_fact_sales_order_chunked(
                 "fscifa-processed-data",
-                key_prefix,
-                timestamp=timestamp,
+                "fact_sales_order",
+                timestamp,
+                manifest=manifest,
+                batch_size=batch_size,
                 s3_client=s3_client,
             )
+        return transform_fact_sales_order(manifest=manifest)
+
+    with run_cache() as cache:
+        for table in table_list:
+            table_name = table
+            if table == "dim_location":
+                df = transform_dim_location(manifest=manifest)
+            elif table == "dim_staff":
+                df = transform_dim_staff(manifest=manifest)
+            elif table == "dim_currency":
+                df = transform_dim_currency(manifest=manifest)
+            elif table == "dim_counterparty":
+                df = transform_dim_counterparty(manifest=manifest)
+            elif table == "dim_design":
+                df = transform_dim_design(manifest=manifest)
+            elif table == "dim_date":
+                fact = cache.value("fact_sales_order", build_fact)
+                if fact_mode == "chunked":
+                    df = (
+                        transform_dim_date(
+                            dates=fact["dates"],
+                            date_range=date_range,
+                            pending_range=pending_range,
+                            calendar=True,
+                        )
+                        if fact
+                        else None
+                    )
+                else:
+                    df = transform_dim_date(
+                        fact,
+                        date_range=date_range,
+                        pending_range=pending_range,
+                        calendar=True,
+                    )
+            elif table == "fact_sales_order":
+                fact = cache.value("fact_sales_order", build_fact)
+                if fact_mode == "chunked":
+                    # already written to s3, batch by batch
+                    if fact:
+                        uploaded[table_name] = {
+                            "keys": [fact["s3_uri"].split("/", 3)[3]],
+                            "row_count": fact["row_count"],
+                        }
+                    continue
+                df = fact
+            else:
+                print(f"No transformation function found for: {table}")
+                continue
+            if df is not None:
+                key_prefix = f"{table_name}"
+                s3_uri = upload_dataframe_to_s3_parquet(
+                    df,
+                    table_name,
+                    "fscifa-processed-data",
+                    key_prefix,
+                    timestamp=timestamp,
+                    s3_client=s3_client,
+                )
+                uploaded[table_name] = {
+                    "keys": [s3_uri.split("/", 3)[3]],
+                    "row_count": len(df),
+                }
+                if table == "dim_date" and not df.empty:
+                    new_pending_range = extend_date_range(pending_range, df)
+        print(f"Table cache: {cache.hits} hits, {cache.misses} misses")
+        print(
+            f"Reference cache: {reference_cache().hits} hits, {reference_cache().misses} misses"
+        )
+    if new_pending_range:
+        write_date_range(
+            new_pending_range,
+            "fscifa-processed-data",
+            s3_client,
+            key=PENDING_DATE_RANGE_KEY,
+        )
     upload_json_to_s3(timestamp, "fscifa-processed-data", "last_updated.txt", s3_client)
-    return {"result": "success"}
+    manifest_key = write_manifest(
+        build_manifest(timestamp, "fscifa-processed-data", uploaded, s3_client),
+        "fscifa-processed-data",
+        s3_client,
+    )
+    return {"result": "success", "manifest_key": manifest_key}
@@ -37,7 +37,8 @@ data "aws_iam_policy_document" "allow_lambda_access_s3" {
     effect = "Allow"
     actions = [
       "s3:GetObject",
-      "s3:PutObject"
+      "s3:PutObject",
+      "s3:DeleteObject"
     ]
     resources = [
       "${aws_s3_bucket.ingestion_bucket.arn}/*"
@@ -32,8 +32,9 @@ resource "aws_lambda_function" "extract_lambda" {
 
   source_code_hash = filebase64sha256("${path.module}/../packages/${var.extract_lambda}/function.zip")
 
+  # the pandas layer provides pyarrow for the parquet extract format
   layers = [
-    aws_lambda_layer_version.db_layer.arn, aws_lambda_layer_version.utils_layer.arn
+    aws_lambda_layer_version.db_layer.arn, "arn:aws:lambda:eu-west-2:336392948345:layer:AWSSDKPandas-Python313:2", aws_lambda_layer_version.utils_layer.arn
   ]
   depends_on = [aws_s3_object.lambda_code, aws_s3_object.db_layer_object, aws_s3_object.utils_layer_object]
   environment {
@@ -43,6 +44,8 @@ resource "aws_lambda_function" "extract_lambda" {
       PG_USER     = var.pg_user
       PG_PASSWORD = var.pg_password
       PG_DATABASE = var.pg_database
+      EXTRACT_CONCURRENCY = var.extract_concurrency
+      EXTRACT_PREFLIGHT   = var.extract_preflight
     }
 }
 }
@@ -62,10 +65,18 @@ resource "aws_lambda_function" "transform_lambda" {
 
   source_code_hash = filebase64sha256("${path.module}/../packages/${var.transform_lambda}/function.zip")
 
+  # the db layer provides zstandard, to read zstd-compressed raw files
   layers = [
-    "arn:aws:lambda:eu-west-2:336392948345:layer:AWSSDKPandas-Python313:2", aws_lambda_layer_version.utils_layer.arn
+    aws_lambda_layer_version.db_layer.arn, "arn:aws:lambda:eu-west-2:336392948345:layer:AWSSDKPandas-Python313:2", aws_lambda_layer_version.utils_layer.arn
   ]
-  depends_on = [aws_s3_object.lambda_code, aws_s3_object.utils_layer_object]
+  depends_on = [aws_s3_object.lambda_code, aws_s3_object.utils_layer_object, aws_s3_object.db_layer_object]
+  environment {
+    variables = {
+      RAW_READ_CONCURRENCY = var.raw_read_concurrency
+      TRANSFORM_FACT_MODE  = var.transform_fact_mode
+      TRANSFORM_BATCH_SIZE = var.transform_batch_size
+    }
+  }
 }
 
 
@@ -27,6 +27,12 @@ resource "aws_sfn_state_machine" "sfn_state_machine" {
               "MaxAttempts" : 3,
               "BackoffRate" : 2,
               "JitterStrategy" : "FULL"
+            },
+            {
+              "ErrorEquals" : ["ExtractIncompleteError"],
+              "IntervalSeconds" : 1,
+              "MaxAttempts" : 10,
+              "BackoffRate" : 1
             }
           ],
           "Next" : "Lambda Invoke Transform"
@@ -36,7 +42,7 @@ resource "aws_sfn_state_machine" "sfn_state_machine" {
           "Resource" : "arn:aws:states:::lambda:invoke",
           "Parameters": {
             "FunctionName": "${aws_lambda_function.transform_lambda.arn}",
-            "Payload": { result : "success" }
+            "Payload": { "manifest_key.$" : "$.extractResult.Payload.manifest_key" }
           },
           "ResultPath": "$.transformResult",
           "Retry" : [
@@ -60,7 +66,7 @@ resource "aws_sfn_state_machine" "sfn_state_machine" {
             "Resource": "arn:aws:states:::lambda:invoke",
             "Parameters": {
               "FunctionName": "${aws_lambda_function.load_lambda.arn}",
-              "Payload": { result : "success" }
+              "Payload": { "manifest_key.$" : "$.transformResult.Payload.manifest_key" }
             },
             "ResultPath": "$.loadResult",
             # "Catch": [
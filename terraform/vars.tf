@@ -23,6 +23,34 @@ variable "python_runtime" {
   default = "python3.13"
 }
 
+# number of tables the extract lambda extracts at the same time (each uses its own totesys connection)
+variable "extract_concurrency" {
+  type    = number
+  default = 4
+}
+
+# "true" to skip the tables with nothing new, and extract the others in one read-only snapshot
+variable "extract_preflight" {
+  type    = string
+  default = "false"
+}
+
+# number of raw files the transform lambda reads at the same time in its historical scans
+variable "raw_read_concurrency" {
+  type    = number
+  default = 8
+}
+
+variable "transform_fact_mode" {
+  type    = string
+  default = "memory"
+}
+
+variable "transform_batch_size" {
+  type    = number
+  default = 50000
+}
+
 # shared db variables
 variable "pg_user" {
   sensitive = true
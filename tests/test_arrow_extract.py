@@ -0,0 +1,151 @@
+import os
+import sys
+import pytest
+import datetime
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import Mock
+from moto import mock_aws
+import boto3
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+from src.python.utils.arrow_extract import (
+    arrow_type_for_column,
+    extract_table_to_parquet,
+)
+from src.python.utils.extract_catalog import EXTRACT_CATALOG
+
+""" Tests for extracting tables to parquet through arrow """
+
+
+@pytest.fixture
+def aws_creds():
+    os.environ["AWS_ACCESS_KEY_ID"] = "Test"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "Test"
+    os.environ["AWS_SECURITY_TOKEN"] = "Test"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture()
+def s3_client(aws_creds):
+    with mock_aws():
+        s3_client = boto3.client("s3", region_name="eu-west-2")
+        s3_client.create_bucket(
+            Bucket="test-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        yield s3_client
+
+
+sales_columns = [
+    {"name": "sales_order_id", "type_oid": 23, "type_modifier": -1},
+    {"name": "unit_price", "type_oid": 1700, "type_modifier": 655366},
+    {"name": "agreed_delivery_date", "type_oid": 1043, "type_modifier": 14},
+    {"name": "last_updated", "type_oid": 1114, "type_modifier": 3},
+]
+
+
+class TestArrowTypeForColumn:
+    @pytest.mark.it("Testing postgres column types map onto arrow types")
+    def test_type_mapping(self):
+        assert arrow_type_for_column(sales_columns[0]) == pa.int32()
+        assert arrow_type_for_column(sales_columns[1]) == pa.decimal128(10, 2)
+        assert arrow_type_for_column(sales_columns[2]) == pa.string()
+        assert arrow_type_for_column(sales_columns[3]) == pa.timestamp("us")
+
+
+class TestExtractTableToParquet:
+    @pytest.mark.it("Testing rows are written to s3 as typed parquet")
+    def test_rows_written_as_parquet(self, s3_client):
+        mock_conn = Mock()
+        mock_conn.columns = sales_columns
+        fetches = iter(
+            [
+                [
+                    [1, Decimal("3.36"), "2025-06-22", datetime.datetime(2025, 6, 1)],
+                    [2, Decimal("1.50"), None, datetime.datetime(2025, 6, 3)],
+                ],
+                [],
+            ]
+        )
+        mock_conn.run.side_effect = lambda query: (
+            next(fetches) if query.startswith("FETCH") else []
+        )
+        result = extract_table_to_parquet(
+            "sales_order", "test-bucket", "sales.parquet", s3_client, mock_conn
+        )
+        assert result == {"row_count": 2, "watermark": "2025-06-03 00:00:00.000000"}
+        body = s3_client.get_object(Bucket="test-bucket", Key="sales.parquet")
+        df = pd.read_parquet(BytesIO(body["Body"].read()))
+        assert list(df["sales_order_id"]) == [1, 2]
+        assert str(df["sales_order_id"].dtype) == "int32"
+        assert list(df["unit_price"]) == [Decimal("3.36"), Decimal("1.50")]
+        assert df["agreed_delivery_date"][0] == "2025-06-22"
+        assert df["last_updated"][1] == pd.Timestamp("2025-06-03")
+
+    @pytest.mark.it("Testing the catalog's numerics are written as decimals")
+    def test_catalog_numerics_written_as_decimals(self, s3_client):
+        # the columns postgres describes for the catalog's select list: a numeric(p,s) cast keeps
+        # its precision and scale in the type modifier, ((p << 16) | s) + 4
+        type_oids = {"int": 23, "varchar": 1043, "timestamp": 1114}
+        columns = []
+        for name, column_type in EXTRACT_CATALOG["sales_order"]["columns"].items():
+            if column_type.startswith("numeric"):
+                precision, scale = map(int, column_type[8:-1].split(","))
+                columns.append(
+                    {
+                        "name": name,
+                        "type_oid": 1700,
+                        "type_modifier": ((precision << 16) | scale) + 4,
+                    }
+                )
+            else:
+                columns.append(
+                    {
+                        "name": name,
+                        "type_oid": type_oids[column_type],
+                        "type_modifier": -1,
+                    }
+                )
+        row = [
+            1,
+            datetime.datetime(2025, 6, 1),
+            datetime.datetime(2025, 6, 1),
+            2,
+            3,
+            4,
+            5,
+            Decimal("3.36"),
+            1,
+            "2025-06-22",
+            "2025-06-23",
+            6,
+        ]
+        fetches = iter([[row], []])
+        mock_conn = Mock()
+        mock_conn.columns = columns
+        mock_conn.run.side_effect = lambda query: (
+            next(fetches) if query.startswith("FETCH") else []
+        )
+        extract_table_to_parquet(
+            "sales_order", "test-bucket", "sales.parquet", s3_client, mock_conn
+        )
+        body = s3_client.get_object(Bucket="test-bucket", Key="sales.parquet")
+        schema = pq.read_schema(BytesIO(body["Body"].read()))
+        assert schema.field("unit_price").type == pa.decimal128(10, 2)
+
+    @pytest.mark.it("Testing no object is written when there are no rows")
+    def test_no_rows(self, s3_client):
+        mock_conn = Mock()
+        mock_conn.columns = sales_columns
+        mock_conn.run.return_value = []
+        result = extract_table_to_parquet(
+            "sales_order", "test-bucket", "sales.parquet", s3_client, mock_conn
+        )
+        assert result == {"row_count": 0, "watermark": None}
+        assert "Contents" not in s3_client.list_objects_v2(Bucket="test-bucket")
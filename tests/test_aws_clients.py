@@ -0,0 +1,89 @@
+import os
+import sys
+import pytest
+import pandas as pd
+from unittest.mock import Mock, patch
+from moto import mock_aws
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+from src.python.utils.aws_clients import get_client, reset_clients, CLIENT_CONFIG
+from src.python.utils.upload_dataframe_to_s3_parquet import (
+    upload_dataframe_to_s3_parquet,
+)
+
+""" Tests for the shared boto3 client factory """
+
+
+@pytest.fixture
+def aws_creds():
+    os.environ["AWS_ACCESS_KEY_ID"] = "Test"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "Test"
+    os.environ["AWS_SECURITY_TOKEN"] = "Test"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture
+def clean_clients(aws_creds):
+    reset_clients()
+    yield
+    reset_clients()
+
+
+class TestGetClient:
+    @pytest.mark.it("Testing the same client is returned every time")
+    def test_client_is_cached(self, clean_clients):
+        with mock_aws():
+            assert get_client("s3") is get_client("s3")
+            assert get_client("s3") is not get_client("sts")
+
+    @pytest.mark.it("Testing the client is created with the pooled, tuned config")
+    def test_client_config(self, clean_clients):
+        with mock_aws():
+            config = get_client("s3").meta.config
+        assert config.max_pool_connections == CLIENT_CONFIG.max_pool_connections
+        assert config.tcp_keepalive is True
+        assert config.retries["mode"] == "adaptive"
+        assert config.connect_timeout == 5
+
+    @pytest.mark.it("Testing reset_clients makes the next call create a new client")
+    def test_reset_clients(self, clean_clients):
+        with mock_aws():
+            client = get_client("s3")
+            reset_clients()
+            assert get_client("s3") is not client
+
+    @pytest.mark.it("Testing the shared client works with moto")
+    def test_shared_client_is_mocked(self, clean_clients):
+        with mock_aws():
+            s3_client = get_client("s3")
+            s3_client.create_bucket(
+                Bucket="test-bucket",
+                CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+            )
+            s3_client.put_object(Bucket="test-bucket", Key="a.txt", Body=b"a")
+            assert s3_client.list_objects_v2(Bucket="test-bucket")["KeyCount"] == 1
+
+
+class TestUploadDataframeClient:
+    @pytest.mark.it("Testing the given s3_client is used instead of the shared one")
+    def test_given_client_is_used(self):
+        s3_client = Mock()
+        with patch(
+            "src.python.utils.upload_dataframe_to_s3_parquet.get_client"
+        ) as mock_get_client:
+            upload_dataframe_to_s3_parquet(
+                pd.DataFrame({"id": [1]}),
+                "dim_staff",
+                "test-bucket",
+                "dim_staff",
+                "2025-06-09T00-00-00",
+                s3_client=s3_client,
+            )
+        mock_get_client.assert_not_called()
+        s3_client.put_object.assert_called_once()
+        assert (
+            s3_client.put_object.call_args.kwargs["Key"]
+            == "dim_staff/dim_staff-2025-06-09T00-00-00.parquet"
+        )
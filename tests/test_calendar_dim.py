@@ -0,0 +1,127 @@
+import os
+import sys
+import datetime
+import pytest
+import pandas as pd
+from moto import mock_aws
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+from src.python.utils.calendar_dim import (
+    DATE_RANGE_KEY,
+    calendar_dim_date,
+    extend_date_range,
+    new_calendar_dates,
+    read_date_range,
+    write_date_range,
+)
+
+""" Tests for the incremental calendar dim_date """
+
+
+@pytest.fixture
+def aws_creds():
+    os.environ["AWS_ACCESS_KEY_ID"] = "Test"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "Test"
+    os.environ["AWS_SECURITY_TOKEN"] = "Test"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture()
+def s3_client(aws_creds):
+    with mock_aws():
+        s3_client = boto3.client("s3", region_name="eu-west-2")
+        s3_client.create_bucket(
+            Bucket="test-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        yield s3_client
+
+
+class TestDateRangeState:
+    @pytest.mark.it("Testing no range is read before any is saved")
+    def test_no_state(self, s3_client):
+        assert read_date_range("test-bucket", s3_client) is None
+
+    @pytest.mark.it("Testing the saved range is read back")
+    def test_round_trip(self, s3_client):
+        write_date_range(("2022-11-03", "2025-05-29"), "test-bucket", s3_client)
+        assert s3_client.get_object(Bucket="test-bucket", Key=DATE_RANGE_KEY)
+        assert read_date_range("test-bucket", s3_client) == (
+            "2022-11-03",
+            "2025-05-29",
+        )
+
+
+class TestCalendarDimDate:
+    @pytest.mark.it("Testing every attribute of dim_date is computed for each date")
+    def test_attributes(self):
+        dim_date = calendar_dim_date(pd.date_range("2022-02-20", "2022-02-21"))
+        assert list(dim_date["date_id"]) == [
+            datetime.date(2022, 2, 20),
+            datetime.date(2022, 2, 21),
+        ]
+        assert list(dim_date["year"]) == [2022, 2022]
+        assert list(dim_date["month"]) == [2, 2]
+        assert list(dim_date["day"]) == [20, 21]
+        assert list(dim_date["day_of_week"]) == [6, 0]
+        assert list(dim_date["day_name"]) == ["Sunday", "Monday"]
+        assert list(dim_date["month_name"]) == ["February", "February"]
+        assert list(dim_date["quarter"]) == [1, 1]
+
+
+class TestNewCalendarDates:
+    @pytest.mark.it(
+        "Testing every day from the first to the last date is new when nothing was sent"
+    )
+    def test_first_run(self):
+        new_dates = new_calendar_dates(["2022-11-05", "2022-11-03", "NaT"])
+        assert list(new_dates.strftime("%Y-%m-%d")) == [
+            "2022-11-03",
+            "2022-11-04",
+            "2022-11-05",
+        ]
+
+    @pytest.mark.it("Testing only the days outside the range already sent are new")
+    def test_outside_range(self):
+        new_dates = new_calendar_dates(
+            ["2022-11-01", "2022-11-04", "2022-11-12"], ("2022-11-03", "2022-11-10")
+        )
+        assert list(new_dates.strftime("%Y-%m-%d")) == [
+            "2022-11-01",
+            "2022-11-02",
+            "2022-11-11",
+            "2022-11-12",
+        ]
+
+    @pytest.mark.it("Testing no days are new when every date was already sent")
+    def test_inside_range(self):
+        assert new_calendar_dates(
+            ["2022-11-04", "2022-11-10"], ("2022-11-03", "2022-11-10")
+        ).empty
+        assert new_calendar_dates([]).empty
+
+    @pytest.mark.it("Testing the days pending a load are sent again")
+    def test_pending_range(self):
+        new_dates = new_calendar_dates(
+            ["2022-11-12"], ("2022-11-03", "2022-11-08"), ("2022-11-09", "2022-11-10")
+        )
+        assert list(new_dates.strftime("%Y-%m-%d")) == [
+            "2022-11-09",
+            "2022-11-10",
+            "2022-11-11",
+            "2022-11-12",
+        ]
+
+
+class TestExtendDateRange:
+    @pytest.mark.it("Testing the range is extended to the dates just sent")
+    def test_extends(self):
+        dim_date = calendar_dim_date(pd.date_range("2022-11-11", "2022-11-12"))
+        assert extend_date_range(None, dim_date) == ("2022-11-11", "2022-11-12")
+        assert extend_date_range(("2022-11-03", "2022-11-10"), dim_date) == (
+            "2022-11-03",
+            "2022-11-12",
+        )
@@ -0,0 +1,238 @@
+import os
+import sys
+import json
+import pytest
+from moto import mock_aws
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+from src.python.utils.cdc_extract import (
+    parse_change,
+    ChangeBuffer,
+    ensure_replication_slot,
+    extract_changes_to_s3,
+    advance_slot,
+    deletes_key,
+)
+
+""" Tests for the logical replication (CDC) extract """
+
+
+@pytest.fixture
+def aws_creds():
+    os.environ["AWS_ACCESS_KEY_ID"] = "Test"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "Test"
+    os.environ["AWS_SECURITY_TOKEN"] = "Test"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture()
+def s3_client(aws_creds):
+    with mock_aws():
+        s3_client = boto3.client("s3", region_name="eu-west-2")
+        s3_client.create_bucket(
+            Bucket="test-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        yield s3_client
+
+
+class FakeSlotConnection:
+    """
+    A stand-in for a pg8000 connection to a database with a test_decoding replication slot:
+    changes are peeked from a list, and removed from it when the slot is advanced
+    """
+
+    def __init__(self, changes, slot_exists=True):
+        self.changes = changes
+        self.slot_exists = slot_exists
+        self.queries = []
+
+    def run(self, query, **params):
+        self.queries.append(query)
+        if "FROM pg_replication_slots" in query:
+            return [[1]] if self.slot_exists else []
+        if "pg_create_logical_replication_slot" in query:
+            self.slot_exists = True
+        if "pg_logical_slot_peek_changes" in query:
+            return list(self.changes)
+        if "pg_replication_slot_advance" in query:
+            self.changes = [
+                change for change in self.changes if change[0] > params["lsn"]
+            ]
+        return []
+
+
+STAFF_INSERT = (
+    "table public.staff: INSERT: staff_id[integer]:1 first_name[character varying]:'Jeremie' "
+    "last_name[character varying]:'O''Franey' department_id[integer]:2 "
+    "email_address[character varying]:'jeremie.franey@terrifictotes.com' "
+    "created_at[timestamp without time zone]:'2022-11-03 14:20:51.563' "
+    "last_updated[timestamp without time zone]:'2022-11-03 14:20:51.563'"
+)
+
+STAFF_UPDATE = (
+    "table public.staff: UPDATE: staff_id[integer]:1 first_name[character varying]:'Jerry' "
+    "last_name[character varying]:'O''Franey' department_id[integer]:null "
+    "email_address[character varying]:'jeremie.franey@terrifictotes.com' "
+    "created_at[timestamp without time zone]:'2022-11-03 14:20:51.563' "
+    "last_updated[timestamp without time zone]:'2025-06-01 09:00:00'"
+)
+
+
+class TestParseChange:
+    @pytest.mark.it("Testing an insert is parsed into a typed row")
+    def test_parse_insert(self):
+        assert parse_change(STAFF_INSERT) == {
+            "table": "staff",
+            "operation": "INSERT",
+            "row": {
+                "staff_id": 1,
+                "first_name": "Jeremie",
+                "last_name": "O'Franey",
+                "department_id": 2,
+                "email_address": "jeremie.franey@terrifictotes.com",
+                "created_at": "2022-11-03 14:20:51.563000",
+                "last_updated": "2022-11-03 14:20:51.563000",
+            },
+        }
+
+    @pytest.mark.it("Testing numerics stay strings and nulls are None")
+    def test_parse_numeric_and_null(self):
+        change = parse_change(
+            "table public.sales_order: UPDATE: sales_order_id[integer]:5 unit_price[numeric]:3.94 "
+            "agreed_delivery_date[character varying]:null"
+        )
+        assert change["row"] == {
+            "sales_order_id": 5,
+            "unit_price": "3.94",
+            "agreed_delivery_date": None,
+        }
+
+    @pytest.mark.it(
+        "Testing transaction markers and deletes without key data are ignored"
+    )
+    def test_ignored_lines(self):
+        assert parse_change("BEGIN 529") is None
+        assert parse_change("COMMIT 529") is None
+        assert parse_change("table public.staff: DELETE: (no-tuple-data)") is None
+
+    @pytest.mark.it("Testing an update of the key keeps the old key")
+    def test_parse_key_update(self):
+        change = parse_change(
+            "table public.currency: UPDATE: old-key: currency_id[integer]:1 "
+            "new-tuple: currency_id[integer]:9 currency_code[character]:'GBP'"
+        )
+        assert change["old_row"] == {"currency_id": 1}
+        assert change["row"] == {"currency_id": 9, "currency_code": "GBP"}
+
+
+class TestChangeBuffer:
+    @pytest.mark.it("Testing only the latest state of each row is kept")
+    def test_latest_state_kept(self):
+        buffer = ChangeBuffer(["staff", "currency"])
+        buffer.add(parse_change(STAFF_INSERT))
+        buffer.add(parse_change(STAFF_UPDATE))
+        buffer.add(
+            parse_change("table public.currency: DELETE: currency_id[integer]:3")
+        )
+        buffer.add(parse_change("table public.design: DELETE: design_id[integer]:3"))
+        assert list(buffer.upserts["staff"].values()) == [
+            {
+                "staff_id": 1,
+                "first_name": "Jerry",
+                "last_name": "O'Franey",
+                "department_id": None,
+                "email_address": "jeremie.franey@terrifictotes.com",
+                "last_updated": "2025-06-01 09:00:00",
+            }
+        ]
+        assert buffer.deletes["currency"] == {3: {"currency_id": 3}}
+        assert "design" not in buffer.deletes
+
+    @pytest.mark.it("Testing a deleted row isn't uploaded")
+    def test_delete_after_insert(self):
+        buffer = ChangeBuffer(["staff"])
+        buffer.add(parse_change(STAFF_INSERT))
+        buffer.add(parse_change("table public.staff: DELETE: staff_id[integer]:1"))
+        assert buffer.upserts["staff"] == {}
+        assert buffer.deletes["staff"] == {1: {"staff_id": 1}}
+
+
+class TestEnsureReplicationSlot:
+    @pytest.mark.it("Testing the slot is created only if it doesn't exist")
+    def test_slot_created_once(self):
+        conn = FakeSlotConnection([], slot_exists=False)
+        assert ensure_replication_slot(conn) is True
+        assert ensure_replication_slot(conn) is False
+        assert sum("pg_create_logical_replication_slot" in q for q in conn.queries) == 1
+
+
+class TestExtractChangesToS3:
+    @pytest.mark.it(
+        "Testing changed tables are uploaded in the raw layout, and the slot is left for the caller to advance"
+    )
+    def test_changes_uploaded(self, s3_client):
+        conn = FakeSlotConnection(
+            [
+                ["0/16B3748", "529", "BEGIN 529"],
+                ["0/16B3748", "529", STAFF_INSERT],
+                [
+                    "0/16B3750",
+                    "529",
+                    "table public.currency: DELETE: currency_id[integer]:3",
+                ],
+                ["0/16B3790", "529", "COMMIT 529"],
+            ]
+        )
+        results, last_lsn = extract_changes_to_s3(
+            ["staff", "currency", "design"],
+            "2025-06-01T09:30:00.000001",
+            "test-bucket",
+            s3_client,
+            conn,
+            watermarks={"design": "2025-01-01 00:00:00.000000"},
+        )
+        assert results["staff"]["key"] == "staff/staff-2025-06-01T09:30:00.000001.json"
+        assert results["staff"]["watermark"] == "2022-11-03 14:20:51.563000"
+        assert results["currency"]["key"] is None
+        assert results["currency"]["deletes_key"] == (
+            "currency/deletes/currency-2025-06-01T09:30:00.000001.json"
+        )
+        assert results["design"] == {
+            "key": None,
+            "row_count": 0,
+            "watermark": "2025-01-01 00:00:00.000000",
+            "deletes_key": None,
+            "delete_count": 0,
+        }
+        body = s3_client.get_object(Bucket="test-bucket", Key=results["staff"]["key"])
+        assert json.loads(body["Body"].read())["staff"][0]["first_name"] == "Jeremie"
+        assert last_lsn == "0/16B3790"
+        assert len(conn.changes) == 4
+        advance_slot(conn, last_lsn)
+        assert conn.changes == []
+
+    @pytest.mark.it("Testing the slot isn't advanced if the upload fails")
+    def test_slot_not_advanced_on_failure(self, s3_client):
+        conn = FakeSlotConnection([["0/16B3748", "529", STAFF_INSERT]])
+        with pytest.raises(Exception):
+            extract_changes_to_s3(["staff"], "2025", "missing-bucket", s3_client, conn)
+        assert len(conn.changes) == 1
+
+
+class TestDeletesKey:
+    @pytest.mark.it(
+        "Testing the deletes key follows the raw key layout, under deletes/"
+    )
+    def test_deletes_key_layouts(self):
+        assert deletes_key("staff", "2025-05-29T11:06:18.399084") == (
+            "staff/deletes/staff-2025-05-29T11:06:18.399084.json"
+        )
+        assert deletes_key(
+            "staff", "2025-05-29T11:06:18.399084", "gzip", key_layout="hive"
+        ) == (
+            "staff/deletes/dt=2025-05-29/hour=11/part-2025-05-29T11:06:18.399084.json.gz"
+        )
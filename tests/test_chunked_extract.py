@@ -0,0 +1,157 @@
+import os
+import sys
+import json
+import time
+import pytest
+from unittest.mock import Mock, patch
+from moto import mock_aws
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+from src.python.utils.chunked_extract import (
+    extract_table_in_chunks,
+    read_checkpoint,
+    write_checkpoint,
+    delete_checkpoints,
+    chunk_key,
+    chunk_keys,
+)
+
+""" Tests for the resumable chunked extract """
+
+
+@pytest.fixture
+def aws_creds():
+    os.environ["AWS_ACCESS_KEY_ID"] = "Test"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "Test"
+    os.environ["AWS_SECURITY_TOKEN"] = "Test"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture()
+def s3_client(aws_creds):
+    with mock_aws():
+        s3_client = boto3.client("s3", region_name="eu-west-2")
+        s3_client.create_bucket(
+            Bucket="test-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        yield s3_client
+
+
+def chunks_of(table_rows):
+    """A fake extract_db_chunk paging through table_rows by staff_id"""
+
+    def extract_chunk(table_name, last_updated, after_id, chunk_size, conn=None):
+        return [row for row in table_rows if row["staff_id"] > after_id][:chunk_size]
+
+    return extract_chunk
+
+
+STAFF_ROWS = [
+    {"staff_id": i, "last_updated": f"2025-05-0{i} 10:00:00.000000"}
+    for i in range(1, 6)
+]
+
+
+class TestChunkKey:
+    @pytest.mark.it("Testing chunk keys in the flat and hive key layouts")
+    def test_chunk_key(self):
+        assert (
+            chunk_key("staff", "2025-05-29T11:06:18.399084", 2)
+            == "staff/staff-2025-05-29T11:06:18.399084-part-00002.json"
+        )
+        assert (
+            chunk_key("staff", "2025-05-29T11:06:18.399084", 2, "hive")
+            == "staff/dt=2025-05-29/hour=11/part-2025-05-29T11:06:18.399084-part-00002.json"
+        )
+        assert (
+            chunk_key("staff", "2025-05-29T11:06:18.399084", 2, compression="gzip")
+            == "staff/staff-2025-05-29T11:06:18.399084-part-00002.json.gz"
+        )
+
+    @pytest.mark.it("Testing every chunk's key is derived from the last chunk's key")
+    def test_chunk_keys(self):
+        assert chunk_keys(
+            "staff/dt=2025-05-29/hour=11/part-2025-05-29T11:06:18.399084-part-00003.json.zst"
+        ) == [
+            f"staff/dt=2025-05-29/hour=11/part-2025-05-29T11:06:18.399084-part-0000{part}.json.zst"
+            for part in [1, 2, 3]
+        ]
+
+
+class TestExtractTableInChunks:
+    @pytest.mark.it("Testing each chunk is uploaded as its own raw file")
+    @patch("src.python.utils.chunked_extract.extract_db_chunk")
+    def test_uploads_each_chunk(self, mock_extract_chunk, s3_client):
+        mock_extract_chunk.side_effect = chunks_of(STAFF_ROWS)
+        checkpoint = extract_table_in_chunks(
+            "staff", "2025", "test-bucket", s3_client, Mock(), chunk_size=2
+        )
+        assert checkpoint == {
+            "timestamp": "2025",
+            "last_id": 5,
+            "part": 3,
+            "row_count": 5,
+            "watermark": "2025-05-05 10:00:00.000000",
+            "complete": True,
+            "key_layout": "flat",
+            "compression": None,
+        }
+        body = s3_client.get_object(
+            Bucket="test-bucket", Key="staff/staff-2025-part-00002.json"
+        )["Body"].read()
+        assert json.loads(body) == {"staff": STAFF_ROWS[2:4]}
+        assert read_checkpoint("staff", "test-bucket", s3_client) == checkpoint
+
+    @pytest.mark.it("Testing stops after the deadline and resumes from the checkpoint")
+    @patch("src.python.utils.chunked_extract.extract_db_chunk")
+    def test_resumes_from_checkpoint(self, mock_extract_chunk, s3_client):
+        mock_extract_chunk.side_effect = chunks_of(STAFF_ROWS)
+        stopped = extract_table_in_chunks(
+            "staff",
+            "2025",
+            "test-bucket",
+            s3_client,
+            Mock(),
+            chunk_size=2,
+            deadline=time.monotonic() - 1,
+        )
+        assert stopped["complete"] is False
+        assert stopped["part"] == 0
+        write_checkpoint(
+            {**stopped, "last_id": 2, "part": 1, "row_count": 2},
+            "staff",
+            "test-bucket",
+            s3_client,
+        )
+        resumed = extract_table_in_chunks(
+            "staff",
+            "2026",
+            "test-bucket",
+            s3_client,
+            Mock(),
+            chunk_size=2,
+            checkpoint=read_checkpoint("staff", "test-bucket", s3_client),
+        )
+        assert resumed["complete"] is True
+        assert resumed["row_count"] == 5
+        keys = [
+            obj["Key"]
+            for obj in s3_client.list_objects_v2(Bucket="test-bucket", Prefix="staff/")[
+                "Contents"
+            ]
+        ]
+        assert keys == [
+            "staff/staff-2025-part-00002.json",
+            "staff/staff-2025-part-00003.json",
+        ]
+        assert mock_extract_chunk.call_args_list[-2].args[2] == 2
+
+    @pytest.mark.it("Testing checkpoints are removed once the run is finished")
+    def test_delete_checkpoints(self, s3_client):
+        write_checkpoint({"complete": True}, "staff", "test-bucket", s3_client)
+        delete_checkpoints(["staff", "address"], "test-bucket", s3_client)
+        assert read_checkpoint("staff", "test-bucket", s3_client) is None
@@ -0,0 +1,61 @@
+import os
+import sys
+import io
+import pytest
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+from src.python.utils.compression import (
+    codec_from_key,
+    strip_codec_suffix,
+    codec_suffix,
+    compress,
+    compressing_writer,
+    decompressing_reader,
+)
+
+""" Tests for the raw data compression codecs """
+
+
+class TestCodecKeys:
+    @pytest.mark.it("Testing the codec is read from the key suffix")
+    def test_codec_from_key(self):
+        assert codec_from_key("address/address-2025.json.gz") == "gzip"
+        assert codec_from_key("address/address-2025.csv.zst") == "zstd"
+        assert codec_from_key("address/address-2025.json") is None
+
+    @pytest.mark.it("Testing the codec suffix is removed from the key")
+    def test_strip_codec_suffix(self):
+        assert strip_codec_suffix("address-2025.ndjson.zst") == "address-2025.ndjson"
+        assert strip_codec_suffix("address-2025.json") == "address-2025.json"
+
+    @pytest.mark.it("Testing raises ValueError for an unknown codec")
+    def test_unknown_codec(self):
+        assert codec_suffix(None) == ""
+        with pytest.raises(ValueError, match="Invalid compression"):
+            codec_suffix("lz4")
+
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd"])
+class TestCompressionRoundTrip:
+    @pytest.mark.it("Testing a compressed document is read back line by line")
+    def test_compress_and_read_lines(self, codec):
+        data = compress('{"id": 1}\n{"id": 2}\n', codec)
+        assert list(decompressing_reader(io.BytesIO(data), codec)) == [
+            b'{"id": 1}\n',
+            b'{"id": 2}\n',
+        ]
+
+    @pytest.mark.it("Testing a compressed stream doesn't close the underlying file")
+    def test_compressing_writer(self, codec):
+        target = io.BytesIO()
+        writer = compressing_writer(target, codec)
+        for i in range(1000):
+            writer.write(f"row {i}\n".encode("utf-8"))
+        writer.close()
+        assert not target.closed
+        target.seek(0)
+        lines = decompressing_reader(target, codec).read().decode("utf-8").splitlines()
+        assert len(lines) == 1000
+        assert lines[-1] == "row 999"
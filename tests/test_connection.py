@@ -0,0 +1,65 @@
+import sys
+import os
+from unittest.mock import Mock, patch
+import pytest
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+import src.python.db.connection as connection
+from src.python.db.connection import db_connection, close_all_connections
+
+"""Tests for the database connection pool"""
+
+
+@pytest.fixture(autouse=True)
+def empty_pool():
+    close_all_connections()
+    yield
+    close_all_connections()
+
+
+class TestDBConnection:
+    @pytest.mark.it("Testing a connection is reused by the next borrower")
+    @patch("src.python.db.connection.connect_to_db")
+    def test_connection_reused(self, mock_connect_to_db):
+        mock_connect_to_db.return_value = Mock()
+        with db_connection() as first:
+            pass
+        with db_connection() as second:
+            pass
+        assert first is second
+        mock_connect_to_db.assert_called_once()
+
+    @pytest.mark.it("Testing a stale idle connection is replaced")
+    @patch("src.python.db.connection.connect_to_db")
+    def test_stale_connection_replaced(self, mock_connect_to_db):
+        stale_conn = Mock()
+        fresh_conn = Mock()
+        mock_connect_to_db.side_effect = [stale_conn, fresh_conn]
+        with db_connection():
+            pass
+        stale_conn.run.side_effect = Exception("server closed the connection")
+        with patch.object(connection, "HEALTH_CHECK_INTERVAL", 0):
+            with db_connection() as conn:
+                assert conn is fresh_conn
+        stale_conn.close.assert_called_once()
+
+    @pytest.mark.it("Testing a connection is closed, not pooled, if the block raises")
+    @patch("src.python.db.connection.connect_to_db")
+    def test_connection_discarded_on_error(self, mock_connect_to_db):
+        mock_conn = Mock()
+        mock_connect_to_db.return_value = mock_conn
+        with pytest.raises(ValueError):
+            with db_connection():
+                raise ValueError("query failed")
+        mock_conn.close.assert_called_once()
+        assert connection._idle_connections == []
+
+    @pytest.mark.it("Testing raises ConnectionError when the database is unreachable")
+    @patch("src.python.db.connection.connect_to_db")
+    def test_raises_when_unable_to_connect(self, mock_connect_to_db):
+        mock_connect_to_db.return_value = None
+        with pytest.raises(ConnectionError):
+            with db_connection():
+                pass
@@ -0,0 +1,124 @@
+import os
+import sys
+import gzip
+import pytest
+from datetime import datetime
+from unittest.mock import Mock
+from moto import mock_aws
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+from src.python.utils.copy_extract import copy_table_to_s3, check_raw_copy_format
+
+""" Tests for the COPY TO STDOUT bulk extract """
+
+STAFF_SELECT = (
+    "staff_id::int, first_name::varchar, last_name::varchar, department_id::int, "
+    "email_address::varchar, last_updated::timestamp"
+)
+
+
+@pytest.fixture
+def aws_creds():
+    os.environ["AWS_ACCESS_KEY_ID"] = "Test"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "Test"
+    os.environ["AWS_SECURITY_TOKEN"] = "Test"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture()
+def s3_client(aws_creds):
+    with mock_aws():
+        s3_client = boto3.client("s3", region_name="eu-west-2")
+        s3_client.create_bucket(
+            Bucket="test-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        yield s3_client
+
+
+def mock_copy_connection(copy_output, row_count):
+    """A mock connection which writes copy_output to the stream given to a COPY query"""
+    mock_conn = Mock()
+
+    def run(query, stream=None):
+        if query.startswith("COPY"):
+            for chunk in copy_output:
+                stream.write(chunk)
+            mock_conn.row_count = row_count
+        if query.startswith("SELECT max(last_updated)"):
+            return [[datetime(2025, 6, 1, 12, 0, 0, 5)]]
+        return []
+
+    mock_conn.run.side_effect = run
+    return mock_conn
+
+
+class TestCopyTableToS3:
+    @pytest.mark.it("Testing that the COPY output is uploaded unchanged to s3")
+    def test_copy_output_uploaded(self, s3_client):
+        mock_conn = mock_copy_connection(
+            [b"staff_id,first_name\n", b"1,person\n", b"2,person\n"], 2
+        )
+        result = copy_table_to_s3(
+            "staff", "test-bucket", "staff/staff.csv", s3_client, mock_conn
+        )
+        body = s3_client.get_object(Bucket="test-bucket", Key="staff/staff.csv")
+        assert body["Body"].read() == b"staff_id,first_name\n1,person\n2,person\n"
+        assert result == {"row_count": 2, "watermark": "2025-06-01 12:00:00.000005"}
+
+    @pytest.mark.it("Testing that the COPY output is gzipped for a .csv.gz key")
+    def test_copy_output_gzipped(self, s3_client):
+        mock_conn = mock_copy_connection([b"staff_id\n", b"1\n", b"2\n"], 2)
+        copy_table_to_s3(
+            "staff", "test-bucket", "staff/staff.csv.gz", s3_client, mock_conn
+        )
+        body = s3_client.get_object(Bucket="test-bucket", Key="staff/staff.csv.gz")
+        assert body["ContentEncoding"] == "gzip"
+        assert gzip.decompress(body["Body"].read()) == b"staff_id\n1\n2\n"
+
+    @pytest.mark.it("Testing the incremental query is copied inside one snapshot")
+    def test_copy_query(self, s3_client):
+        mock_conn = mock_copy_connection([b"staff_id\n", b"1\n"], 1)
+        copy_table_to_s3(
+            "staff",
+            "test-bucket",
+            "staff/staff.csv",
+            s3_client,
+            mock_conn,
+            last_updated="2025-05-29 10:58:12",
+        )
+        queries = [call.args[0] for call in mock_conn.run.call_args_list]
+        assert queries == [
+            "START TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY;",
+            f"COPY (SELECT {STAFF_SELECT} FROM staff WHERE last_updated > '2025-05-29 10:58:12') "
+            "TO STDOUT WITH (FORMAT csv, HEADER true);",
+            "SELECT max(last_updated) FROM staff WHERE last_updated > '2025-05-29 10:58:12';",
+            "COMMIT;",
+        ]
+
+    @pytest.mark.it("Testing that no object is created when no rows are copied")
+    def test_no_rows_copied(self, s3_client):
+        mock_conn = mock_copy_connection([b"staff_id,first_name\n"], 0)
+        result = copy_table_to_s3(
+            "staff", "test-bucket", "staff/staff.csv", s3_client, mock_conn
+        )
+        assert result == {"row_count": 0, "watermark": None}
+        assert "Contents" not in s3_client.list_objects_v2(Bucket="test-bucket")
+
+    @pytest.mark.it(
+        "Testing that only the formats the transform lambda reads can go to the raw data bucket"
+    )
+    def test_raw_copy_formats(self):
+        check_raw_copy_format("csv")
+        with pytest.raises(ValueError):
+            check_raw_copy_format("binary")
+
+    @pytest.mark.it("Testing that an unsupported format raises ValueError")
+    def test_invalid_format(self, s3_client):
+        with pytest.raises(ValueError):
+            copy_table_to_s3(
+                "staff", "test-bucket", "key", s3_client, Mock(), copy_format="xml"
+            )
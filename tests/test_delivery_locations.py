@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+import pytest
+from unittest.mock import patch
+from moto import mock_aws
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+from src.python.utils.delivery_locations import (
+    read_delivery_locations,
+    write_delivery_locations,
+    update_delivery_locations,
+)
+from utils.json_to_pd_dataframe import json_to_pd_dataframe
+
+""" Tests for the incremental delivery location state of dim_location """
+
+
+@pytest.fixture
+def aws_creds():
+    os.environ["AWS_ACCESS_KEY_ID"] = "Test"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "Test"
+    os.environ["AWS_SECURITY_TOKEN"] = "Test"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture()
+def s3_client(aws_creds):
+    with mock_aws():
+        s3_client = boto3.client("s3", region_name="eu-west-2")
+        s3_client.create_bucket(
+            Bucket="test-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        yield s3_client
+
+
+def put_sales_orders(s3_client, key, location_ids):
+    rows = [
+        {"sales_order_id": i, "agreed_delivery_location_id": location_id}
+        for i, location_id in enumerate(location_ids)
+    ]
+    s3_client.put_object(
+        Bucket="test-bucket",
+        Key=f"sales_order/{key}",
+        Body=json.dumps({"sales_order": rows}),
+    )
+
+
+class TestDeliveryLocationState:
+    @pytest.mark.it("Testing there are no ids and no timestamp before the first run")
+    def test_no_state(self, s3_client):
+        location_ids, processed_until = read_delivery_locations(
+            "test-bucket", s3_client
+        )
+        assert location_ids.empty
+        assert processed_until is None
+
+    @pytest.mark.it("Testing the ids and timestamp are saved and read back")
+    def test_write_and_read(self, s3_client):
+        write_delivery_locations(
+            [1, 5], "2025-05-29T11:06:18.399084", "test-bucket", s3_client
+        )
+        location_ids, processed_until = read_delivery_locations(
+            "test-bucket", s3_client
+        )
+        assert list(location_ids) == [1, 5]
+        assert processed_until == "2025-05-29T11:06:18.399084"
+
+
+class TestUpdateDeliveryLocations:
+    @pytest.mark.it("Testing every file is read on the first run, then only new files")
+    def test_only_new_files_read(self, s3_client):
+        put_sales_orders(
+            s3_client, "sales_order-2025-05-28T10:00:00.000000.json", [3, 1]
+        )
+        put_sales_orders(
+            s3_client, "sales_order-2025-05-29T11:06:18.399084.json", [1, 2]
+        )
+        with patch(
+            "utils.raw_reader.json_to_pd_dataframe",
+            wraps=json_to_pd_dataframe,
+        ) as spy:
+            result = update_delivery_locations("test-bucket", s3_client)
+            assert list(result["agreed_delivery_location_id"]) == [1, 2, 3]
+            assert spy.call_count == 2
+
+            put_sales_orders(
+                s3_client, "sales_order-2025-05-30T09:00:00.000000.json", [2, 7]
+            )
+            result = update_delivery_locations("test-bucket", s3_client)
+            assert list(result["agreed_delivery_location_id"]) == [1, 2, 3, 7]
+            assert spy.call_count == 3
+            assert (
+                spy.call_args.args[0] == "sales_order-2025-05-30T09:00:00.000000.json"
+            )
+
+            result = update_delivery_locations("test-bucket", s3_client)
+            assert list(result["agreed_delivery_location_id"]) == [1, 2, 3, 7]
+            assert spy.call_count == 3
+        _, processed_until = read_delivery_locations("test-bucket", s3_client)
+        assert processed_until == "2025-05-30T09:00:00.000000"
+
+    @pytest.mark.it("Testing the chunks of a chunked extract are read once")
+    def test_chunks_read_once(self, s3_client):
+        for part, location_ids in [(1, [4]), (2, [5])]:
+            put_sales_orders(
+                s3_client,
+                f"sales_order-2025-05-29T11:06:18.399084-part-0000{part}.json",
+                location_ids,
+            )
+        with patch(
+            "utils.raw_reader.json_to_pd_dataframe",
+            wraps=json_to_pd_dataframe,
+        ) as spy:
+            result = update_delivery_locations("test-bucket", s3_client)
+        assert list(result["agreed_delivery_location_id"]) == [4, 5]
+        assert spy.call_count == 1
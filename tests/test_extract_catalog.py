@@ -0,0 +1,34 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+from src.python.utils.extract_catalog import (
+    EXTRACT_CATALOG,
+    catalog_entry,
+    select_list,
+)
+
+""" Tests for the extract catalog """
+
+
+class TestExtractCatalog:
+    @pytest.mark.it("Testing every table extracts its key and watermark columns")
+    def test_key_and_watermark_are_extracted(self):
+        for entry in EXTRACT_CATALOG.values():
+            assert entry["key"] in entry["columns"]
+            assert entry["watermark"] in entry["columns"]
+
+    @pytest.mark.it("Testing the select list casts each column to its catalog type")
+    def test_select_list(self):
+        assert select_list("currency") == (
+            "currency_id::int, currency_code::varchar, last_updated::timestamp"
+        )
+        assert "unit_price::numeric(10,2)" in select_list("sales_order")
+
+    @pytest.mark.it("Testing raises exception for a table not in the catalog")
+    def test_raises_for_unknown_table(self):
+        with pytest.raises(Exception, match="Invalid table name."):
+            catalog_entry("fail")
@@ -7,10 +7,19 @@ import datetime
 sys.path.insert(
     0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
 )
-from src.python.utils.extract_db import extract_db
+from src.python.utils.extract_db import (
+    extract_db,
+    extract_db_in_batches,
+    extract_db_chunk,
+)
 
 """Tests for the extract_db utility function"""
 
+STAFF_SELECT = (
+    "staff_id::int, first_name::varchar, last_name::varchar, department_id::int, "
+    "email_address::varchar, last_updated::timestamp"
+)
+
 
 class TestExtractDB:
     @pytest.mark.it("Testing returns dictionary with expected key and value as list")
@@ -19,8 +28,8 @@ class TestExtractDB:
         self, mock_connect_to_db
     ):
         mock_conn = Mock()
-        mock_conn.run.return_value = []
-        mock_conn.columns = []
+        mock_conn.prepare.return_value.run.return_value = []
+        mock_conn.prepare.return_value.columns = []
         mock_connect_to_db.return_value = mock_conn
         result = extract_db("staff")
         assert isinstance(result, dict)
@@ -33,8 +42,8 @@ class TestExtractDB:
     @patch("src.python.utils.extract_db.connect_to_db")
     def test_extract_db_returns_empty_list_inside_dictionary(self, mock_connect_to_db):
         mock_conn = Mock()
-        mock_conn.run.return_value = []
-        mock_conn.columns = []
+        mock_conn.prepare.return_value.run.return_value = []
+        mock_conn.prepare.return_value.columns = []
         mock_connect_to_db.return_value = mock_conn
         expected = {"staff": []}
         result = extract_db("staff")
@@ -44,7 +53,7 @@ class TestExtractDB:
     @patch("src.python.utils.extract_db.connect_to_db")
     def test_extract_db_returns_expected_values(self, mock_connect_to_db):
         mock_conn = Mock()
-        mock_conn.run.return_value = [
+        mock_conn.prepare.return_value.run.return_value = [
             [
                 1,
                 "person",
@@ -65,7 +74,7 @@ class TestExtractDB:
             ],
         ]
 
-        mock_conn.columns = [
+        mock_conn.prepare.return_value.columns = [
             {
                 "table_oid": 16466,
                 "column_attrnum": 1,
@@ -173,7 +182,7 @@ class TestExtractDB:
     @patch("src.python.utils.extract_db.connect_to_db")
     def test_extract_db_returns_only_new_values(self, mock_connect_to_db):
         mock_conn = Mock()
-        mock_conn.run.return_value = [
+        mock_conn.prepare.return_value.run.return_value = [
             [
                 1,
                 "person",
@@ -194,7 +203,7 @@ class TestExtractDB:
             ],
         ]
 
-        mock_conn.columns = [
+        mock_conn.prepare.return_value.columns = [
             {
                 "table_oid": 16466,
                 "column_attrnum": 1,
@@ -261,7 +270,144 @@ class TestExtractDB:
         ]
         mock_connect_to_db.return_value = mock_conn
         extract_db("staff", "2025-05-29 10:58:12.115290")
-        assert mock_conn.run.called  # Ensure .run() was called
-        mock_conn.run.assert_called_with(
-            "SELECT * FROM staff WHERE last_updated > '2025-05-29 10:58:12.115290';"
+        mock_conn.prepare.assert_called_once_with(
+            "SELECT staff_id::int, first_name::varchar, last_name::varchar, department_id::int, "
+            "email_address::varchar, last_updated::timestamp FROM staff "
+            "WHERE last_updated > :last_updated"
+        )
+        mock_conn.prepare.return_value.run.assert_called_with(
+            last_updated="2025-05-29 10:58:12.115290"
+        )
+
+    @pytest.mark.it("Testing extract db uses a given connection and leaves it open")
+    @patch("src.python.utils.extract_db.connect_to_db")
+    def test_extract_db_uses_given_connection(self, mock_connect_to_db):
+        mock_conn = Mock()
+        mock_conn.prepare.return_value.run.return_value = []
+        mock_conn.prepare.return_value.columns = []
+        assert extract_db("staff", conn=mock_conn) == {"staff": []}
+        mock_connect_to_db.assert_not_called()
+        mock_conn.close.assert_not_called()
+
+    @pytest.mark.it(
+        "Testing extract db prepares each statement once per connection and reuses it"
+    )
+    def test_extract_db_reuses_prepared_statements(self):
+        mock_conn = Mock()
+        mock_conn.prepare.return_value.run.return_value = []
+        mock_conn.prepare.return_value.columns = []
+        extract_db("currency", conn=mock_conn)
+        extract_db("currency", conn=mock_conn)
+        extract_db("currency", "2025-05-29 10:58:12.115290", conn=mock_conn)
+        extract_db("currency", "2025-05-30 10:58:12.115290", conn=mock_conn)
+        assert [call.args[0] for call in mock_conn.prepare.call_args_list] == [
+            "SELECT currency_id::int, currency_code::varchar, last_updated::timestamp FROM currency",
+            "SELECT currency_id::int, currency_code::varchar, last_updated::timestamp FROM currency "
+            "WHERE last_updated > :last_updated",
+        ]
+        assert mock_conn.prepare.return_value.run.call_count == 4
+
+
+class TestExtractDBInBatches:
+    @pytest.mark.it("Testing yields rows as dictionaries in batches from a cursor")
+    @patch("src.python.utils.extract_db.connect_to_db")
+    def test_yields_batches_of_dicts(self, mock_connect_to_db):
+        mock_conn = Mock()
+        mock_conn.columns = [{"name": "staff_id"}, {"name": "first_name"}]
+        fetches = iter([[[1, "person"], [2, "person"]], [[3, "person"]]])
+
+        def run(query):
+            return next(fetches) if query.startswith("FETCH") else []
+
+        mock_conn.run.side_effect = run
+        mock_connect_to_db.return_value = mock_conn
+        result = list(extract_db_in_batches("staff", batch_size=2))
+        assert result == [
+            [
+                {"staff_id": 1, "first_name": "person"},
+                {"staff_id": 2, "first_name": "person"},
+            ],
+            [{"staff_id": 3, "first_name": "person"}],
+        ]
+
+    @pytest.mark.it("Testing declares a cursor for the incremental query and commits")
+    @patch("src.python.utils.extract_db.connect_to_db")
+    def test_declares_cursor_and_commits(self, mock_connect_to_db):
+        mock_conn = Mock()
+        mock_conn.run.return_value = []
+        mock_conn.columns = []
+        mock_connect_to_db.return_value = mock_conn
+        assert list(extract_db_in_batches("staff", "2025-05-29 10:58:12")) == []
+        queries = [call.args[0] for call in mock_conn.run.call_args_list]
+        assert queries == [
+            "START TRANSACTION READ ONLY;",
+            "DECLARE extract_cursor NO SCROLL CURSOR FOR "
+            f"SELECT {STAFF_SELECT} FROM staff WHERE last_updated > '2025-05-29 10:58:12';",
+            "FETCH FORWARD 5000 FROM extract_cursor;",
+            "CLOSE extract_cursor;",
+            "COMMIT;",
+        ]
+        mock_conn.close.assert_called_once()
+
+    @pytest.mark.it("Testing raises exception for an invalid table name")
+    @patch("src.python.utils.extract_db.connect_to_db")
+    def test_raises_exception_for_invalid_table(self, mock_connect_to_db):
+        with pytest.raises(Exception, match="Invalid table name."):
+            list(extract_db_in_batches("fail"))
+        mock_connect_to_db.assert_not_called()
+
+    @pytest.mark.it("Testing a given connection is used and left open")
+    @patch("src.python.utils.extract_db.connect_to_db")
+    def test_uses_given_connection(self, mock_connect_to_db):
+        mock_conn = Mock()
+        mock_conn.run.return_value = []
+        mock_conn.columns = []
+        list(extract_db_in_batches("staff", conn=mock_conn))
+        mock_connect_to_db.assert_not_called()
+        mock_conn.close.assert_not_called()
+
+    @pytest.mark.it("Testing a given snapshot transaction is used instead of a new one")
+    def test_uses_given_snapshot(self):
+        mock_conn = Mock()
+        mock_conn.run.return_value = []
+        mock_conn.columns = []
+        list(extract_db_in_batches("staff", conn=mock_conn, in_snapshot=True))
+        queries = [call.args[0] for call in mock_conn.run.call_args_list]
+        assert queries == [
+            f"DECLARE extract_cursor NO SCROLL CURSOR FOR SELECT {STAFF_SELECT} FROM staff;",
+            "FETCH FORWARD 5000 FROM extract_cursor;",
+            "CLOSE extract_cursor;",
+        ]
+
+
+class TestExtractDBChunk:
+    @pytest.mark.it("Testing pages by primary key after the given id")
+    @patch("src.python.utils.extract_db.connect_to_db")
+    def test_pages_by_primary_key(self, mock_connect_to_db):
+        mock_conn = Mock()
+        mock_conn.run.return_value = [[6, "Alice"], [7, "Bob"]]
+        mock_conn.columns = [{"name": "staff_id"}, {"name": "first_name"}]
+        mock_connect_to_db.return_value = mock_conn
+        result = extract_db_chunk("staff", after_id=5, chunk_size=2)
+        assert result == [
+            {"staff_id": 6, "first_name": "Alice"},
+            {"staff_id": 7, "first_name": "Bob"},
+        ]
+        mock_conn.run.assert_called_once_with(
+            f"SELECT {STAFF_SELECT} FROM staff WHERE staff_id > :after_id ORDER BY staff_id LIMIT :chunk_size;",
+            after_id=5,
+            chunk_size=2,
+        )
+        mock_conn.close.assert_called_once()
+
+    @pytest.mark.it("Testing only new rows are paged through when given last_updated")
+    def test_pages_only_new_rows(self):
+        mock_conn = Mock()
+        mock_conn.run.return_value = []
+        mock_conn.columns = []
+        assert extract_db_chunk("staff", "2025-05-29 10:58:12", conn=mock_conn) == []
+        assert mock_conn.run.call_args.args[0] == (
+            f"SELECT {STAFF_SELECT} FROM staff WHERE last_updated > '2025-05-29 10:58:12' "
+            "AND staff_id > :after_id ORDER BY staff_id LIMIT :chunk_size;"
         )
+        mock_conn.close.assert_not_called()
@@ -4,11 +4,13 @@ import pytest
 from unittest.mock import Mock, patch
 from moto import mock_aws
 import boto3
+import json
+from datetime import datetime
 
 sys.path.insert(
     0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
 )
-from src.extract_lambda import lambda_handler
+from src.extract_lambda import lambda_handler, extract_tables_to_s3
 
 
 """ Tests for Extract_lambda funtion"""
@@ -23,15 +25,25 @@ def aws_creds():
     os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
 
 
+def table_result(rows):
+    """(columns, rows) as fetch_table returns them, for a list of row dicts"""
+    columns = [
+        {"name": name, "type_oid": 1114 if isinstance(value, datetime) else 23}
+        for name, value in (rows[0].items() if rows else [])
+    ]
+    return columns, [list(row.values()) for row in rows]
+
+
 class TestExtractLambda:
     @pytest.mark.it(
         "Testing that our lambda function successfully runs with all util functions integrated"
     )
     @mock_aws
-    @patch("src.extract_lambda.extract_db")
+    @patch("src.extract_lambda.db_connection")
+    @patch("src.extract_lambda.fetch_table", return_value=([], []))
     @patch("src.python.utils.extract_db.connect_to_db")
     def test_lambda_function_returns_success_when_invoked(
-        self, mock_connect_to_db, aws_creds
+        self, mock_connect_to_db, aws_creds, mock_db_connection
     ):
         mock_conn = Mock()
         mock_conn.run.return_value = []
@@ -43,7 +55,7 @@ class TestExtractLambda:
             CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
         )
         result = lambda_handler({}, {})
-        assert result == {"result": "success"}
+        assert result["result"] == "success"
 
     @pytest.mark.it(
         "Testing that our lambda function returns error if bucket doesn't exist"
@@ -52,3 +64,426 @@ class TestExtractLambda:
     def test_lambda_function_returns_error_when_expected(aws_creds):
         with pytest.raises(Exception):
             lambda_handler({}, {})
+
+
+class TestExtractLambdaWatermarks:
+    @pytest.mark.it(
+        "Testing that each table is queried from its own watermark and new watermarks are saved"
+    )
+    @mock_aws
+    @patch("src.extract_lambda.db_connection")
+    @patch("src.extract_lambda.fetch_table")
+    def test_watermarks_read_once_and_saved(
+        self, mock_fetch_table, mock_db_connection, aws_creds
+    ):
+        def extract(table, last_updated=None, conn=None):
+            if table == "staff":
+                return table_result(
+                    [
+                        {"staff_id": 1, "last_updated": datetime(2025, 6, 2, 9, 0)},
+                        {"staff_id": 2, "last_updated": datetime(2025, 6, 3, 9, 0)},
+                    ]
+                )
+            return table_result([])
+
+        mock_fetch_table.side_effect = extract
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(
+            Bucket="fscifa-raw-data",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        s3_client.put_object(
+            Bucket="fscifa-raw-data",
+            Key="watermarks.json",
+            Body=json.dumps({"staff": "2025-06-01 00:00:00.000000"}),
+        )
+        result = lambda_handler({}, {})
+        assert result["result"] == "success"
+        assert mock_fetch_table.call_args_list[-2].args[:2] == (
+            "staff",
+            "2025-06-01 00:00:00.000000",
+        )
+        assert mock_fetch_table.call_args_list[0].args[:2] == ("address", None)
+        body = s3_client.get_object(Bucket="fscifa-raw-data", Key="watermarks.json")
+        assert json.loads(body["Body"].read()) == {
+            "staff": "2025-06-03 09:00:00.000000"
+        }
+        manifest = json.loads(
+            s3_client.get_object(Bucket="fscifa-raw-data", Key=result["manifest_key"])[
+                "Body"
+            ].read()
+        )
+        assert list(manifest["tables"]) == ["staff"]
+        assert manifest["tables"]["staff"]["row_count"] == 2
+        [staff_file] = manifest["tables"]["staff"]["files"]
+        staff_object = s3_client.head_object(
+            Bucket="fscifa-raw-data", Key=staff_file["key"]
+        )
+        assert staff_file["bytes"] == staff_object["ContentLength"]
+
+    @pytest.mark.it(
+        "Testing that a table with the same payload as its last upload isn't uploaded again"
+    )
+    @mock_aws
+    @patch("src.extract_lambda.db_connection")
+    @patch("src.extract_lambda.fetch_table")
+    def test_unchanged_tables_not_uploaded_again(
+        self, mock_fetch_table, mock_db_connection, aws_creds
+    ):
+        mock_fetch_table.side_effect = lambda table, *args, **kwargs: table_result(
+            [{f"{table}_id": 1}] if table in ["currency", "staff"] else []
+        )
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(
+            Bucket="fscifa-raw-data",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        assert lambda_handler({"extract_preflight": "false"}, {})["result"] == "success"
+        mock_fetch_table.side_effect = lambda table, *args, **kwargs: table_result(
+            [{f"{table}_id": 1}] if table == "currency" else [{f"{table}_id": 2}]
+        )
+        assert lambda_handler({"extract_preflight": "false"}, {})["result"] == "success"
+        keys = [
+            obj["Key"]
+            for obj in s3_client.list_objects_v2(Bucket="fscifa-raw-data")["Contents"]
+        ]
+        assert len([key for key in keys if key.startswith("currency/")]) == 1
+        assert len([key for key in keys if key.startswith("staff/")]) == 2
+        body = s3_client.get_object(Bucket="fscifa-raw-data", Key="fingerprints.json")
+        assert set(json.loads(body["Body"].read())) == {
+            "address",
+            "counterparty",
+            "currency",
+            "department",
+            "design",
+            "payment",
+            "payment_type",
+            "purchase_order",
+            "sales_order",
+            "staff",
+            "transaction",
+        }
+
+
+class TestExtractLambdaChunked:
+    @pytest.mark.it(
+        "Testing that an unfinished chunked run is resumed with the same timestamp on the next invocation"
+    )
+    @mock_aws
+    @patch("src.extract_lambda.db_connection")
+    @patch("utils.chunked_extract.extract_db_chunk")
+    def test_chunked_run_resumes_from_checkpoints(
+        self, mock_extract_chunk, mock_db_connection, aws_creds
+    ):
+        connection_lost = [True]
+
+        def extract_chunk(table, last_updated, after_id, chunk_size, conn=None):
+            if table == "staff" and after_id == 0:
+                return [
+                    {"staff_id": i, "last_updated": datetime(2025, 6, 2, 9, 0)}
+                    for i in range(1, chunk_size + 1)
+                ]
+            if table == "staff" and connection_lost[0]:
+                raise Exception("connection lost")
+            return []
+
+        mock_extract_chunk.side_effect = extract_chunk
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(
+            Bucket="fscifa-raw-data",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        context = Mock()
+        context.get_remaining_time_in_millis.return_value = 60000
+        event = {"extract_mode": "chunked", "extract_batch_size": 2}
+        with pytest.raises(Exception):
+            lambda_handler(event, context)
+        timestamp = json.loads(
+            s3_client.get_object(
+                Bucket="fscifa-raw-data", Key="checkpoints/staff.json"
+            )["Body"].read()
+        )["timestamp"]
+
+        connection_lost[0] = False
+        result = lambda_handler(event, context)
+        assert result["result"] == "success"
+        staff_calls = [
+            call.args
+            for call in mock_extract_chunk.call_args_list
+            if call.args[0] == "staff"
+        ]
+        assert staff_calls[-1][2] == 2
+        keys = [
+            obj["Key"]
+            for obj in s3_client.list_objects_v2(Bucket="fscifa-raw-data")["Contents"]
+        ]
+        assert f"staff/staff-{timestamp}-part-00001.json" in keys
+        manifest = json.loads(
+            s3_client.get_object(Bucket="fscifa-raw-data", Key=result["manifest_key"])[
+                "Body"
+            ].read()
+        )
+        assert [file["key"] for file in manifest["tables"]["staff"]["files"]] == [
+            f"staff/staff-{timestamp}-part-00001.json"
+        ]
+        assert not [key for key in keys if key.startswith("checkpoints/")]
+        last_updated = s3_client.get_object(
+            Bucket="fscifa-raw-data", Key="last_updated.txt"
+        )["Body"].read()
+        assert last_updated.decode("utf-8") == timestamp
+
+
+class TestExtractLambdaCopy:
+    @pytest.mark.it(
+        "Testing that a binary copy extract is rejected before anything is extracted or saved"
+    )
+    @mock_aws
+    @patch("src.extract_lambda.db_connection")
+    def test_binary_copy_rejected(self, mock_db_connection, aws_creds):
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(
+            Bucket="fscifa-raw-data",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        with pytest.raises(Exception):
+            lambda_handler(
+                {"extract_mode": "copy", "extract_copy_format": "binary"}, {}
+            )
+        mock_db_connection.assert_not_called()
+        assert "Contents" not in s3_client.list_objects_v2(Bucket="fscifa-raw-data")
+
+
+class TestExtractLambdaCDC:
+    @pytest.mark.it(
+        "Testing that cdc mode extracts by query when the slot is new, then from the slot"
+    )
+    @mock_aws
+    @patch("src.extract_lambda.db_connection")
+    @patch("src.extract_lambda.fetch_table")
+    def test_cdc_mode(self, mock_fetch_table, mock_db_connection, aws_creds):
+        mock_fetch_table.side_effect = lambda table, *args, **kwargs: table_result([])
+        mock_conn = Mock()
+        mock_db_connection.return_value.__enter__.return_value = mock_conn
+        slot = []
+
+        def run(query, **params):
+            if "FROM pg_replication_slots" in query:
+                return slot
+            if "pg_create_logical_replication_slot" in query:
+                slot.append([1])
+            if "pg_logical_slot_peek_changes" in query:
+                return [
+                    [
+                        "0/16B3748",
+                        "529",
+                        "table public.staff: INSERT: staff_id[integer]:7 "
+                        "last_updated[timestamp without time zone]:'2025-06-02 09:00:00'",
+                    ]
+                ]
+            return []
+
+        mock_conn.run.side_effect = run
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(
+            Bucket="fscifa-raw-data",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        event = {"extract_mode": "cdc", "extract_preflight": "false"}
+        assert lambda_handler(event, {})["result"] == "success"
+        assert mock_fetch_table.call_count == 11
+        assert lambda_handler(event, {})["result"] == "success"
+        assert mock_fetch_table.call_count == 11
+        body = s3_client.get_object(Bucket="fscifa-raw-data", Key="watermarks.json")
+        assert json.loads(body["Body"].read()) == {
+            "staff": "2025-06-02 09:00:00.000000"
+        }
+        queries = [call.args[0] for call in mock_conn.run.call_args_list]
+        assert any("pg_replication_slot_advance" in query for query in queries)
+
+    @pytest.mark.it(
+        "Testing that cdc mode reads the same changes again when the run fails after their upload"
+    )
+    @mock_aws
+    @patch("src.extract_lambda.write_manifest")
+    @patch("src.extract_lambda.db_connection")
+    def test_cdc_changes_read_again_after_failure(
+        self, mock_db_connection, mock_write_manifest, aws_creds
+    ):
+        mock_conn = Mock()
+        mock_db_connection.return_value.__enter__.return_value = mock_conn
+        changes = [
+            [
+                "0/16B3748",
+                "529",
+                "table public.staff: INSERT: staff_id[integer]:7 "
+                "last_updated[timestamp without time zone]:'2025-06-02 09:00:00'",
+            ]
+        ]
+
+        def run(query, **params):
+            if "FROM pg_replication_slots" in query:
+                return [[1]]
+            if "pg_logical_slot_peek_changes" in query:
+                return list(changes)
+            if "pg_replication_slot_advance" in query:
+                changes[:] = [change for change in changes if change[0] > params["lsn"]]
+            return []
+
+        mock_conn.run.side_effect = run
+        mock_write_manifest.side_effect = [
+            Exception("manifest upload failed"),
+            "manifests/run.json",
+        ]
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(
+            Bucket="fscifa-raw-data",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        event = {"extract_mode": "cdc"}
+        with pytest.raises(Exception):
+            lambda_handler(event, {})
+        assert len(changes) == 1
+        assert lambda_handler(event, {})["result"] == "success"
+        assert changes == []
+        keys = [
+            obj["Key"]
+            for obj in s3_client.list_objects_v2(
+                Bucket="fscifa-raw-data", Prefix="staff/"
+            )["Contents"]
+        ]
+        assert len(keys) == 2
+        table_keys = mock_write_manifest.call_args.args[0]["tables"]
+        assert [file["key"] for file in table_keys["staff"]["files"]] == [keys[1]]
+
+
+class TestExtractTablesToS3:
+    @pytest.mark.it(
+        "Testing that preflight skips unchanged tables and shares one snapshot across workers"
+    )
+    @mock_aws
+    @patch("src.extract_lambda.db_connection")
+    @patch("src.extract_lambda.fetch_table")
+    def test_preflight_skips_unchanged_tables(
+        self, mock_fetch_table, mock_db_connection, aws_creds
+    ):
+        mock_fetch_table.side_effect = lambda table, *args, **kwargs: table_result(
+            [{f"{table}_id": 1, "last_updated": datetime(2025, 6, 2)}]
+        )
+        mock_conn = Mock()
+        mock_db_connection.return_value.__enter__.return_value = mock_conn
+
+        def run(query):
+            if query.startswith("SELECT 'address'"):
+                return [
+                    ["address", datetime(2025, 6, 1), 10],
+                    ["currency", datetime(2025, 6, 2), 3],
+                    ["staff", datetime(2025, 6, 2), 20],
+                ]
+            if query == "SELECT pg_export_snapshot();":
+                return [["00000003-0000001B-1"]]
+            return []
+
+        mock_conn.run.side_effect = run
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(
+            Bucket="fscifa-raw-data",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        watermarks = {
+            table: "2025-06-01 00:00:00.000000"
+            for table in ["address", "currency", "staff"]
+        }
+        result = extract_tables_to_s3(
+            ["address", "currency", "staff"],
+            "2025",
+            s3_client,
+            2,
+            watermarks=watermarks,
+            preflight=True,
+        )
+        assert result["address"] == {
+            "key": None,
+            "row_count": 0,
+            "watermark": "2025-06-01 00:00:00.000000",
+        }
+        assert result["staff"]["key"] == "staff/staff-2025.json"
+        assert sorted(call.args[0] for call in mock_fetch_table.call_args_list) == [
+            "currency",
+            "staff",
+        ]
+        queries = [call.args[0] for call in mock_conn.run.call_args_list]
+        assert queries.count("SET TRANSACTION SNAPSHOT '00000003-0000001B-1';") == 2
+
+    @pytest.mark.it(
+        "Testing that concurrent extraction uploads every table, each with its own connection"
+    )
+    @mock_aws
+    @patch("src.extract_lambda.db_connection")
+    @patch("src.extract_lambda.fetch_table")
+    def test_concurrent_extraction_uploads_every_table(
+        self, mock_fetch_table, mock_db_connection, aws_creds
+    ):
+        mock_fetch_table.side_effect = lambda table, *args, **kwargs: table_result(
+            [{f"{table}_id": 1}]
+        )
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(
+            Bucket="fscifa-raw-data",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        tables = ["address", "currency", "staff"]
+        result = extract_tables_to_s3(tables, "2025-06-01T00:00:00", s3_client, 3)
+        assert {table: result[table]["key"] for table in result} == {
+            table: f"{table}/{table}-2025-06-01T00:00:00.json" for table in tables
+        }
+        assert mock_db_connection.call_count == 3
+        keys = [
+            obj["Key"]
+            for obj in s3_client.list_objects_v2(Bucket="fscifa-raw-data")["Contents"]
+        ]
+        assert sorted(keys) == sorted(result[table]["key"] for table in tables)
+
+    @pytest.mark.it(
+        "Testing that a failing table is raised after the other tables are extracted"
+    )
+    @mock_aws
+    @patch("src.extract_lambda.db_connection")
+    @patch("src.extract_lambda.fetch_table")
+    def test_concurrent_extraction_raises_after_other_tables(
+        self, mock_fetch_table, mock_db_connection, aws_creds
+    ):
+        def extract(table, *args, **kwargs):
+            if table == "currency":
+                raise Exception("Failed to extract from DB")
+            return table_result([{f"{table}_id": 1}])
+
+        mock_fetch_table.side_effect = extract
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(
+            Bucket="fscifa-raw-data",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        with pytest.raises(Exception, match="Failed to extract from DB"):
+            extract_tables_to_s3(["address", "currency", "staff"], "2025", s3_client, 2)
+        contents = s3_client.list_objects_v2(Bucket="fscifa-raw-data")["Contents"]
+        assert len(contents) == 2
+
+    @pytest.mark.it("Testing that the hive key layout partitions keys by date and hour")
+    @mock_aws
+    @patch("src.extract_lambda.db_connection")
+    @patch("src.extract_lambda.fetch_table")
+    def test_hive_key_layout(self, mock_fetch_table, mock_db_connection, aws_creds):
+        mock_fetch_table.return_value = table_result([{"staff_id": 1}])
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(
+            Bucket="fscifa-raw-data",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        result = extract_tables_to_s3(
+            ["staff"], "2025-06-01T09:30:00.000001", s3_client, key_layout="hive"
+        )
+        assert (
+            result["staff"]["key"]
+            == "staff/dt=2025-06-01/hour=09/part-2025-06-01T09:30:00.000001.json"
+        )
+        s3_client.head_object(Bucket="fscifa-raw-data", Key=result["staff"]["key"])
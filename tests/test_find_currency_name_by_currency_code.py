@@ -1,6 +1,8 @@
 import pytest
+import pandas as pd
 from src.python.utils.find_currency_name_by_currency_code import (
     find_currency_name_by_currency_code,
+    currency_names,
 )
 
 
@@ -18,3 +20,21 @@ class TestFindCurrencyNameByCurrencyCode:
     def test_raises_key_error(self):
         with pytest.raises(KeyError, match="Currency code not found"):
             find_currency_name_by_currency_code("ABC")
+
+
+class TestCurrencyNames:
+    @pytest.mark.it("when passed a column of currency codes, returns their names")
+    def test_returns_currency_names(self):
+        codes = pd.Series(["GBP", "USD", "GBP"], index=[3, 1, 2])
+        names = currency_names(codes)
+        assert list(names) == ["British pound", "United States dollar", "British pound"]
+        assert list(names.index) == [3, 1, 2]
+        categories = currency_names(codes.astype("category"))
+        assert list(categories) == list(names)
+
+    @pytest.mark.it(
+        "when passed an unknown currency code, raises KeyError with appropriate message"
+    )
+    def test_raises_key_error(self):
+        with pytest.raises(KeyError, match="Currency code not found"):
+            currency_names(pd.Series(["GBP", "ABC"]))
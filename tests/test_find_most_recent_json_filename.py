@@ -2,11 +2,17 @@ import os
 import pytest
 from moto import mock_aws
 import boto3
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
 from src.python.utils.find_most_recent_filename import (
     find_files_with_specified_table_name,
     find_most_recent_file,
     find_most_recent_filename,
 )
+from src.python.utils.json_to_pd_dataframe import json_to_pd_dataframe
 
 """
 Tests for find_most_recent_filename util function.
@@ -131,6 +137,37 @@ class TestFindFilesWithSpecifiedTableName:
         result = find_files_with_specified_table_name("payments", "test_ingest_bucket")
         assert result == []
 
+    @pytest.mark.it(
+        "when another table's name starts with the specified table name, its files are not returned"
+    )
+    def test_does_not_return_files_of_tables_with_longer_names(self, bucket):
+        bucket.put_object(Key="payment/payment-2025-05-29T11:06:18.399084.json")
+        bucket.put_object(
+            Key="payment_type/payment_type-2025-05-29T11:06:18.399084.json"
+        )
+        result = find_files_with_specified_table_name("payment", "test_ingest_bucket")
+        assert result == ["payment-2025-05-29T11:06:18.399084.json"]
+
+    @pytest.mark.it(
+        "when passed since, returns only the files made at or after that date/time, in either key layout"
+    )
+    def test_returns_files_since(self, bucket):
+        bucket.put_object(Key="address/address-2025-05-28T11:06:18.399084.json")
+        bucket.put_object(Key="address/address-2025-05-29T11:06:18.399084.json")
+        bucket.put_object(
+            Key="address/dt=2025-05-28/hour=11/part-2025-05-28T11:07:00.000000.json"
+        )
+        bucket.put_object(
+            Key="address/dt=2025-05-29/hour=11/part-2025-05-29T11:07:00.000000.json"
+        )
+        result = find_files_with_specified_table_name(
+            "address", "test_ingest_bucket", since="2025-05-29T11:06:18.399084"
+        )
+        assert result == [
+            "address-2025-05-29T11:06:18.399084.json",
+            "dt=2025-05-29/hour=11/part-2025-05-29T11:07:00.000000.json",
+        ]
+
 
 class TestFindMostRecentFile:
 
@@ -238,6 +275,29 @@ class TestFindMostRecentFile:
             == "address-2025-05-29T11:06:18.399084.json"
         )
 
+    @pytest.mark.it(
+        """when the most recent file is a csv extract with the same date/time as last_updated.txt, returns it"""
+    )
+    def test_returns_most_recent_csv_file(self, bucket):
+        test_files = [
+            "address-2025-05-29T11:06:18.399084.csv",
+            "address-2025-05-28T11:06:18.399084.json",
+        ]
+        result = find_most_recent_file(test_files, "address", "test_ingest_bucket")
+        assert result == "address-2025-05-29T11:06:18.399084.csv"
+
+    @pytest.mark.it(
+        """when the most recent file is a chunk of a chunked extract made at the date/time in last_updated.txt, returns it"""
+    )
+    def test_returns_most_recent_chunk_file(self, bucket):
+        test_files = [
+            "address-2025-05-29T11:06:18.399084-part-00001.json",
+            "address-2025-05-29T11:06:18.399084-part-00002.json",
+            "address-2025-05-28T11:06:18.399084.json",
+        ]
+        result = find_most_recent_file(test_files, "address", "test_ingest_bucket")
+        assert result == "address-2025-05-29T11:06:18.399084-part-00002.json"
+
     @pytest.mark.parametrize("bucket", ["parquet"], indirect=True)
     @pytest.mark.it(""""when given a parquet file type, returns parquet file""")
     def test_returns_most_recent_parquet_if_parquet_filetype_specified(self, bucket):
@@ -285,3 +345,56 @@ class TestLoadMostRecentDataFromJson:
             find_most_recent_filename("address", "test_ingest_bucket")
             == "address-2025-05-29T11:06:18.399084.json"
         )
+
+    @pytest.mark.it(
+        """test that the most recent hive-partitioned file is found and loaded"""
+    )
+    def test_load_data_from_most_recent_partitioned_json(self, bucket):
+        bucket.put_object(
+            Key="address/dt=2025-05-29/hour=11/part-2025-05-29T11:06:18.399084.json",
+            Body=b'{"address": [{"address_id": 1, "address_line_1": "6826 Herzog Via"}]}',
+        )
+        bucket.put_object(
+            Key="address/dt=2025-05-28/hour=11/part-2025-05-28T11:06:18.399084.json",
+            Body=b'{"address": [{"address_id": 2, "address_line_1": "93 High Street"}]}',
+        )
+        most_recent_file = find_most_recent_filename("address", "test_ingest_bucket")
+        assert (
+            most_recent_file
+            == "dt=2025-05-29/hour=11/part-2025-05-29T11:06:18.399084.json"
+        )
+        df = json_to_pd_dataframe(most_recent_file, "address", "test_ingest_bucket")
+        assert list(df["address_id"]) == [1]
+
+    @pytest.mark.it(
+        """test that the file is taken from the run manifest, without listing the bucket or reading last_updated.txt"""
+    )
+    def test_file_taken_from_manifest(self, bucket):
+        manifest = {
+            "timestamp": "2025-05-29T11:06:18.399084",
+            "bucket": "test_ingest_bucket",
+            "tables": {
+                "address": {
+                    "row_count": 1,
+                    "files": [
+                        {
+                            "key": "address/address-2025-05-29T11:06:18.399084.json",
+                            "bytes": 70,
+                        }
+                    ],
+                }
+            },
+        }
+        bucket.Object("last_updated.txt").delete()
+        assert (
+            find_most_recent_filename(
+                "address", "test_ingest_bucket", manifest=manifest
+            )
+            == "address-2025-05-29T11:06:18.399084.json"
+        )
+        assert (
+            find_most_recent_filename(
+                "payments", "test_ingest_bucket", manifest=manifest
+            )
+            is None
+        )
@@ -0,0 +1,58 @@
+import os
+import sys
+import pytest
+from moto import mock_aws
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+from src.python.utils.fingerprints import (
+    fingerprint,
+    read_fingerprints,
+    write_fingerprints,
+)
+
+""" Tests for the per-table payload fingerprints """
+
+
+@pytest.fixture
+def aws_creds():
+    os.environ["AWS_ACCESS_KEY_ID"] = "Test"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "Test"
+    os.environ["AWS_SECURITY_TOKEN"] = "Test"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture()
+def s3_client(aws_creds):
+    with mock_aws():
+        s3_client = boto3.client("s3", region_name="eu-west-2")
+        s3_client.create_bucket(
+            Bucket="test-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        yield s3_client
+
+
+class TestFingerprint:
+    @pytest.mark.it("Testing the same payload always has the same fingerprint")
+    def test_same_payload(self):
+        payload = '{"currency": [{"currency_id": 1, "currency_code": "GBP"}]}'
+        assert fingerprint(payload) == fingerprint(payload.encode("utf-8"))
+        assert len(fingerprint(payload)) == 64
+
+    @pytest.mark.it("Testing a changed payload has a different fingerprint")
+    def test_changed_payload(self):
+        assert fingerprint('{"currency": [1]}') != fingerprint('{"currency": [2]}')
+
+
+class TestReadFingerprints:
+    @pytest.mark.it("Testing returns no fingerprints when nothing has been uploaded")
+    def test_empty_bucket(self, s3_client):
+        assert read_fingerprints("test-bucket", s3_client) == {}
+
+    @pytest.mark.it("Testing returns the fingerprints previously written")
+    def test_round_trip(self, s3_client):
+        write_fingerprints({"currency": "abc"}, "test-bucket", s3_client)
+        assert read_fingerprints("test-bucket", s3_client) == {"currency": "abc"}
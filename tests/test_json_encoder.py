@@ -0,0 +1,90 @@
+import os
+import sys
+import json
+import pytest
+from datetime import datetime, date
+from decimal import Decimal
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+import src.python.utils.json_encoder as json_encoder
+from src.python.utils.json_encoder import make_row_encoder, dump_rows_to_json
+from src.python.utils.fingerprints import fingerprint
+from src.python.utils.json_dumps import dump_to_json
+
+""" Tests for the typed json encoder """
+
+
+COLUMNS = [
+    {"name": "sales_order_id", "type_oid": 23},
+    {"name": "last_updated", "type_oid": 1114},
+    {"name": "unit_price", "type_oid": 1700},
+    {"name": "agreed_delivery_date", "type_oid": 1082},
+    {"name": "design_name", "type_oid": 1043},
+]
+
+ROWS = [
+    [
+        1,
+        datetime(2022, 11, 3, 14, 20, 51, 563000),
+        Decimal("3.94"),
+        date(2022, 11, 7),
+        "Wooden",
+    ],
+    [2, datetime(2022, 11, 3, 14, 20), None, None, None],
+]
+
+
+class TestMakeRowEncoder:
+    @pytest.mark.it("Testing values are formatted from the column type oids")
+    def test_formats_values_by_column_type(self):
+        encode_row = make_row_encoder(COLUMNS)
+        assert encode_row(ROWS[0]) == {
+            "sales_order_id": 1,
+            "last_updated": "2022-11-03 14:20:51.563000",
+            "unit_price": "3.94",
+            "agreed_delivery_date": "2022-11-07",
+            "design_name": "Wooden",
+        }
+
+    @pytest.mark.it("Testing decimals are written in fixed-point notation")
+    def test_decimals_fixed_point(self):
+        encode_row = make_row_encoder([{"name": "amount", "type_oid": 1700}])
+        assert encode_row([Decimal("1E+2")]) == {"amount": "100"}
+
+
+class TestDumpRowsToJson:
+    @pytest.mark.it("Testing the document reads the same as dump_to_json's")
+    def test_same_document_as_dump_to_json(self):
+        names = [column["name"] for column in COLUMNS]
+        expected = dump_to_json(
+            {"sales_order": [dict(zip(names, row)) for row in ROWS]}
+        )
+        result = dump_rows_to_json("sales_order", COLUMNS, ROWS)
+        assert json.loads(result) == json.loads(expected)
+
+    @pytest.mark.it(
+        "Testing the standard json module is used when orjson isn't installed"
+    )
+    def test_standard_json_backend(self, monkeypatch):
+        monkeypatch.setattr(json_encoder, "orjson", None)
+        result = dump_rows_to_json("sales_order", COLUMNS, ROWS[1:])
+        assert result == (
+            '{"sales_order":[{"sales_order_id":2,"last_updated":"2022-11-03 14:20:00",'
+            '"unit_price":null,"agreed_delivery_date":null,"design_name":null}]}'
+        )
+
+    @pytest.mark.it(
+        "Testing both backends write the same bytes, so the payload has the same fingerprint"
+    )
+    def test_same_bytes_with_either_backend(self, monkeypatch):
+        pytest.importorskip("orjson")
+        rows = ROWS + [
+            [3, datetime(2022, 11, 4), Decimal("0.10"), None, 'Café "Ünïcode" 😀\n\x01']
+        ]
+        with_orjson = dump_rows_to_json("sales_order", COLUMNS, rows)
+        monkeypatch.setattr(json_encoder, "orjson", None)
+        with_json = dump_rows_to_json("sales_order", COLUMNS, rows)
+        assert with_orjson == with_json
+        assert fingerprint(with_orjson) == fingerprint(with_json)
@@ -1,9 +1,22 @@
 import pytest
 import pandas as pd
-from src.python.utils.json_to_pd_dataframe import json_to_pd_dataframe
+import gzip
+import json
+import zstandard
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+from src.python.utils.json_to_pd_dataframe import (
+    json_to_pd_dataframe,
+    iter_raw_batches,
+)
+from utils.aws_clients import get_client
 from moto import mock_aws
 import boto3
-import os
+from unittest.mock import patch
 
 """
 Tests for json_to_pd_dataframe util function.
@@ -111,3 +124,388 @@ class TestJsonToPDdataframe:
         assert result["address_line_1"][0] == "6826 Herzog Via"
         assert result["address_id"][1] == 2
         assert result["address_line_1"][1] == "93 High Street"
+
+    @pytest.mark.it("when passed a csv file, returns dataframe read from the csv")
+    def test_returns_dataframe_from_csv(self, bucket):
+        bucket.put_object(
+            Key="address/address-2025-06-29T11:06:18.399084.csv",
+            Body=b"address_id,address_line_1\n1,6826 Herzog Via\n2,93 High Street\n",
+        )
+        result = json_to_pd_dataframe(
+            "address-2025-06-29T11:06:18.399084.csv", "address", "test_ingest_bucket"
+        )
+        assert len(result) == 2
+        assert result["address_id"][1] == 2
+        assert result["address_line_1"][1] == "93 High Street"
+
+    @pytest.mark.it(
+        "when passed a COPY csv file, reads postgres booleans (t/f) as booleans"
+    )
+    def test_reads_copy_csv_booleans(self, bucket):
+        bucket.put_object(
+            Key="payment/payment-2025-06-29T11:06:18.399084.csv",
+            Body=(
+                b"payment_id,created_at,last_updated,transaction_id,counterparty_id,payment_amount,"
+                b"currency_id,payment_type_id,paid,payment_date,company_ac_number,counterparty_ac_number\n"
+                b"1,2022-11-03 14:20:52.187,2022-11-03 14:20:52.187,1,15,552548.62,2,3,f,2022-11-04,67305075,31622269\n"
+                b"2,2022-11-03 14:20:52.186,2022-11-03 14:20:52.186,2,18,205952.22,3,1,t,2022-11-03,81718079,47839086\n"
+            ),
+        )
+        result = json_to_pd_dataframe(
+            "payment-2025-06-29T11:06:18.399084.csv", "payment", "test_ingest_bucket"
+        )
+        assert str(result["paid"].dtype) == "boolean"
+        assert list(result["paid"]) == [False, True]
+        batches = list(
+            iter_raw_batches(
+                "payment-2025-06-29T11:06:18.399084.csv",
+                "payment",
+                "test_ingest_bucket",
+                1,
+                columns=["payment_id", "paid"],
+            )
+        )
+        assert [list(batch["paid"]) for batch in batches] == [[False], [True]]
+
+    @pytest.mark.it(
+        "when passed a parquet file, returns dataframe read from the parquet"
+    )
+    def test_returns_dataframe_from_parquet(self, bucket):
+        bucket.put_object(
+            Key="address/address-2025-06-29T11:06:18.399084.parquet",
+            Body=pd.DataFrame(
+                {
+                    "address_id": [1, 2],
+                    "address_line_1": ["6826 Herzog Via", "93 High Street"],
+                }
+            ).to_parquet(),
+        )
+        result = json_to_pd_dataframe(
+            "address-2025-06-29T11:06:18.399084.parquet",
+            "address",
+            "test_ingest_bucket",
+        )
+        assert len(result) == 2
+        assert result["address_id"][1] == 2
+
+    @pytest.mark.it(
+        "when passed an ndjson file, returns dataframe with one row per line"
+    )
+    def test_returns_dataframe_from_ndjson(self, bucket):
+        bucket.put_object(
+            Key="address/address-2025-06-29T11:06:18.399084.ndjson",
+            Body=b'{"address_id": 1, "address_line_1": "6826 Herzog Via"}\n'
+            b'{"address_id": 2, "address_line_1": "93 High Street"}\n',
+        )
+        result = json_to_pd_dataframe(
+            "address-2025-06-29T11:06:18.399084.ndjson", "address", "test_ingest_bucket"
+        )
+        assert len(result) == 2
+        assert result["address_id"][1] == 2
+        assert result["address_line_1"][1] == "93 High Street"
+
+    @pytest.mark.it(
+        "when passed a gzipped ndjson file, decompresses it and returns dataframe"
+    )
+    def test_returns_dataframe_from_gzipped_ndjson(self, bucket):
+        bucket.put_object(
+            Key="address/address-2025-06-29T11:06:18.399084.ndjson.gz",
+            Body=gzip.compress(
+                b'{"address_id": 1, "address_line_1": "6826 Herzog Via"}\n'
+                b'{"address_id": 2, "address_line_1": "93 High Street"}\n'
+            ),
+        )
+        result = json_to_pd_dataframe(
+            "address-2025-06-29T11:06:18.399084.ndjson.gz",
+            "address",
+            "test_ingest_bucket",
+        )
+        assert len(result) == 2
+        assert result["address_line_1"][0] == "6826 Herzog Via"
+
+    @pytest.mark.it(
+        "when passed one chunk of a chunked extract, returns dataframe of every chunk"
+    )
+    def test_returns_dataframe_from_all_chunks(self, bucket):
+        for part, address_id in [(1, 1), (2, 2)]:
+            bucket.put_object(
+                Key=f"address/address-2025-06-29T11:06:18.399084-part-0000{part}.json",
+                Body=json.dumps({"address": [{"address_id": address_id}]}),
+            )
+        bucket.put_object(
+            Key="address/address-2025-06-28T11:06:18.399084.json",
+            Body=json.dumps({"address": [{"address_id": 99}]}),
+        )
+        result = json_to_pd_dataframe(
+            "address-2025-06-29T11:06:18.399084-part-00002.json",
+            "address",
+            "test_ingest_bucket",
+        )
+        assert list(result["address_id"]) == [1, 2]
+
+    @pytest.mark.it(
+        "when passed a compressed json or csv file, decompresses it and returns dataframe"
+    )
+    def test_returns_dataframe_from_compressed_files(self, bucket):
+        bucket.put_object(
+            Key="address/address-2025-06-29T11:06:18.399084.json.zst",
+            Body=zstandard.ZstdCompressor().compress(
+                b'{"address": [{"address_id": 1, "address_line_1": "6826 Herzog Via"}]}'
+            ),
+        )
+        bucket.put_object(
+            Key="address/address-2025-06-29T11:06:18.399084.csv.gz",
+            Body=gzip.compress(b"address_id,address_line_1\n2,93 High Street\n"),
+        )
+        json_result = json_to_pd_dataframe(
+            "address-2025-06-29T11:06:18.399084.json.zst",
+            "address",
+            "test_ingest_bucket",
+        )
+        csv_result = json_to_pd_dataframe(
+            "address-2025-06-29T11:06:18.399084.csv.gz",
+            "address",
+            "test_ingest_bucket",
+        )
+        assert json_result["address_line_1"][0] == "6826 Herzog Via"
+        assert csv_result["address_line_1"][0] == "93 High Street"
+
+    @pytest.mark.it(
+        "when passed one gzipped chunk of a chunked extract, returns dataframe of every chunk"
+    )
+    def test_returns_dataframe_from_all_gzipped_chunks(self, bucket):
+        for part, address_id in [(1, 1), (2, 2)]:
+            bucket.put_object(
+                Key=f"address/address-2025-06-29T11:06:18.399084-part-0000{part}.json.gz",
+                Body=gzip.compress(
+                    json.dumps({"address": [{"address_id": address_id}]}).encode()
+                ),
+            )
+        result = json_to_pd_dataframe(
+            "address-2025-06-29T11:06:18.399084-part-00002.json.gz",
+            "address",
+            "test_ingest_bucket",
+        )
+        assert list(result["address_id"]) == [1, 2]
+
+
+ADDRESS_ROWS = [
+    {"address_id": 1, "address_line_1": "6826 Herzog Via", "city": "New Patienceburgh"},
+    {"address_id": 2, "address_line_1": "93 High Street", "city": "Leeds"},
+    {"address_id": 3, "address_line_1": "179 Alexie Cliffs", "city": None},
+]
+
+
+class TestJsonToPDdataframeProjection:
+    @pytest.mark.it("when passed columns, returns only those columns, in their order")
+    def test_returns_only_columns(self, bucket):
+        bucket.put_object(
+            Key="address/address-2025-06-29T11:06:18.399084.json",
+            Body=json.dumps({"address": ADDRESS_ROWS}),
+        )
+        result = json_to_pd_dataframe(
+            "address-2025-06-29T11:06:18.399084.json",
+            "address",
+            "test_ingest_bucket",
+            columns=["city", "address_id", "postal_code"],
+        )
+        assert list(result.columns) == ["city", "address_id"]
+        assert list(result["address_id"]) == [1, 2, 3]
+
+    @pytest.mark.it("when passed filters, returns only the rows matching all of them")
+    def test_returns_only_matching_rows(self, bucket):
+        bucket.put_object(
+            Key="address/address-2025-06-29T11:06:18.399084.json",
+            Body=json.dumps({"address": ADDRESS_ROWS}),
+        )
+        result = json_to_pd_dataframe(
+            "address-2025-06-29T11:06:18.399084.json",
+            "address",
+            "test_ingest_bucket",
+            columns=["address_id"],
+            filters=[("address_id", ">", 1), ("city", "!=", "Leeds")],
+        )
+        assert list(result.columns) == ["address_id"]
+        assert list(result["address_id"]) == []
+        result = json_to_pd_dataframe(
+            "address-2025-06-29T11:06:18.399084.json",
+            "address",
+            "test_ingest_bucket",
+            filters=[("address_id", "in", [1, 3])],
+        )
+        assert list(result["address_id"]) == [1, 3]
+
+    @pytest.mark.it("when passed columns and filters, applies them to every chunk")
+    def test_projects_chunks(self, bucket):
+        for part in [1, 2]:
+            bucket.put_object(
+                Key=f"address/address-2025-06-29T11:06:18.399084-part-0000{part}.json",
+                Body=json.dumps({"address": ADDRESS_ROWS[part - 1 : part + 1]}),
+            )
+        result = json_to_pd_dataframe(
+            "address-2025-06-29T11:06:18.399084-part-00001.json",
+            "address",
+            "test_ingest_bucket",
+            columns=["address_id"],
+            filters=[("city", "==", "Leeds")],
+        )
+        assert list(result.columns) == ["address_id"]
+        assert list(result["address_id"]) == [2, 2]
+
+    @pytest.mark.it("when passed columns and filters, applies them to ndjson files")
+    def test_projects_ndjson(self, bucket):
+        bucket.put_object(
+            Key="address/address-2025-06-29T11:06:18.399084.ndjson",
+            Body="\n".join(json.dumps(row) for row in ADDRESS_ROWS).encode(),
+        )
+        result = json_to_pd_dataframe(
+            "address-2025-06-29T11:06:18.399084.ndjson",
+            "address",
+            "test_ingest_bucket",
+            columns=["address_id"],
+            filters=[("address_id", "not in", [2])],
+        )
+        assert list(result.columns) == ["address_id"]
+        assert list(result["address_id"]) == [1, 3]
+
+    @pytest.mark.it("when passed columns and filters, applies them to csv files")
+    def test_projects_csv(self, bucket):
+        bucket.put_object(
+            Key="address/address-2025-06-29T11:06:18.399084.csv",
+            Body=pd.DataFrame(ADDRESS_ROWS).to_csv(index=False).encode(),
+        )
+        result = json_to_pd_dataframe(
+            "address-2025-06-29T11:06:18.399084.csv",
+            "address",
+            "test_ingest_bucket",
+            columns=["address_line_1"],
+            filters=[("address_id", "<=", 2)],
+        )
+        assert list(result.columns) == ["address_line_1"]
+        assert list(result["address_line_1"]) == ["6826 Herzog Via", "93 High Street"]
+
+    @pytest.mark.it("when passed columns and filters, applies them to parquet files")
+    def test_projects_parquet(self, bucket):
+        bucket.put_object(
+            Key="address/address-2025-06-29T11:06:18.399084.parquet",
+            Body=pd.DataFrame(ADDRESS_ROWS).to_parquet(),
+        )
+        result = json_to_pd_dataframe(
+            "address-2025-06-29T11:06:18.399084.parquet",
+            "address",
+            "test_ingest_bucket",
+            columns=["address_id", "postal_code"],
+            filters=[("city", "==", "Leeds")],
+        )
+        assert list(result.columns) == ["address_id"]
+        assert list(result["address_id"]) == [2]
+
+    @pytest.mark.it("when passed an unknown filter operator, raises an exception")
+    def test_invalid_filter_operator(self, bucket):
+        with pytest.raises(Exception, match="Invalid filter operator: like"):
+            json_to_pd_dataframe(
+                "address-2025-06-29T11:06:18.399084.json",
+                "address",
+                "test_ingest_bucket",
+                filters=[("city", "like", "Lee%")],
+            )
+
+
+class TestIterRawBatches:
+    @pytest.mark.it("reads an ndjson file in dataframes of at most batch_size rows")
+    def test_ndjson_batches(self, bucket):
+        bucket.put_object(
+            Key="address/address-2025-06-29T11:06:18.399084.ndjson.gz",
+            Body=gzip.compress(
+                "\n".join(json.dumps(row) for row in ADDRESS_ROWS).encode()
+            ),
+        )
+        batches = list(
+            iter_raw_batches(
+                "address-2025-06-29T11:06:18.399084.ndjson.gz",
+                "address",
+                "test_ingest_bucket",
+                2,
+                columns=["address_id"],
+            )
+        )
+        assert [list(batch["address_id"]) for batch in batches] == [[1, 2], [3]]
+        assert list(batches[0].columns) == ["address_id"]
+        assert batches[0]["address_id"].dtype == "int32"
+
+    @pytest.mark.it("reads a chunked extract one chunk at a time")
+    def test_chunk_batches(self, bucket):
+        for part in [1, 2]:
+            bucket.put_object(
+                Key=f"address/address-2025-06-29T11:06:18.399084-part-0000{part}.json",
+                Body=json.dumps({"address": ADDRESS_ROWS[part - 1 : part + 1]}),
+            )
+        batches = iter_raw_batches(
+            "address-2025-06-29T11:06:18.399084-part-00002.json",
+            "address",
+            "test_ingest_bucket",
+            10,
+        )
+        assert [list(batch["address_id"]) for batch in batches] == [[1, 2], [2, 3]]
+
+    @pytest.mark.it(
+        "reads exactly the chunk keys of a run manifest, without listing the bucket"
+    )
+    def test_manifest_chunk_keys_not_listed(self, bucket):
+        chunk_keys = [
+            f"address/address-2025-06-29T11:06:18.399084-part-0000{part}.json"
+            for part in [1, 2]
+        ]
+        for part, key in enumerate(chunk_keys, 1):
+            bucket.put_object(
+                Key=key,
+                Body=json.dumps({"address": ADDRESS_ROWS[part - 1 : part + 1]}),
+            )
+        shared_client = get_client("s3")
+        with patch.object(
+            shared_client, "get_paginator", wraps=shared_client.get_paginator
+        ) as get_paginator, patch.object(
+            shared_client, "list_objects_v2", wraps=shared_client.list_objects_v2
+        ) as list_objects_v2:
+            result = json_to_pd_dataframe(
+                "address-2025-06-29T11:06:18.399084-part-00002.json",
+                "address",
+                "test_ingest_bucket",
+                chunk_keys=chunk_keys,
+            )
+            batches = iter_raw_batches(
+                "address-2025-06-29T11:06:18.399084-part-00002.json",
+                "address",
+                "test_ingest_bucket",
+                10,
+                chunk_keys=chunk_keys,
+            )
+            batches = [list(batch["address_id"]) for batch in batches]
+        assert list(result["address_id"]) == [1, 2, 2, 3]
+        assert batches == [[1, 2], [2, 3]]
+        get_paginator.assert_not_called()
+        list_objects_v2.assert_not_called()
+
+    @pytest.mark.it(
+        "reads csv and parquet files in dataframes of at most batch_size rows"
+    )
+    def test_csv_and_parquet_batches(self, bucket):
+        bucket.put_object(
+            Key="address/address-2025-06-29T11:06:18.399084.csv",
+            Body=pd.DataFrame(ADDRESS_ROWS).to_csv(index=False).encode(),
+        )
+        bucket.put_object(
+            Key="address/address-2025-06-29T11:06:18.399084.parquet",
+            Body=pd.DataFrame(ADDRESS_ROWS).to_parquet(row_group_size=1),
+        )
+        for file in [
+            "address-2025-06-29T11:06:18.399084.csv",
+            "address-2025-06-29T11:06:18.399084.parquet",
+        ]:
+            batches = iter_raw_batches(
+                file, "address", "test_ingest_bucket", 2, columns=["city", "address_id"]
+            )
+            batches = list(batches)
+            assert [len(batch) for batch in batches] == [2, 1]
+            assert list(batches[0].columns) == ["city", "address_id"]
+            assert list(batches[1]["address_id"]) == [3]
@@ -5,6 +5,7 @@ from unittest.mock import Mock, patch
 from moto import mock_aws
 import boto3
 import pandas as pd
+import json
 
 # import sqlite3
 
@@ -31,7 +32,7 @@ class TestLoadLambda:
         "Testing that when there are no new files to load, an exception is raised"
     )
     @mock_aws
-    @patch("src.extract_lambda.extract_db")
+    @patch("src.extract_lambda.fetch_table")
     @patch("src.python.utils.extract_db.connect_to_db")
     def test_lambda_function_loads_nothing_when_there_are_no_new_files(
         self, mock_connect_to_db, aws_creds
@@ -52,13 +53,14 @@ class TestLoadLambda:
         "Testing that our transform lambda function successfully runs with all util functions integrated"
     )
     @mock_aws
+    @patch("src.load_lambda.db_connection")
     @patch("src.load_lambda.fetch_parquet")
     @patch("src.load_lambda.parquet_to_sql")
     def test_lambda_function_successfully_uploads_new_file(
-        self, mock_parquet_to_sql, mock_fetch_parquet, aws_creds
+        self, mock_parquet_to_sql, mock_fetch_parquet, mock_db_connection, aws_creds
     ):
         dummy_df = pd.DataFrame()
-        mock_fetch_parquet.return_value = dummy_df.to_parquet()
+        mock_fetch_parquet.return_value = dummy_df
         s3_client = boto3.client("s3")
         s3_client.create_bucket(
             Bucket="fscifa-processed-data",
@@ -66,3 +68,126 @@ class TestLoadLambda:
         )
         result = lambda_handler({}, {})
         assert result == {"result": "success"}
+
+    @pytest.mark.it(
+        "Testing that the files to load are taken from the transform run's manifest"
+    )
+    @mock_aws
+    @patch("src.load_lambda.db_connection")
+    @patch("src.load_lambda.parquet_to_sql")
+    @patch("src.python.utils.find_most_recent_filename.list_raw_files")
+    def test_files_taken_from_manifest(
+        self, mock_list_raw_files, mock_parquet_to_sql, mock_db_connection, aws_creds
+    ):
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(
+            Bucket="fscifa-processed-data",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        s3_client.put_object(
+            Bucket="fscifa-processed-data",
+            Key="dim_staff/dim_staff-2025-06-09T00:00.parquet",
+            Body=pd.DataFrame({"staff_id": [1]}).to_parquet(),
+        )
+        s3_client.put_object(
+            Bucket="fscifa-processed-data",
+            Key="manifests/run-2025-06-09T00:00.json",
+            Body=json.dumps(
+                {
+                    "timestamp": "2025-06-09T00:00",
+                    "bucket": "fscifa-processed-data",
+                    "tables": {
+                        "dim_staff": {
+                            "row_count": 1,
+                            "files": [
+                                {
+                                    "key": "dim_staff/dim_staff-2025-06-09T00:00.parquet",
+                                    "bytes": 1,
+                                }
+                            ],
+                        }
+                    },
+                }
+            ),
+        )
+        result = lambda_handler(
+            {"manifest_key": "manifests/run-2025-06-09T00:00.json"}, {}
+        )
+        assert result == {"result": "success"}
+        mock_list_raw_files.assert_not_called()
+        assert [call.args[0] for call in mock_parquet_to_sql.call_args_list] == [
+            "dim_staff"
+        ]
+
+    @pytest.mark.it(
+        "Testing that the dim_date range is saved once its rows are inserted, and the pending range removed"
+    )
+    @mock_aws
+    @patch("src.load_lambda.db_connection")
+    @patch("src.load_lambda.fetch_parquet")
+    @patch("src.load_lambda.parquet_to_sql")
+    def test_dim_date_range_saved_after_insert(
+        self, mock_parquet_to_sql, mock_fetch_parquet, mock_db_connection, aws_creds
+    ):
+        dim_date = pd.DataFrame(
+            {"date_id": pd.date_range("2022-11-03", "2022-11-06").date}
+        )
+        mock_fetch_parquet.side_effect = lambda table, *args, **kwargs: (
+            dim_date if table == "dim_date" else None
+        )
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(
+            Bucket="fscifa-processed-data",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        s3_client.put_object(
+            Bucket="fscifa-processed-data",
+            Key="state/dim_date_pending.json",
+            Body=json.dumps({"start": "2022-11-03", "end": "2022-11-06"}),
+        )
+        assert lambda_handler({}, {}) == {"result": "success"}
+        date_range = json.loads(
+            s3_client.get_object(
+                Bucket="fscifa-processed-data", Key="state/dim_date_range.json"
+            )["Body"].read()
+        )
+        assert date_range == {"start": "2022-11-03", "end": "2022-11-06"}
+        listing = s3_client.list_objects_v2(
+            Bucket="fscifa-processed-data", Prefix="state/"
+        )
+        assert [obj["Key"] for obj in listing["Contents"]] == [
+            "state/dim_date_range.json"
+        ]
+
+    @pytest.mark.it(
+        "Testing that the dim_date range is not saved when its rows fail to be inserted"
+    )
+    @mock_aws
+    @patch("src.load_lambda.db_connection")
+    @patch("src.load_lambda.fetch_parquet")
+    @patch("src.load_lambda.parquet_to_sql")
+    def test_dim_date_range_not_saved_when_insert_fails(
+        self, mock_parquet_to_sql, mock_fetch_parquet, mock_db_connection, aws_creds
+    ):
+        mock_fetch_parquet.side_effect = lambda table, *args, **kwargs: (
+            pd.DataFrame({"date_id": ["2022-11-03"]}) if table == "dim_date" else None
+        )
+        mock_parquet_to_sql.side_effect = Exception("insert failed")
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(
+            Bucket="fscifa-processed-data",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        s3_client.put_object(
+            Bucket="fscifa-processed-data",
+            Key="state/dim_date_pending.json",
+            Body=json.dumps({"start": "2022-11-03", "end": "2022-11-03"}),
+        )
+        with pytest.raises(Exception, match="insert failed"):
+            lambda_handler({}, {})
+        listing = s3_client.list_objects_v2(
+            Bucket="fscifa-processed-data", Prefix="state/"
+        )
+        assert [obj["Key"] for obj in listing["Contents"]] == [
+            "state/dim_date_pending.json"
+        ]
@@ -0,0 +1,90 @@
+import os
+import sys
+import pytest
+from datetime import datetime
+from unittest.mock import Mock
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+from src.python.utils.preflight import (
+    build_preflight_query,
+    preflight_tables,
+    read_only_snapshot,
+)
+
+""" Tests for the change-probe preflight and read-only snapshots """
+
+
+class TestBuildPreflightQuery:
+    @pytest.mark.it("Testing every table is probed in a single query")
+    def test_single_query_for_all_tables(self):
+        assert build_preflight_query(["staff", "currency"]) == (
+            "SELECT 'staff', max(last_updated), "
+            "(SELECT reltuples::bigint FROM pg_class WHERE oid = 'staff'::regclass) "
+            "FROM staff UNION ALL "
+            "SELECT 'currency', max(last_updated), "
+            "(SELECT reltuples::bigint FROM pg_class WHERE oid = 'currency'::regclass) "
+            "FROM currency;"
+        )
+
+    @pytest.mark.it("Testing raises exception for an invalid table name")
+    def test_raises_for_invalid_table(self):
+        with pytest.raises(Exception, match="Invalid table name."):
+            build_preflight_query(["staff", "fail"])
+
+
+class TestPreflightTables:
+    @pytest.mark.it("Testing only tables with rows newer than their watermark changed")
+    def test_changed_tables(self):
+        mock_conn = Mock()
+        mock_conn.run.return_value = [
+            ["staff", datetime(2025, 6, 2), 20],
+            ["currency", datetime(2025, 6, 1), 3],
+            ["design", None, 0],
+            ["address", datetime(2025, 6, 1), 30],
+        ]
+        watermarks = {
+            "staff": "2025-06-01 00:00:00.000000",
+            "currency": "2025-06-01 00:00:00.000000",
+        }
+        result = preflight_tables(
+            ["staff", "currency", "design", "address", "payment"],
+            watermarks,
+            mock_conn,
+        )
+        assert mock_conn.run.call_count == 1
+        assert result == {
+            "staff": {"changed": True, "row_estimate": 20},
+            "currency": {"changed": False, "row_estimate": 3},
+            "design": {"changed": False, "row_estimate": 0},
+            "address": {"changed": True, "row_estimate": 30},
+            "payment": {"changed": True, "row_estimate": None},
+        }
+
+
+class TestReadOnlySnapshot:
+    @pytest.mark.it("Testing the block runs in a read-only snapshot which is committed")
+    def test_commits_snapshot(self):
+        mock_conn = Mock()
+        with read_only_snapshot(mock_conn, "00000003-0000001B-1"):
+            mock_conn.run("SELECT 1;")
+        queries = [call.args[0] for call in mock_conn.run.call_args_list]
+        assert queries == [
+            "START TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY;",
+            "SET TRANSACTION SNAPSHOT '00000003-0000001B-1';",
+            "SELECT 1;",
+            "COMMIT;",
+        ]
+
+    @pytest.mark.it("Testing the snapshot is rolled back if the block raises")
+    def test_rolls_back_on_error(self):
+        mock_conn = Mock()
+        with pytest.raises(ValueError):
+            with read_only_snapshot(mock_conn):
+                raise ValueError("failed")
+        queries = [call.args[0] for call in mock_conn.run.call_args_list]
+        assert queries == [
+            "START TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY;",
+            "ROLLBACK;",
+        ]
@@ -0,0 +1,181 @@
+import os
+import sys
+import pytest
+from unittest.mock import patch, call
+from moto import mock_aws
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+from src.python.utils.raw_keys import (
+    raw_key,
+    raw_file_timestamp,
+    list_raw_files,
+    list_partitions,
+)
+
+""" Tests for the raw data key layouts and listing """
+
+
+@pytest.fixture
+def aws_creds():
+    os.environ["AWS_ACCESS_KEY_ID"] = "Test"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "Test"
+    os.environ["AWS_SECURITY_TOKEN"] = "Test"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture()
+def s3_client(aws_creds):
+    with mock_aws():
+        s3_client = boto3.client("s3", region_name="eu-west-2")
+        s3_client.create_bucket(
+            Bucket="test-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        yield s3_client
+
+
+def put_raw_files(s3_client, table_name, timestamps, key_layout):
+    for timestamp in timestamps:
+        s3_client.put_object(
+            Bucket="test-bucket",
+            Key=raw_key(table_name, timestamp, "json", key_layout),
+            Body=b"{}",
+        )
+
+
+class TestRawKey:
+    @pytest.mark.it("Testing the flat layout keys by table and timestamp")
+    def test_flat_key(self):
+        assert (
+            raw_key("address", "2025-05-29T11:06:18.399084", "json")
+            == "address/address-2025-05-29T11:06:18.399084.json"
+        )
+
+    @pytest.mark.it("Testing the hive layout partitions keys by date and hour")
+    def test_hive_key(self):
+        assert (
+            raw_key("address", "2025-05-29T11:06:18.399084", "ndjson.gz", "hive")
+            == "address/dt=2025-05-29/hour=11/part-2025-05-29T11:06:18.399084.ndjson.gz"
+        )
+
+    @pytest.mark.it("Testing raises ValueError for an unknown layout")
+    def test_unknown_layout(self):
+        with pytest.raises(ValueError, match="Invalid key layout"):
+            raw_key("address", "2025-05-29T11:06:18.399084", "json", "daily")
+
+    @pytest.mark.it("Testing the timestamp is read back from files in either layout")
+    def test_raw_file_timestamp(self):
+        for filename in [
+            "address-2025-05-29T11:06:18.399084.json",
+            "address-2025-05-29T11:06:18.399084-part-00002.json",
+            "dt=2025-05-29/hour=11/part-2025-05-29T11:06:18.399084.csv",
+            "dt=2025-05-29/hour=11/part-2025-05-29T11:06:18.399084-part-00002.json",
+        ]:
+            assert (
+                raw_file_timestamp(filename, "address") == "2025-05-29T11:06:18.399084"
+            )
+        assert raw_file_timestamp("address-notes.txt", "address") is None
+
+
+class TestListRawFiles:
+    @pytest.mark.it("Testing lists both layouts, relative to the table's folder")
+    def test_lists_both_layouts(self, s3_client):
+        put_raw_files(s3_client, "address", ["2025-05-29T11:06:18.399084"], "flat")
+        put_raw_files(s3_client, "address", ["2025-05-30T09:00:00.000001"], "hive")
+        assert list_raw_files("address", "test-bucket", s3_client) == [
+            "address-2025-05-29T11:06:18.399084.json",
+            "dt=2025-05-30/hour=09/part-2025-05-30T09:00:00.000001.json",
+        ]
+
+    @pytest.mark.it("Testing doesn't list tables whose names start with the table name")
+    def test_sibling_prefixes_not_listed(self, s3_client):
+        put_raw_files(s3_client, "payment", ["2025-05-29T11:06:18.399084"], "flat")
+        put_raw_files(s3_client, "payment_type", ["2025-05-29T11:06:18.399084"], "flat")
+        put_raw_files(s3_client, "payment_type", ["2025-05-29T11:06:18.399084"], "hive")
+        assert list_raw_files("payment", "test-bucket", s3_client) == [
+            "payment-2025-05-29T11:06:18.399084.json"
+        ]
+
+    @pytest.mark.it("Testing only the files in the time window are listed")
+    def test_time_window(self, s3_client):
+        timestamps = [
+            "2025-05-28T23:59:00.000000",
+            "2025-05-29T11:00:00.000000",
+            "2025-05-29T11:06:18.399084",
+            "2025-05-29T12:00:00.000000",
+        ]
+        for key_layout in ["flat", "hive"]:
+            put_raw_files(s3_client, "address", timestamps, key_layout)
+            files = list_raw_files(
+                "address",
+                "test-bucket",
+                s3_client,
+                since="2025-05-29T11:06:18.399084",
+                until="2025-05-29T12:00:00.000000",
+            )
+            assert [raw_file_timestamp(file, "address") for file in files] == [
+                "2025-05-29T11:06:18.399084"
+            ]
+            s3_client.delete_objects(
+                Bucket="test-bucket",
+                Delete={
+                    "Objects": [
+                        {"Key": raw_key("address", timestamp, "json", key_layout)}
+                        for timestamp in timestamps
+                    ]
+                },
+            )
+
+    @pytest.mark.it("Testing the listing starts after the older files")
+    def test_starts_after_older_files(self, s3_client):
+        put_raw_files(
+            s3_client,
+            "address",
+            ["2025-05-28T10:00:00.000000", "2025-05-29T11:06:18.399084"],
+            "hive",
+        )
+        paginator = s3_client.get_paginator("list_objects_v2")
+        with patch.object(s3_client, "get_paginator", return_value=paginator):
+            with patch.object(paginator, "paginate", wraps=paginator.paginate) as spy:
+                files = list_raw_files(
+                    "address",
+                    "test-bucket",
+                    s3_client,
+                    since="2025-05-29T11:06:18.399084",
+                )
+        assert files == ["dt=2025-05-29/hour=11/part-2025-05-29T11:06:18.399084.json"]
+        assert (
+            call(
+                Bucket="test-bucket",
+                Prefix="address/dt=",
+                StartAfter="address/dt=2025-05-29/hour=11/",
+            )
+            in spy.call_args_list
+        )
+
+
+class TestListPartitions:
+    @pytest.mark.it("Testing lists the hour partitions from the one of since onwards")
+    def test_lists_partitions(self, s3_client):
+        put_raw_files(
+            s3_client,
+            "address",
+            [
+                "2025-05-28T10:00:00.000000",
+                "2025-05-29T09:00:00.000000",
+                "2025-05-29T11:06:18.399084",
+                "2025-05-29T11:30:00.000000",
+                "2025-05-30T01:00:00.000000",
+            ],
+            "hive",
+        )
+        assert list_partitions(
+            "address", "test-bucket", s3_client, since="2025-05-29T11:00:00"
+        ) == [
+            "address/dt=2025-05-29/hour=11/",
+            "address/dt=2025-05-30/hour=01/",
+        ]
+        assert len(list_partitions("address", "test-bucket", s3_client)) == 4
@@ -0,0 +1,107 @@
+import os
+import sys
+import json
+import time
+import threading
+import pytest
+import pandas as pd
+from unittest.mock import patch
+from moto import mock_aws
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+from src.python.utils.raw_reader import iter_raw_dataframes, read_raw_dataframes
+
+""" Tests for the concurrent bulk reader of raw files """
+
+
+@pytest.fixture
+def aws_creds():
+    os.environ["AWS_ACCESS_KEY_ID"] = "Test"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "Test"
+    os.environ["AWS_SECURITY_TOKEN"] = "Test"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture()
+def s3_client(aws_creds):
+    with mock_aws():
+        s3_client = boto3.client("s3", region_name="eu-west-2")
+        s3_client.create_bucket(
+            Bucket="test-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        yield s3_client
+
+
+class SlowReader:
+    """A fake json_to_pd_dataframe recording how many files are read at the same time"""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.reading = 0
+        self.most_reading = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, file, table_name, bucket_name, columns=None, filters=None):
+        with self.lock:
+            self.reading += 1
+            self.most_reading = max(self.most_reading, self.reading)
+        time.sleep(self.delays[file])
+        with self.lock:
+            self.reading -= 1
+        if file == "broken":
+            raise Exception("Error retrieving data from specified bucket")
+        return pd.DataFrame({"file": [file]})
+
+
+class TestIterRawDataframes:
+    @pytest.mark.it("Testing files are read concurrently and yielded in their order")
+    def test_concurrent_in_order(self):
+        reader = SlowReader({"a": 0.2, "b": 0.05, "c": 0.05, "d": 0.05})
+        with patch("src.python.utils.raw_reader.json_to_pd_dataframe", reader):
+            results = list(
+                iter_raw_dataframes(["a", "b", "c", "d"], "department", "bucket", 4)
+            )
+        assert [file for file, _ in results] == ["a", "b", "c", "d"]
+        assert [df["file"][0] for _, df in results] == ["a", "b", "c", "d"]
+        assert reader.most_reading > 1
+
+    @pytest.mark.it("Testing no more than max_workers files are read at the same time")
+    def test_bounded(self):
+        files = [f"file-{i}" for i in range(10)]
+        reader = SlowReader({file: 0.01 for file in files})
+        with patch("src.python.utils.raw_reader.json_to_pd_dataframe", reader):
+            results = list(iter_raw_dataframes(files, "department", "bucket", 3))
+        assert len(results) == 10
+        assert reader.most_reading <= 3
+
+    @pytest.mark.it("Testing the error of a file that can't be read is raised")
+    def test_raises_error(self):
+        reader = SlowReader({"a": 0, "broken": 0, "c": 0})
+        with patch("src.python.utils.raw_reader.json_to_pd_dataframe", reader):
+            with pytest.raises(Exception, match="Error retrieving data"):
+                list(iter_raw_dataframes(["a", "broken", "c"], "department", "bucket"))
+
+
+class TestReadRawDataframes:
+    @pytest.mark.it("Testing the files of a table are read from s3 into one dataframe")
+    def test_reads_files(self, s3_client):
+        files = []
+        for i in range(5):
+            file = f"department-2025-05-2{i}T11:06:18.399084.json"
+            s3_client.put_object(
+                Bucket="test-bucket",
+                Key=f"department/{file}",
+                Body=json.dumps({"department": [{"department_id": i}]}),
+            )
+            files.append(file)
+        df = read_raw_dataframes(files, "department", "test-bucket", max_workers=2)
+        assert list(df["department_id"]) == [0, 1, 2, 3, 4]
+        assert list(df.index) == [0, 1, 2, 3, 4]
+
+    @pytest.mark.it("Testing an empty dataframe is returned for no files")
+    def test_no_files(self):
+        assert read_raw_dataframes([], "department", "test-bucket").empty
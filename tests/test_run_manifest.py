@@ -0,0 +1,146 @@
+import os
+import sys
+import json
+import pytest
+from moto import mock_aws
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+from src.python.utils.run_manifest import (
+    manifest_key,
+    build_manifest,
+    write_manifest,
+    read_manifest,
+    manifest_files,
+    manifest_file,
+    manifest_keys,
+)
+
+""" Tests for the run manifests passed from one stage to the next """
+
+
+@pytest.fixture
+def aws_creds():
+    os.environ["AWS_ACCESS_KEY_ID"] = "Test"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "Test"
+    os.environ["AWS_SECURITY_TOKEN"] = "Test"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture()
+def s3_client(aws_creds):
+    with mock_aws():
+        s3_client = boto3.client("s3", region_name="eu-west-2")
+        s3_client.create_bucket(
+            Bucket="test-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        yield s3_client
+
+
+TIMESTAMP = "2025-05-29T11:06:18.399084"
+
+
+class TestBuildManifest:
+    @pytest.mark.it("Testing the manifest lists each table's keys, row count and sizes")
+    def test_build_manifest(self, s3_client):
+        s3_client.put_object(
+            Bucket="test-bucket",
+            Key=f"staff/staff-{TIMESTAMP}-part-00001.json",
+            Body=b"12345",
+        )
+        s3_client.put_object(
+            Bucket="test-bucket",
+            Key=f"staff/staff-{TIMESTAMP}-part-00002.json",
+            Body=b"123",
+        )
+        manifest = build_manifest(
+            TIMESTAMP,
+            "test-bucket",
+            {
+                "staff": {
+                    "keys": [
+                        f"staff/staff-{TIMESTAMP}-part-00001.json",
+                        f"staff/staff-{TIMESTAMP}-part-00002.json",
+                    ],
+                    "row_count": 3,
+                },
+                "address": {"keys": [], "row_count": 0},
+            },
+            s3_client,
+        )
+        assert manifest == {
+            "timestamp": TIMESTAMP,
+            "bucket": "test-bucket",
+            "tables": {
+                "staff": {
+                    "row_count": 3,
+                    "files": [
+                        {
+                            "key": f"staff/staff-{TIMESTAMP}-part-00001.json",
+                            "bytes": 5,
+                        },
+                        {
+                            "key": f"staff/staff-{TIMESTAMP}-part-00002.json",
+                            "bytes": 3,
+                        },
+                    ],
+                }
+            },
+        }
+
+
+class TestWriteReadManifest:
+    @pytest.mark.it("Testing the manifest is saved under manifests/ and read back")
+    def test_write_and_read(self, s3_client):
+        manifest = {"timestamp": TIMESTAMP, "bucket": "test-bucket", "tables": {}}
+        key = write_manifest(manifest, "test-bucket", s3_client)
+        assert key == manifest_key(TIMESTAMP) == f"manifests/run-{TIMESTAMP}.json"
+        body = s3_client.get_object(Bucket="test-bucket", Key=key)["Body"].read()
+        assert json.loads(body) == manifest
+        assert read_manifest("test-bucket", key, s3_client) == manifest
+
+
+class TestManifestFiles:
+    @pytest.mark.it("Testing file names are relative to the table's folder")
+    def test_manifest_files(self):
+        manifest = {
+            "tables": {
+                "address": {
+                    "row_count": 1,
+                    "files": [
+                        {"key": f"address/dt=2025-05-29/hour=11/part-{TIMESTAMP}.json"}
+                    ],
+                }
+            }
+        }
+        assert manifest_files(manifest, "address") == [
+            f"dt=2025-05-29/hour=11/part-{TIMESTAMP}.json"
+        ]
+        assert manifest_file(manifest, "address") == (
+            f"dt=2025-05-29/hour=11/part-{TIMESTAMP}.json"
+        )
+        assert manifest_files(manifest, "staff") == []
+        assert manifest_file(manifest, "staff") is None
+
+    @pytest.mark.it("Testing the full keys are given, or None without a manifest")
+    def test_manifest_keys(self):
+        manifest = {
+            "tables": {
+                "address": {
+                    "row_count": 2,
+                    "files": [
+                        {"key": f"address/address-{TIMESTAMP}-part-00001.json"},
+                        {"key": f"address/address-{TIMESTAMP}-part-00002.json"},
+                    ],
+                }
+            }
+        }
+        assert manifest_keys(manifest, "address") == [
+            f"address/address-{TIMESTAMP}-part-00001.json",
+            f"address/address-{TIMESTAMP}-part-00002.json",
+        ]
+        assert manifest_keys(manifest, "staff") == []
+        assert manifest_keys(None, "address") is None
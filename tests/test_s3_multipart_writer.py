@@ -0,0 +1,68 @@
+import os
+import sys
+import pytest
+from moto import mock_aws
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+from src.python.utils.s3_multipart_writer import S3MultipartWriter, MIN_PART_SIZE
+
+""" Tests for S3MultipartWriter """
+
+
+@pytest.fixture
+def aws_creds():
+    os.environ["AWS_ACCESS_KEY_ID"] = "Test"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "Test"
+    os.environ["AWS_SECURITY_TOKEN"] = "Test"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture()
+def s3_client(aws_creds):
+    with mock_aws():
+        s3_client = boto3.client("s3", region_name="eu-west-2")
+        s3_client.create_bucket(
+            Bucket="test-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        yield s3_client
+
+
+class TestS3MultipartWriter:
+    @pytest.mark.it("Testing that a small object is uploaded with a single put_object")
+    def test_small_object_uploaded(self, s3_client):
+        with S3MultipartWriter("test-bucket", "small.txt", s3_client) as writer:
+            writer.write(b"hello ")
+            writer.write("world")
+        body = s3_client.get_object(Bucket="test-bucket", Key="small.txt")["Body"]
+        assert body.read() == b"hello world"
+        assert writer._upload_id is None
+
+    @pytest.mark.it("Testing that a large object is uploaded in multiple parts")
+    def test_large_object_uploaded_in_parts(self, s3_client):
+        chunk = b"x" * (1024 * 1024)
+        with S3MultipartWriter("test-bucket", "large.txt", s3_client) as writer:
+            for _ in range(6):
+                writer.write(chunk)
+            writer.write(b"end")
+        assert len(writer._parts) == 2
+        body = s3_client.get_object(Bucket="test-bucket", Key="large.txt")["Body"]
+        assert body.read() == chunk * 6 + b"end"
+
+    @pytest.mark.it("Testing that nothing is uploaded if an error occurs while writing")
+    def test_upload_aborted_on_error(self, s3_client):
+        with pytest.raises(RuntimeError):
+            with S3MultipartWriter("test-bucket", "failed.txt", s3_client) as writer:
+                writer.write(b"x" * MIN_PART_SIZE)
+                raise RuntimeError("extract failed")
+        assert "Contents" not in s3_client.list_objects_v2(Bucket="test-bucket")
+        uploads = s3_client.list_multipart_uploads(Bucket="test-bucket")
+        assert "Uploads" not in uploads
+
+    @pytest.mark.it("Testing that a part size below the s3 minimum raises ValueError")
+    def test_part_size_too_small(self, s3_client):
+        with pytest.raises(ValueError):
+            S3MultipartWriter("test-bucket", "key", s3_client, part_size=1024)
@@ -0,0 +1,24 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+from src.python.utils.settings import get_setting
+
+""" Tests for the lambdas' run settings """
+
+
+class TestGetSetting:
+    @pytest.mark.it("Testing the event's (lower case) setting is used first")
+    def test_event_first(self, monkeypatch):
+        monkeypatch.setenv("EXTRACT_MODE", "chunked")
+        assert get_setting({"extract_mode": "copy"}, "EXTRACT_MODE", "x") == "copy"
+
+    @pytest.mark.it("Testing the environment, then the default, are used otherwise")
+    def test_environment_then_default(self, monkeypatch):
+        monkeypatch.setenv("EXTRACT_MODE", "chunked")
+        assert get_setting({}, "EXTRACT_MODE", "standard") == "chunked"
+        monkeypatch.delenv("EXTRACT_MODE")
+        assert get_setting(None, "EXTRACT_MODE", "standard") == "standard"
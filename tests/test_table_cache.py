@@ -0,0 +1,173 @@
+import os
+import sys
+import pytest
+import pandas as pd
+from unittest.mock import Mock, patch
+from moto import mock_aws
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+from utils.table_cache import (
+    TableCache,
+    run_cache,
+    active_cache,
+    cached_value,
+    reference_cache,
+)
+from utils.json_to_pd_dataframe import json_to_pd_dataframe
+from utils.aws_clients import get_client
+
+""" Tests for the run-scoped table cache of the transform lambda """
+
+
+@pytest.fixture
+def aws_creds():
+    os.environ["AWS_ACCESS_KEY_ID"] = "Test"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "Test"
+    os.environ["AWS_SECURITY_TOKEN"] = "Test"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture()
+def s3_client(aws_creds):
+    with mock_aws():
+        s3_client = boto3.client("s3", region_name="eu-west-2")
+        s3_client.create_bucket(
+            Bucket="test-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        yield s3_client
+
+
+class TestTableCache:
+    @pytest.mark.it("Testing an object's frame is loaded once per (bucket, key, ETag)")
+    def test_frame_loaded_once(self):
+        cache = TableCache()
+        load = Mock(return_value=pd.DataFrame({"staff_id": [1]}))
+        cache.frame("bucket", "staff/staff.json", '"etag-1"', load)
+        cache.frame("bucket", "staff/staff.json", '"etag-1"', load)
+        assert load.call_count == 1
+        cache.frame("bucket", "staff/staff.json", '"etag-2"', load)
+        assert load.call_count == 2
+        assert (cache.hits, cache.misses) == (1, 2)
+
+    @pytest.mark.it("Testing changes to a returned frame don't change the cached frame")
+    def test_frames_are_copies(self):
+        cache = TableCache()
+        load = Mock(return_value=pd.DataFrame({"staff_id": [1], "created_at": ["x"]}))
+        df = cache.frame("bucket", "staff/staff.json", '"etag"', load)
+        df.drop(["created_at"], axis=1, inplace=True)
+        df = cache.frame("bucket", "staff/staff.json", '"etag"', load)
+        assert list(df.columns) == ["staff_id", "created_at"]
+
+    @pytest.mark.it("Testing derived values are built once, and None is cached too")
+    def test_value_built_once(self):
+        cache = TableCache()
+        build = Mock(return_value=None)
+        assert cache.value("fact_sales_order", build) is None
+        assert cache.value("fact_sales_order", build) is None
+        assert build.call_count == 1
+
+    @pytest.mark.it(
+        "Testing at most max_frames frames are kept, dropping the least recently used"
+    )
+    def test_max_frames(self):
+        cache = TableCache(max_frames=2)
+        load = Mock(return_value=pd.DataFrame({"staff_id": [1]}))
+        cache.frame("bucket", "a", '"etag"', load)
+        cache.frame("bucket", "b", '"etag"', load)
+        cache.frame("bucket", "a", '"etag"', load)
+        cache.frame("bucket", "c", '"etag"', load)
+        assert list(cache.frames) == [
+            ("bucket", "a", '"etag"', None),
+            ("bucket", "c", '"etag"', None),
+        ]
+        assert load.call_count == 3
+
+
+class TestRunCache:
+    @pytest.mark.it("Testing the cache is only active inside run_cache")
+    def test_run_cache_scope(self):
+        assert active_cache() is None
+        with run_cache() as cache:
+            assert active_cache() is cache
+        assert active_cache() is None
+
+    @pytest.mark.it("Testing cached_value only caches inside run_cache")
+    def test_cached_value(self):
+        build = Mock(return_value="2025-05-29T11:06:18.399084")
+        cached_value("last_updated", build)
+        cached_value("last_updated", build)
+        assert build.call_count == 2
+        with run_cache():
+            cached_value("last_updated", build)
+            cached_value("last_updated", build)
+        assert build.call_count == 3
+
+
+class TestJsonToPdDataframeCache:
+    @pytest.mark.it(
+        "Testing a raw file is downloaded once per run, without looking up its ETag"
+    )
+    def test_raw_file_downloaded_once(self, s3_client):
+        key = "staff/staff-2025-05-29T11:06:18.399084.json"
+        s3_client.put_object(
+            Bucket="test-bucket", Key=key, Body=b'{"staff": [{"staff_id": 1}]}'
+        )
+        shared_client = get_client("s3")
+        with patch.object(
+            shared_client, "get_object", wraps=shared_client.get_object
+        ) as spy, patch.object(
+            shared_client, "head_object", wraps=shared_client.head_object
+        ) as head_spy:
+            for _ in range(2):
+                with run_cache():
+                    for _ in range(3):
+                        df = json_to_pd_dataframe(
+                            "staff-2025-05-29T11:06:18.399084.json",
+                            "staff",
+                            "test-bucket",
+                        )
+                    assert list(df["staff_id"]) == [1]
+            assert spy.call_count == 2
+            head_spy.assert_not_called()
+
+    @pytest.mark.it(
+        "Testing a reference table's file is kept between runs, and read again once changed"
+    )
+    def test_reference_table_kept_between_runs(self, s3_client):
+        key = "currency/currency-2025-05-29T11:06:18.399084.json"
+        s3_client.put_object(
+            Bucket="test-bucket",
+            Key=key,
+            Body=b'{"currency": [{"currency_id": 7, "currency_code": "GBP"}]}',
+        )
+        shared_client = get_client("s3")
+        with patch.object(
+            shared_client, "get_object", wraps=shared_client.get_object
+        ) as spy:
+            for _ in range(2):
+                with run_cache():
+                    df = json_to_pd_dataframe(
+                        "currency-2025-05-29T11:06:18.399084.json",
+                        "currency",
+                        "test-bucket",
+                    )
+                assert list(df["currency_id"]) == [7]
+            assert spy.call_count == 1
+            assert reference_cache().hits >= 1
+            s3_client.put_object(
+                Bucket="test-bucket",
+                Key=key,
+                Body=b'{"currency": [{"currency_id": 8, "currency_code": "GBP"}]}',
+            )
+            with run_cache():
+                df = json_to_pd_dataframe(
+                    "currency-2025-05-29T11:06:18.399084.json",
+                    "currency",
+                    "test-bucket",
+                )
+            assert list(df["currency_id"]) == [8]
+            assert spy.call_count == 2
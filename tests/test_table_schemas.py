@@ -0,0 +1,106 @@
+import os
+import sys
+import pytest
+import pandas as pd
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+from src.python.utils.table_schemas import (
+    apply_schema,
+    table_columns,
+    table_schema,
+    TABLE_SCHEMAS,
+)
+from src.python.utils.extract_catalog import EXTRACT_CATALOG
+
+""" Tests for the declared dtypes of the raw tables """
+
+
+class TestTableSchema:
+    @pytest.mark.it("Testing every table of the extract catalog has a schema")
+    def test_every_table(self):
+        assert set(TABLE_SCHEMAS) == set(EXTRACT_CATALOG)
+        for table_name, entry in EXTRACT_CATALOG.items():
+            assert set(table_schema(table_name)) == set(entry["columns"])
+
+    @pytest.mark.it("Testing the overridden columns use their declared dtype")
+    def test_overrides(self):
+        assert table_schema("currency")["currency_code"] == "category"
+        assert table_schema("transaction")["sales_order_id"] == "Int32"
+        assert table_schema("sales_order")["sales_order_id"] == "int32"
+
+    @pytest.mark.it(
+        "Testing a table's columns are listed in order, leaving out exclude"
+    )
+    def test_table_columns(self):
+        assert table_columns("currency") == [
+            "currency_id",
+            "currency_code",
+            "last_updated",
+        ]
+        assert table_columns("currency", exclude=["last_updated"]) == [
+            "currency_id",
+            "currency_code",
+        ]
+
+    @pytest.mark.it("Testing an unknown table has an empty schema")
+    def test_unknown_table(self):
+        assert table_schema("not_a_table") == {}
+
+
+class TestApplySchema:
+    @pytest.mark.it("Testing ids, numerics and timestamps are converted")
+    def test_converts_columns(self):
+        df = pd.DataFrame(
+            {
+                "sales_order_id": [1, 2],
+                "unit_price": ["3.36", "7.79"],
+                "created_at": ["2022-11-03 14:20:52.186000", "2022-11-03 14:20:52"],
+                "agreed_payment_date": ["2022-11-07", "2022-11-08"],
+            }
+        )
+        result = apply_schema(df, "sales_order")
+        assert result["sales_order_id"].dtype == "int32"
+        assert result["unit_price"].dtype == "float64"
+        assert list(result["unit_price"]) == [3.36, 7.79]
+        assert pd.api.types.is_datetime64_any_dtype(result["created_at"])
+        assert result["created_at"][1] == pd.Timestamp("2022-11-03 14:20:52")
+        assert list(result["agreed_payment_date"]) == ["2022-11-07", "2022-11-08"]
+
+    @pytest.mark.it("Testing low cardinality strings and nullable ids are converted")
+    def test_category_and_nullable(self):
+        df = pd.DataFrame(
+            {
+                "transaction_type": ["SALE", "PURCHASE", "SALE"],
+                "sales_order_id": [1, None, 3],
+            }
+        )
+        result = apply_schema(df, "transaction")
+        assert isinstance(result["transaction_type"].dtype, pd.CategoricalDtype)
+        assert result["sales_order_id"].dtype == "Int32"
+        assert result["sales_order_id"].isna().tolist() == [False, True, False]
+
+    @pytest.mark.it(
+        "Testing columns not in the dataframe, and unknown tables, are left alone"
+    )
+    def test_missing_columns(self):
+        df = pd.DataFrame({"department_id": [1], "extra": ["x"]})
+        result = apply_schema(df, "department")
+        assert list(result.columns) == ["department_id", "extra"]
+        assert result["department_id"].dtype == "int32"
+        assert (
+            apply_schema(pd.DataFrame({"a": [1]}), "not_a_table")["a"].dtype == "int64"
+        )
+
+    @pytest.mark.it(
+        "Testing columns that already have their dtype are not converted again"
+    )
+    def test_already_converted(self):
+        created_at = pd.to_datetime(["2022-11-03 14:20:52"])
+        df = pd.DataFrame(
+            {"department_id": pd.Series([1], dtype="int32"), "created_at": created_at}
+        )
+        result = apply_schema(df, "department")
+        assert result["department_id"].dtype == "int32"
+        assert result["created_at"][0] == created_at[0]
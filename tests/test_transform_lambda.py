@@ -6,6 +6,8 @@ import pytest
 from unittest.mock import patch
 from moto import mock_aws
 import pandas as pd
+import json
+from io import BytesIO
 
 table_list = [
     "dim_staff",
@@ -22,6 +24,7 @@ sys.path.insert(
 )
 
 from src.transform_lambda import lambda_handler
+from utils.calendar_dim import confirm_date_range
 
 """ Tests for transform_lambda funtion"""
 
@@ -75,7 +78,7 @@ class TestTransformLambda:
             CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
         )
         result = lambda_handler({}, {})
-        assert result == {"result": "success"}
+        assert result["result"] == "success"
 
     @mock_aws
     @patch("src.transform_lambda.transform_dim_staff")
@@ -173,3 +176,289 @@ class TestTransformLambda:
         timestamp2 = datetime.now().isoformat(timespec="minutes")
         filename = f"dim_design/dim_design-{timestamp2}.parquet"
         assert filename not in bucket_contents
+
+    @pytest.mark.it(
+        "Testing that the extract run's manifest is passed on and a processed manifest is returned"
+    )
+    @mock_aws
+    @patch("src.transform_lambda.transform_dim_staff")
+    @patch("src.transform_lambda.transform_dim_location")
+    @patch("src.transform_lambda.transform_dim_design")
+    @patch("src.transform_lambda.transform_dim_currency")
+    @patch("src.transform_lambda.transform_dim_counterparty")
+    @patch("src.transform_lambda.transform_fact_sales_order")
+    @patch("src.transform_lambda.transform_dim_date")
+    def test_manifest_passed_on(
+        self,
+        mock_transform_dim_date,
+        mock_transform_fact_sales,
+        mock_dim_counterparty,
+        mock_transform_dim_currency,
+        mock_transform_dim_design,
+        mock_transform_dim_location,
+        mock_transform_dim_staff,
+        aws_creds,
+    ):
+        dummy_df = pd.DataFrame({"staff_id": [1, 2]})
+        for mock_transform in [
+            mock_transform_dim_location,
+            mock_transform_dim_design,
+            mock_transform_dim_currency,
+            mock_dim_counterparty,
+            mock_transform_fact_sales,
+            mock_transform_dim_date,
+        ]:
+            mock_transform.return_value = None
+        mock_transform_dim_staff.return_value = dummy_df
+        s3_client = boto3.client("s3", region_name="eu-west-2")
+        for bucket in ["fscifa-raw-data", "fscifa-processed-data"]:
+            s3_client.create_bucket(
+                Bucket=bucket,
+                CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+            )
+        extract_manifest = {
+            "timestamp": "2025-05-29T11:06:18.399084",
+            "bucket": "fscifa-raw-data",
+            "tables": {},
+        }
+        s3_client.put_object(
+            Bucket="fscifa-raw-data",
+            Key="manifests/run-2025-05-29T11:06:18.399084.json",
+            Body=json.dumps(extract_manifest),
+        )
+        result = lambda_handler(
+            {"manifest_key": "manifests/run-2025-05-29T11:06:18.399084.json"}, {}
+        )
+        assert mock_transform_dim_staff.call_args.kwargs == {
+            "manifest": extract_manifest
+        }
+        manifest = json.loads(
+            s3_client.get_object(
+                Bucket="fscifa-processed-data", Key=result["manifest_key"]
+            )["Body"].read()
+        )
+        assert list(manifest["tables"]) == ["dim_staff"]
+        assert manifest["tables"]["dim_staff"]["row_count"] == 2
+        assert manifest["tables"]["dim_staff"]["files"][0]["key"].startswith(
+            "dim_staff/dim_staff-"
+        )
+
+    @pytest.mark.it(
+        "Testing that the fact table is built once, for both dim_date and fact_sales_order"
+    )
+    @mock_aws
+    @patch("src.transform_lambda.transform_dim_staff", return_value=None)
+    @patch("src.transform_lambda.transform_dim_location", return_value=None)
+    @patch("src.transform_lambda.transform_dim_design", return_value=None)
+    @patch("src.transform_lambda.transform_dim_currency", return_value=None)
+    @patch("src.transform_lambda.transform_dim_counterparty", return_value=None)
+    @patch("src.transform_lambda.transform_fact_sales_order")
+    @patch("src.transform_lambda.transform_dim_date")
+    def test_fact_table_built_once(
+        self,
+        mock_transform_dim_date,
+        mock_transform_fact_sales,
+        mock_dim_counterparty,
+        mock_transform_dim_currency,
+        mock_transform_dim_design,
+        mock_transform_dim_location,
+        mock_transform_dim_staff,
+        aws_creds,
+    ):
+        fact_sales = pd.DataFrame({"sales_order_id": [1]})
+        mock_transform_fact_sales.return_value = fact_sales
+        mock_transform_dim_date.return_value = pd.DataFrame({"date_id": [1]})
+        s3_client = boto3.client("s3", region_name="eu-west-2")
+        s3_client.create_bucket(
+            Bucket="fscifa-processed-data",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        lambda_handler({}, {})
+        assert mock_transform_fact_sales.call_count == 1
+        pd.testing.assert_frame_equal(
+            mock_transform_dim_date.call_args.args[0], fact_sales
+        )
+
+    @pytest.mark.it(
+        "Testing that in chunked mode, the fact table written in batches is in the manifest, and dim_date gets its dates"
+    )
+    @mock_aws
+    @patch("src.transform_lambda.transform_dim_staff", return_value=None)
+    @patch("src.transform_lambda.transform_dim_location", return_value=None)
+    @patch("src.transform_lambda.transform_dim_design", return_value=None)
+    @patch("src.transform_lambda.transform_dim_currency", return_value=None)
+    @patch("src.transform_lambda.transform_dim_counterparty", return_value=None)
+    @patch("src.transform_lambda.transform_fact_sales_order")
+    @patch("src.transform_lambda.transform_fact_sales_order_chunked")
+    @patch("src.transform_lambda.transform_dim_date")
+    def test_chunked_fact_mode(
+        self,
+        mock_transform_dim_date,
+        mock_transform_fact_chunked,
+        mock_transform_fact_sales,
+        mock_dim_counterparty,
+        mock_transform_dim_currency,
+        mock_transform_dim_design,
+        mock_transform_dim_location,
+        mock_transform_dim_staff,
+        aws_creds,
+    ):
+        s3_client = boto3.client("s3", region_name="eu-west-2")
+        s3_client.create_bucket(
+            Bucket="fscifa-processed-data",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        s3_client.put_object(
+            Bucket="fscifa-processed-data",
+            Key="fact_sales_order/fact_sales_order-2025-05-29T11:07.parquet",
+            Body=b"parquet",
+        )
+        mock_transform_fact_chunked.return_value = {
+            "s3_uri": "s3://fscifa-processed-data/fact_sales_order/fact_sales_order-2025-05-29T11:07.parquet",
+            "row_count": 3,
+            "dates": {"2025-05-29"},
+        }
+        mock_transform_dim_date.return_value = None
+        result = lambda_handler(
+            {"transform_fact_mode": "chunked", "transform_batch_size": "2"}, {}
+        )
+        assert mock_transform_fact_sales.call_count == 0
+        assert mock_transform_fact_chunked.call_count == 1
+        assert mock_transform_fact_chunked.call_args.kwargs["batch_size"] == 2
+        assert mock_transform_dim_date.call_args.kwargs["dates"] == {"2025-05-29"}
+        manifest = json.loads(
+            s3_client.get_object(
+                Bucket="fscifa-processed-data", Key=result["manifest_key"]
+            )["Body"].read()
+        )
+        assert manifest["tables"]["fact_sales_order"]["row_count"] == 3
+        assert manifest["tables"]["fact_sales_order"]["files"][0]["key"] == (
+            "fact_sales_order/fact_sales_order-2025-05-29T11:07.parquet"
+        )
+
+    @pytest.mark.it(
+        "Testing that dim_date only gets the days not loaded yet, and the range sent is kept as pending"
+    )
+    @mock_aws
+    @patch("src.transform_lambda.transform_dim_staff", return_value=None)
+    @patch("src.transform_lambda.transform_dim_location", return_value=None)
+    @patch("src.transform_lambda.transform_dim_design", return_value=None)
+    @patch("src.transform_lambda.transform_dim_currency", return_value=None)
+    @patch("src.transform_lambda.transform_dim_counterparty", return_value=None)
+    @patch("src.transform_lambda.transform_fact_sales_order")
+    def test_dim_date_range_saved(
+        self,
+        mock_transform_fact_sales,
+        mock_dim_counterparty,
+        mock_transform_dim_currency,
+        mock_transform_dim_design,
+        mock_transform_dim_location,
+        mock_transform_dim_staff,
+        aws_creds,
+    ):
+        mock_transform_fact_sales.return_value = pd.DataFrame(
+            {
+                "created_date": ["2022-11-03"],
+                "last_updated_date": ["2022-11-04"],
+                "agreed_payment_date": ["2022-11-06"],
+                "agreed_delivery_date": ["2022-11-05"],
+            }
+        )
+        s3_client = boto3.client("s3", region_name="eu-west-2")
+        s3_client.create_bucket(
+            Bucket="fscifa-processed-data",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        result = lambda_handler({}, {})
+        manifest = json.loads(
+            s3_client.get_object(
+                Bucket="fscifa-processed-data", Key=result["manifest_key"]
+            )["Body"].read()
+        )
+        assert manifest["tables"]["dim_date"]["row_count"] == 4
+        date_range = json.loads(
+            s3_client.get_object(
+                Bucket="fscifa-processed-data", Key="state/dim_date_pending.json"
+            )["Body"].read()
+        )
+        assert date_range == {"start": "2022-11-03", "end": "2022-11-06"}
+        # the load lambda inserts the rows
+        confirm_date_range(
+            pd.DataFrame({"date_id": ["2022-11-03", "2022-11-06"]}),
+            "fscifa-processed-data",
+            s3_client,
+        )
+
+        mock_transform_fact_sales.return_value["agreed_delivery_date"] = "2022-11-08"
+        result = lambda_handler({}, {})
+        manifest = json.loads(
+            s3_client.get_object(
+                Bucket="fscifa-processed-data", Key=result["manifest_key"]
+            )["Body"].read()
+        )
+        assert manifest["tables"]["dim_date"]["row_count"] == 2
+
+    @pytest.mark.it(
+        "Testing that when the load fails, the next run sends the days again with the new ones"
+    )
+    @mock_aws
+    @patch("src.transform_lambda.transform_dim_staff", return_value=None)
+    @patch("src.transform_lambda.transform_dim_location", return_value=None)
+    @patch("src.transform_lambda.transform_dim_design", return_value=None)
+    @patch("src.transform_lambda.transform_dim_currency", return_value=None)
+    @patch("src.transform_lambda.transform_dim_counterparty", return_value=None)
+    @patch("src.transform_lambda.transform_fact_sales_order")
+    def test_dim_date_resent_when_load_fails(
+        self,
+        mock_transform_fact_sales,
+        mock_dim_counterparty,
+        mock_transform_dim_currency,
+        mock_transform_dim_design,
+        mock_transform_dim_location,
+        mock_transform_dim_staff,
+        aws_creds,
+    ):
+        mock_transform_fact_sales.return_value = pd.DataFrame(
+            {
+                "created_date": ["2022-11-03"],
+                "last_updated_date": ["2022-11-04"],
+                "agreed_payment_date": ["2022-11-06"],
+                "agreed_delivery_date": ["2022-11-05"],
+            }
+        )
+        s3_client = boto3.client("s3", region_name="eu-west-2")
+        s3_client.create_bucket(
+            Bucket="fscifa-processed-data",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        lambda_handler({}, {})
+        # the load fails, so confirm_date_range is never called
+        mock_transform_fact_sales.return_value["agreed_delivery_date"] = "2022-11-08"
+        result = lambda_handler({}, {})
+        manifest = json.loads(
+            s3_client.get_object(
+                Bucket="fscifa-processed-data", Key=result["manifest_key"]
+            )["Body"].read()
+        )
+        dim_date = pd.read_parquet(
+            BytesIO(
+                s3_client.get_object(
+                    Bucket="fscifa-processed-data",
+                    Key=manifest["tables"]["dim_date"]["files"][0]["key"],
+                )["Body"].read()
+            )
+        )
+        assert [str(date) for date in dim_date["date_id"]] == [
+            "2022-11-03",
+            "2022-11-04",
+            "2022-11-05",
+            "2022-11-06",
+            "2022-11-07",
+            "2022-11-08",
+        ]
+        date_range = json.loads(
+            s3_client.get_object(
+                Bucket="fscifa-processed-data", Key="state/dim_date_pending.json"
+            )["Body"].read()
+        )
+        assert date_range == {"start": "2022-11-03", "end": "2022-11-08"}
@@ -2,12 +2,15 @@ import pytest
 import os
 import sys
 import pandas as pd
+import pyarrow.parquet as pq
+from io import BytesIO
 
 sys.path.insert(
     0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
 )
 from src.python.utils.transform_sales import (
     transform_fact_sales_order,
+    transform_fact_sales_order_chunked,
     transform_dim_date,
 )
 
@@ -111,6 +114,16 @@ class TestMakeFactSalesOrderTable:
                 "agreed_delivery_date": ["1905-06-22", "1910-05-21"],
                 "agreed_delivery_location_id": [12, 3],
             }
+        ).astype(
+            {
+                "sales_order_id": "int32",
+                "sales_staff_id": "int32",
+                "counterparty_id": "int32",
+                "units_sold": "int32",
+                "currency_id": "int32",
+                "design_id": "int32",
+                "agreed_delivery_location_id": "int32",
+            }
         )
         pd.testing.assert_frame_equal(fact_table, expected_fact_table)
 
@@ -126,6 +139,80 @@ class TestMakeFactSalesOrderTable:
             transform_fact_sales_order()
 
 
+class TestMakeFactSalesOrderTableChunked:
+    @pytest.mark.it(
+        "Tests that the chunked transform writes the same fact table, one row group per batch"
+    )
+    def test_writes_fact_table_in_batches(self, bucket, s3_resource):
+        s3_resource.create_bucket(
+            Bucket="fscifa-processed-data",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        result = transform_fact_sales_order_chunked(
+            "fscifa-processed-data",
+            "fact_sales_order",
+            "2025-05-29T11:07",
+            batch_size=1,
+        )
+        assert result["s3_uri"] == (
+            "s3://fscifa-processed-data/fact_sales_order/fact_sales_order-2025-05-29T11:07.parquet"
+        )
+        assert result["row_count"] == 2
+        body = (
+            s3_resource.Object(
+                "fscifa-processed-data",
+                "fact_sales_order/fact_sales_order-2025-05-29T11:07.parquet",
+            )
+            .get()["Body"]
+            .read()
+        )
+        assert pq.ParquetFile(BytesIO(body)).num_row_groups == 2
+        pd.testing.assert_frame_equal(
+            pd.read_parquet(BytesIO(body)),
+            transform_fact_sales_order(),
+            check_dtype=False,
+        )
+
+    @pytest.mark.it(
+        "Tests that the chunked transform collects the distinct dates of every batch"
+    )
+    def test_collects_dates(self, bucket, s3_resource):
+        s3_resource.create_bucket(
+            Bucket="fscifa-processed-data",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        result = transform_fact_sales_order_chunked(
+            "fscifa-processed-data",
+            "fact_sales_order",
+            "2025-05-29T11:07",
+            batch_size=1,
+        )
+        assert result["dates"] == {
+            "1904-05-20",
+            "1905-06-22",
+            "1910-05-21",
+            "1914-05-29",
+            "2021-02-20",
+            "2022-02-21",
+        }
+        dim_table = transform_dim_date(dates=result["dates"])
+        assert list(dim_table["year"]) == [1904, 1905, 1910, 1914, 2021, 2022]
+
+    @pytest.mark.it(
+        "Tests that the chunked transform returns None when there is no new sales_order file"
+    )
+    @patch(
+        "src.python.utils.transform_sales.find_most_recent_filename", return_value=None
+    )
+    def test_no_new_file(self, find_most_recent_filename, bucket):
+        assert (
+            transform_fact_sales_order_chunked(
+                "fscifa-processed-data", "fact_sales_order", "2025-05-29T11:07"
+            )
+            is None
+        )
+
+
 class TestMakeDimDate:
     @pytest.mark.it(
         "Tests that the transform_dim_date function outputs the expected dim table"
@@ -191,6 +278,33 @@ class TestMakeDimDate:
             check_dtype=False,
         )
 
+    @pytest.mark.it(
+        "Tests that in calendar mode, transform_dim_date makes a contiguous calendar of the days not sent yet"
+    )
+    def test_transform_dim_date_calendar(self):
+        dates = {"2022-11-01", "2022-11-04", "2022-11-12"}
+        dim_table = transform_dim_date(
+            dates=dates, date_range=("2022-11-03", "2022-11-10"), calendar=True
+        )
+        assert [str(date_id) for date_id in dim_table["date_id"]] == [
+            "2022-11-01",
+            "2022-11-02",
+            "2022-11-11",
+            "2022-11-12",
+        ]
+        assert list(dim_table["day_name"]) == [
+            "Tuesday",
+            "Wednesday",
+            "Friday",
+            "Saturday",
+        ]
+        assert (
+            transform_dim_date(
+                dates=dates, date_range=("2022-11-01", "2022-11-12"), calendar=True
+            )
+            is None
+        )
+
     @pytest.mark.it(
         "Tests that transform_fact_sales_order raises an exception when given an empty or malformed dataframe"
     )
@@ -1,11 +1,23 @@
-from src.python.utils.insert_into_s3 import upload_json_to_s3
 from moto import mock_aws
 import boto3
 import pytest
 from botocore.exceptions import ClientError
 
 import os
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+from src.python.utils.insert_into_s3 import (
+    upload_json_to_s3,
+    upload_json_batches_to_s3,
+    upload_ndjson_to_s3,
+)
+import gzip
+import io
 import json
+import zstandard
 from datetime import datetime
 
 """"Tests for insert_into_s3 function"""
@@ -89,3 +101,138 @@ class TestInsertIntoS3:
             s3_client.list_objects_v2(Bucket="test-bucket")["Contents"][0]["Key"]
             == test_key
         )
+
+    @pytest.mark.it(
+        "Testing that a key with a codec suffix is compressed and marked with that codec"
+    )
+    @mock_aws
+    def test_json_compressed_from_key_suffix(aws_creds):
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(
+            Bucket="test-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        upload_json_to_s3(
+            '{"staff": [{"staff_id": 1}]}',
+            "test-bucket",
+            "staff/staff.json.zst",
+            s3_client,
+        )
+        response = s3_client.get_object(
+            Bucket="test-bucket", Key="staff/staff.json.zst"
+        )
+        body = zstandard.ZstdDecompressor().stream_reader(response["Body"]).read()
+        assert response["ContentEncoding"] == "zstd"
+        assert json.loads(body) == {"staff": [{"staff_id": 1}]}
+
+
+class TestUploadJsonBatchesToS3:
+    @pytest.mark.it(
+        "Testing that batches are written as the same json document dump_to_json produces"
+    )
+    @mock_aws
+    def test_batches_written_as_single_json_document(aws_creds):
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(
+            Bucket="test-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        batches = iter(
+            [[{"id": 1}, {"id": 2}], [{"id": 3, "at": datetime(2025, 1, 1)}]]
+        )
+        count = upload_json_batches_to_s3(
+            batches, "test", "test-bucket", "test/test.json", s3_client
+        )
+        body = s3_client.get_object(Bucket="test-bucket", Key="test/test.json")[
+            "Body"
+        ].read()
+        assert count == 3
+        assert json.loads(body) == {
+            "test": [{"id": 1}, {"id": 2}, {"id": 3, "at": "2025-01-01 00:00:00"}]
+        }
+
+    @pytest.mark.it("Testing that no object is created when there are no rows")
+    @mock_aws
+    def test_no_object_for_empty_batches(aws_creds):
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(
+            Bucket="test-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        count = upload_json_batches_to_s3(
+            iter([[]]), "test", "test-bucket", "test/test.json", s3_client
+        )
+        assert count == 0
+        assert "Contents" not in s3_client.list_objects_v2(Bucket="test-bucket")
+
+    @pytest.mark.it("Testing that the batches are gzipped for a .json.gz key")
+    @mock_aws
+    def test_batches_gzipped(aws_creds):
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(
+            Bucket="test-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        batches = iter([[{"staff_id": 1}, {"staff_id": 2}], [{"staff_id": 3}]])
+        count = upload_json_batches_to_s3(
+            batches, "staff", "test-bucket", "staff/staff.json.gz", s3_client
+        )
+        response = s3_client.get_object(Bucket="test-bucket", Key="staff/staff.json.gz")
+        assert count == 3
+        assert response["ContentEncoding"] == "gzip"
+        assert json.load(
+            gzip.GzipFile(fileobj=io.BytesIO(response["Body"].read()))
+        ) == {"staff": [{"staff_id": 1}, {"staff_id": 2}, {"staff_id": 3}]}
+
+
+class TestUploadNdjsonToS3:
+    @pytest.mark.it("Testing that each row is written as one json line")
+    @mock_aws
+    def test_rows_written_one_per_line(aws_creds):
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(
+            Bucket="test-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        rows = iter([{"id": 1}, {"id": 2, "at": datetime(2025, 1, 1)}])
+        count = upload_ndjson_to_s3(rows, "test-bucket", "test/test.ndjson", s3_client)
+        body = s3_client.get_object(Bucket="test-bucket", Key="test/test.ndjson")[
+            "Body"
+        ].read()
+        assert count == 2
+        assert body.decode("utf-8").splitlines() == [
+            '{"id": 1}',
+            '{"id": 2, "at": "2025-01-01 00:00:00"}',
+        ]
+
+    @pytest.mark.it("Testing that the gzip variant is compressed and marked as gzip")
+    @mock_aws
+    def test_rows_gzipped(aws_creds):
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(
+            Bucket="test-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        rows = ({"id": i} for i in range(1000))
+        count = upload_ndjson_to_s3(
+            rows, "test-bucket", "test/test.ndjson.gz", s3_client, compress=True
+        )
+        response = s3_client.get_object(Bucket="test-bucket", Key="test/test.ndjson.gz")
+        lines = gzip.decompress(response["Body"].read()).decode("utf-8").splitlines()
+        assert count == 1000
+        assert response["ContentEncoding"] == "gzip"
+        assert json.loads(lines[999]) == {"id": 999}
+
+    @pytest.mark.it("Testing that no object is created when there are no rows")
+    @mock_aws
+    def test_no_object_for_no_rows(aws_creds):
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(
+            Bucket="test-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        count = upload_ndjson_to_s3(
+            iter([]), "test-bucket", "test/test.ndjson.gz", s3_client, compress=True
+        )
+        assert count == 0
+        assert "Contents" not in s3_client.list_objects_v2(Bucket="test-bucket")
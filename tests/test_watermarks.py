@@ -0,0 +1,85 @@
+import os
+import sys
+import pytest
+from datetime import datetime
+from moto import mock_aws
+import boto3
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/python"))
+)
+from src.python.utils.watermarks import (
+    read_watermarks,
+    write_watermarks,
+    max_last_updated,
+)
+
+""" Tests for the per-table watermark store """
+
+
+@pytest.fixture
+def aws_creds():
+    os.environ["AWS_ACCESS_KEY_ID"] = "Test"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "Test"
+    os.environ["AWS_SECURITY_TOKEN"] = "Test"
+    os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
+
+
+@pytest.fixture()
+def s3_client(aws_creds):
+    with mock_aws():
+        s3_client = boto3.client("s3", region_name="eu-west-2")
+        s3_client.create_bucket(
+            Bucket="test-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        yield s3_client
+
+
+class TestReadWatermarks:
+    @pytest.mark.it("Testing returns no watermarks when nothing has been extracted")
+    def test_empty_bucket(self, s3_client):
+        assert read_watermarks("test-bucket", s3_client, ["staff"]) == {}
+
+    @pytest.mark.it("Testing falls back to last_updated.txt for every table")
+    def test_legacy_last_updated(self, s3_client):
+        s3_client.put_object(
+            Bucket="test-bucket",
+            Key="last_updated.txt",
+            Body="2025-05-29T11:06:18.399084",
+        )
+        assert read_watermarks("test-bucket", s3_client, ["staff", "design"]) == {
+            "staff": "2025-05-29 11:06:18.399084",
+            "design": "2025-05-29 11:06:18.399084",
+        }
+
+    @pytest.mark.it("Testing returns the watermarks previously written")
+    def test_round_trip(self, s3_client):
+        s3_client.put_object(
+            Bucket="test-bucket", Key="last_updated.txt", Body="2020-01-01T00:00:00"
+        )
+        watermarks = {"staff": "2025-05-29 11:06:18.399084"}
+        write_watermarks(watermarks, "test-bucket", s3_client)
+        assert read_watermarks("test-bucket", s3_client, ["staff"]) == watermarks
+
+
+class TestMaxLastUpdated:
+    @pytest.mark.it("Testing returns the newest last_updated of the rows")
+    def test_newest_row(self):
+        rows = [
+            {"last_updated": datetime(2025, 1, 2, 3, 4, 5, 6)},
+            {"last_updated": "2025-01-01 00:00:00.000000"},
+        ]
+        assert max_last_updated(rows) == "2025-01-02 03:04:05.000006"
+
+    @pytest.mark.it("Testing keeps the current watermark when no row is newer")
+    def test_keeps_current(self):
+        rows = [{"last_updated": datetime(2024, 1, 1)}]
+        assert (
+            max_last_updated(rows, "2025-01-01 00:00:00.000000")
+            == "2025-01-01 00:00:00.000000"
+        )
+
+    @pytest.mark.it("Testing returns None when there are no rows or watermark")
+    def test_no_rows(self):
+        assert max_last_updated([]) is None